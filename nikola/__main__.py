@@ -37,6 +37,7 @@ from doit.cmd_help import Help as DoitHelp
 from doit.cmd_run import Run as DoitRun
 from doit.doit_cmd import DoitMain
 from doit.loader import generate_tasks
+from doit.plugin import PluginDict, PluginEntry
 from doit.reporter import ExecutedOnlyReporter
 
 import importlib.util
@@ -77,6 +78,10 @@ def main(args=None):
     oargs = args
     args = [sys_decode(arg) for arg in args]
 
+    if '--startup-profile' in args:
+        from .startup_profile import main as startup_profile
+        return startup_profile([arg for arg in args if arg != '--startup-profile'])
+
     conf_filename = 'conf.py'
     conf_filename_changed = False
     for index, arg in enumerate(args):
@@ -263,6 +268,10 @@ class NikolaTaskLoader(TaskLoader2):
         self.nikola = nikola
         self.quiet = quiet
 
+    def setup(self, opt_values):
+        """Remember the number of processes the tasks run in."""
+        self.nikola.doit_num_process = opt_values.get('num_process') or 0
+
     def load_doit_config(self):
         """Load doit configuration."""
         if self.quiet:
@@ -288,6 +297,7 @@ class NikolaTaskLoader(TaskLoader2):
             latetasks = generate_tasks(
                 'post_render',
                 self.nikola.gen_tasks('post_render', "LateTask", 'Group of tasks to be executed after site is rendered.'))
+            self.nikola.set_doit_tasks(tasks + latetasks, cmd.dep_manager, cmd.sel_tasks)
             signal('initialized').send(self.nikola)
         except Exception:
             LOGGER.error('Error loading tasks. An unhandled exception occurred.')
@@ -298,6 +308,28 @@ class NikolaTaskLoader(TaskLoader2):
         return tasks + latetasks
 
 
+class NikolaCommandEntry(PluginEntry):
+    """A Nikola command, imported and activated when first used."""
+
+    def __init__(self, plugin_info):
+        """Initialize NikolaCommandEntry."""
+        super().__init__('COMMAND', plugin_info.name, plugin_info.module_name)
+        self.plugin_info = plugin_info
+
+    def load(self):
+        """Get the command object, or None if it cannot be loaded."""
+        return self.plugin_info.plugin_object
+
+
+class NikolaCommandDict(PluginDict):
+    """Commands available in Nikola, leaving out the ones that cannot be loaded."""
+
+    def to_dict(self):
+        """Return all commands, loaded."""
+        cmds = {k: self.get_plugin(k) for k in self.keys()}
+        return {k: v for k, v in cmds.items() if v is not None}
+
+
 class DoitNikola(DoitMain):
     """Nikola-specific implementation of DoitMain."""
 
@@ -318,9 +350,10 @@ class DoitNikola(DoitMain):
         """Get commands."""
         # core doit commands
         cmds = DoitMain.get_cmds(self)
-        # load nikola commands
-        for name, cmd in self.nikola._commands.items():
-            cmds[name] = cmd
+        # load nikola commands, which are imported only when used
+        cmds = NikolaCommandDict(cmds)
+        for name, plugin_info in self.nikola._commands.items():
+            cmds[name] = NikolaCommandEntry(plugin_info)
         return cmds
 
     def run(self, cmd_args):
@@ -346,7 +379,13 @@ class DoitNikola(DoitMain):
                 if arg not in ('--help', '-h'):
                     args.append(arg)
 
-        if args[0] == 'help':
+        if any(arg in ("--version", '-V') for arg in args):
+            cmd_args = ['version']
+            args = ['version']
+
+        # Those commands do not need any other plugins (unless completion
+        # includes the task names).
+        if args[0] in ('help', 'version') or (args[0] == 'tabcompletion' and '--hardcode-tasks' not in args):
             self.nikola.init_plugins(commands_only=True)
         elif args[0] == 'plugin':
             self.nikola.init_plugins(load_all=True)
@@ -354,10 +393,6 @@ class DoitNikola(DoitMain):
             self.nikola.init_plugins()
 
         sub_cmds = self.get_cmds()
-
-        if any(arg in ("--version", '-V') for arg in args):
-            cmd_args = ['version']
-            args = ['version']
         if args[0] not in sub_cmds.keys():
             LOGGER.error("Unknown command {0}".format(args[0]))
             sugg = defaultdict(list)
@@ -373,7 +408,11 @@ class DoitNikola(DoitMain):
                     LOGGER.info('Did you mean "{}" or "{}"?'.format('", "'.join(best_sugg[:-1]), best_sugg[-1]))
             return 3
 
-        if not sub_cmds[args[0]] in (Help, TabCompletion) and not isinstance(sub_cmds[args[0]], Command):
+        cmd = sub_cmds.get_plugin(args[0])
+        if cmd is None:
+            LOGGER.error("Command {0} could not be loaded".format(args[0]))
+            return 3
+        if cmd not in (Help, TabCompletion) and not isinstance(cmd, Command):
             if not self.nikola.configured:
                 LOGGER.error("This command needs to run inside an "
                              "existing Nikola site.")
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+
+# Copyright © 2012-2025 Roberto Alsina and others.
+
+# Permission is hereby granted, free of charge, to any
+# person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the
+# Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the
+# Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice
+# shall be included in all copies or substantial portions of
+# the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS
+# OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""A cache of compiled post fragments, shared between builds and checkouts."""
+
+import hashlib
+import json
+import os
+import sys
+
+from . import __version__
+from . import utils
+
+_compiler_fingerprints = {}
+
+
+def file_digest(path):
+    """Return the SHA-256 digest of a file's contents."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as inf:
+        for chunk in iter(lambda: inf.read(65536), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def compiler_fingerprint(compiler):
+    """Return data identifying a compiler, its extensions and their versions.
+
+    This includes the source code of the compiler and its extensions, so
+    that upgrading them invalidates cached fragments.
+    """
+    if compiler not in _compiler_fingerprints:
+        module_files = [sys.modules[type(compiler).__module__].__file__]
+        module_files += [str(p.py_file_location) for p in compiler.get_compiler_extensions()]
+        _compiler_fingerprints[compiler] = {
+            'nikola': __version__,
+            'name': compiler.name,
+            'versions': compiler.get_versions(),
+            'modules': sorted(file_digest(f) for f in module_files),
+        }
+    return _compiler_fingerprints[compiler]
+
+
+class CompileCache:
+    """A content-addressed cache of compiled fragments.
+
+    Entries are keyed by a hash of the source files, the compiler (see
+    ``compiler_fingerprint``), its ``config_dependencies`` and the values of
+    its options (see ``PageCompiler.get_config_options``), and the language. Each entry stores the compiled fragment and the dependencies
+    the compiler recorded for it, together with the hashes of those files,
+    which are checked before using the entry.
+
+    Fragments that depend on the timeline or on configuration options
+    (``####MAGIC####`` dependencies) are not cached.
+    """
+
+    def __init__(self, folder):
+        """Create a cache in the given folder."""
+        self.folder = os.path.expanduser(folder)
+
+    def key(self, post, lang, source_deps, extra=None):
+        """Return the cache key for a post's fragment."""
+        h = hashlib.sha256()
+        data = {
+            'compiler': compiler_fingerprint(post.compiler),
+            'config_dependencies': sorted(post.compiler.config_dependencies),
+            'options': post.compiler.get_config_options(),
+            'lang': lang,
+            'source_path': post.translated_source_path(lang),
+            'is_two_file': post.is_two_file,
+            'extra': extra,
+        }
+        h.update(json.dumps(data, sort_keys=True, default=repr).encode('utf-8'))
+        for path in source_deps:
+            h.update(path.encode('utf-8'))
+            h.update(file_digest(path).encode('ascii'))
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.folder, key[:2], key)
+
+    def get(self, key, dest):
+        """Copy a cached fragment to dest and return its dependencies.
+
+        Return None (and leave dest alone) if there is no usable entry.
+        """
+        path = self._path(key)
+        try:
+            with open(path + '.json', 'r', encoding='utf-8') as inf:
+                entry = json.load(inf)
+            with open(path + '.html', 'rb') as inf:
+                fragment = inf.read()
+        except (OSError, ValueError):
+            return None
+        for dep, digest in entry['hashes'].items():
+            if not os.path.isfile(dep) or file_digest(dep) != digest:
+                return None
+        utils.makedirs(os.path.dirname(dest))
+        with open(dest, 'wb') as outf:
+            outf.write(fragment)
+        return entry['deps']
+
+    def put(self, key, dest, deps):
+        """Store the fragment in dest, compiled with the given dependencies."""
+        if any(dep.startswith('####MAGIC####') or not os.path.isfile(dep) for dep in deps):
+            return
+        entry = {
+            'deps': deps,
+            'hashes': {dep: file_digest(dep) for dep in deps},
+        }
+        path = self._path(key)
+        with open(dest, 'rb') as inf:
+            fragment = inf.read()
+        # Write the fragment first, the entry is only used once the .json file exists
+        utils.write_file_atomic(path + '.html', fragment)
+        utils.write_json_atomic(path + '.json', entry, sort_keys=True)
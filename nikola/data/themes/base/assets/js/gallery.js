@@ -13,6 +13,14 @@ function renderGallery(jsonContent, thumbnailSize) {
         img.setAttribute('alt', jsonContent[i].title);
         img.style.width = boxes[i].width + 'px';
         img.style.height = boxes[i].height + 'px';
+        img.setAttribute('loading', 'lazy');
+        if (jsonContent[i].dominant_color) {
+            img.style.backgroundColor = jsonContent[i].dominant_color;
+        }
+        if (jsonContent[i].placeholder) {
+            img.style.backgroundImage = "url('" + jsonContent[i].placeholder + "')";
+            img.style.backgroundSize = 'cover';
+        }
         link = document.createElement("a");
         link.setAttribute('href', jsonContent[i].url);
         link.setAttribute('class', 'image-reference');
@@ -30,3 +38,15 @@ function renderGallery(jsonContent, thumbnailSize) {
     }
 }
 
+
+function loadGallery(url, thumbnailSize) {
+    var request = new XMLHttpRequest();
+    request.open('GET', url);
+    request.responseType = 'json';
+    request.onload = function() {
+        var jsonContent = request.response;
+        renderGallery(jsonContent, thumbnailSize);
+        window.addEventListener('resize', function(){renderGallery(jsonContent, thumbnailSize)});
+    };
+    request.send();
+}
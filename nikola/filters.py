@@ -38,9 +38,7 @@ import shlex
 import subprocess
 import tempfile
 from functools import wraps
-
-import lxml
-import requests
+from urllib.parse import unquote, urlsplit
 
 from .utils import req_missing, LOGGER, slugify
 
@@ -423,6 +421,7 @@ def php_template_injection(data):
 @apply_to_text_file
 def cssminify(data):
     """Minify CSS using <https://www.toptal.com/developers/cssminifier>."""
+    import requests
     try:
         url = 'https://www.toptal.com/developers/cssminifier/api/raw'
         _data = {'input': data}
@@ -442,6 +441,7 @@ def cssminify(data):
 @apply_to_text_file
 def jsminify(data):
     """Minify JS using <https://www.toptal.com/developers/javascript-minifier>."""
+    import requests
     try:
         url = 'https://www.toptal.com/developers/javascript-minifier/api/raw'
         _data = {'input': data}
@@ -468,6 +468,7 @@ def jsonminify(data):
 @apply_to_binary_file
 def xmlminify(data):
     """Minify XML files (strip whitespace and use minimal separators)."""
+    import lxml.etree
     parser = lxml.etree.XMLParser(remove_blank_text=True)
     newdata = lxml.etree.XML(data, parser=parser)
     return lxml.etree.tostring(
@@ -477,6 +478,7 @@ def xmlminify(data):
 
 def _normalize_html(data):
     """Pass HTML through LXML to clean it up, if possible."""
+    import lxml.html
     try:
         data = lxml.html.tostring(lxml.html.fromstring(data), encoding='unicode')
     except Exception:
@@ -494,6 +496,7 @@ normalize_html = apply_to_text_file(_normalize_html)
 )
 def add_header_permalinks(fname, xpath_list=None, file_blacklist=None):
     """Post-process HTML via lxml to add header permalinks Sphinx-style."""
+    import lxml.html
     # Blacklist requires custom file handling
     file_blacklist = file_blacklist or []
     if fname in file_blacklist:
@@ -542,10 +545,77 @@ def add_header_permalinks(fname, xpath_list=None, file_blacklist=None):
         outf.write('<!DOCTYPE html>\n' + lxml.html.tostring(doc, encoding='unicode'))
 
 
+def _local_image_path(src, fname, output_folder, base_url):
+    """Find the path of a local image in the output folder, or return None."""
+    if not src:
+        return None
+    parts = urlsplit(src)
+    base_parts = urlsplit(base_url)
+    path = unquote(parts.path)
+    if parts.scheme or parts.netloc:
+        # Absolute URL, only local if it points to the site
+        if (parts.scheme, parts.netloc) != (base_parts.scheme, base_parts.netloc):
+            return None
+    if path.startswith('/'):
+        if path.startswith(base_parts.path):
+            path = path[len(base_parts.path):]
+        img_path = os.path.join(output_folder, *path.lstrip('/').split('/'))
+    else:
+        img_path = os.path.join(os.path.dirname(fname), *path.split('/'))
+    img_path = os.path.normpath(img_path)
+    if os.path.relpath(img_path, output_folder).startswith(os.pardir):
+        return None
+    return img_path
+
+
+@_ConfigurableFilter(
+    eager_count='IMAGE_ATTRIBUTES_EAGER_COUNT',
+    output_folder='OUTPUT_FOLDER',
+    cache_folder='CACHE_FOLDER',
+    base_url='BASE_URL',
+    thumbnail_format='IMAGE_THUMBNAIL_FORMAT',
+)
+def add_image_attributes(fname, eager_count=1, output_folder='output', cache_folder='cache', base_url='/',
+                         thumbnail_format='{name}.thumbnail{ext}'):
+    """Add dimensions, ``loading="lazy"`` and ``decoding="async"`` to images.
+
+    Local images without dimensions get ``width`` and ``height`` attributes,
+    taken from the stored image metadata. All images after the first
+    ``eager_count`` images are loaded lazily and decoded asynchronously.
+    """
+    import lxml.html
+    # Circular import workaround (utils imports filters)
+    from nikola.image_processing import get_image_size
+
+    with io.open(fname, 'r', encoding='utf-8-sig') as inf:
+        data = inf.read()
+    if '<img' not in data:
+        return
+    doc = lxml.html.document_fromstring(data)
+    config = {'OUTPUT_FOLDER': output_folder, 'CACHE_FOLDER': cache_folder, 'IMAGE_THUMBNAIL_FORMAT': thumbnail_format}
+    for i, img in enumerate(doc.iter('img')):
+        style = img.get('style', '')
+        if not ({'width', 'height'} & set(img.attrib) or 'width' in style or 'height' in style):
+            img_path = _local_image_path(img.get('src'), fname, output_folder, base_url)
+            size = get_image_size(config, img_path) if img_path else None
+            if size:
+                img.set('width', str(size[0]))
+                img.set('height', str(size[1]))
+        if i >= eager_count:
+            if 'loading' not in img.attrib:
+                img.set('loading', 'lazy')
+            if 'decoding' not in img.attrib:
+                img.set('decoding', 'async')
+
+    with io.open(fname, 'w', encoding='utf-8') as outf:
+        outf.write('<!DOCTYPE html>\n' + lxml.html.tostring(doc, encoding='unicode'))
+
+
 @_ConfigurableFilter(top_classes='DEDUPLICATE_IDS_TOP_CLASSES')
 @apply_to_text_file
 def deduplicate_ids(data, top_classes=None):
     """Post-process HTML via lxml to deduplicate IDs."""
+    import lxml.html
     if not top_classes:
         top_classes = ('postpage', 'storypage')
     doc = lxml.html.document_fromstring(data)
@@ -26,8 +26,6 @@
 
 """Hierarchy utility functions."""
 
-import natsort
-
 __all__ = ('TreeNode', 'clone_treenode', 'flatten_tree_structure',
            'sort_classifications', 'join_hierarchical_category_path',
            'parse_escaped_hierarchical_category_name',)
@@ -223,6 +221,7 @@ def sort_classifications(taxonomy, classifications, lang):
     happen according to the way the complete classification
     hierarchy for the taxonomy is sorted.
     """
+    import natsort
     if taxonomy.has_hierarchy:
         # To sort a hierarchy of classifications correctly, we first
         # build a tree out of them (and mark for each node whether it
@@ -26,19 +26,227 @@
 
 """Process images."""
 
+import base64
+import copy
 import datetime
 import gzip
+import io
+import json
 import logging
 import os
 import re
+from urllib.parse import urlsplit
 
 import lxml.etree
 import piexif
-from PIL import ExifTags, Image
+from PIL import ExifTags, Image, ImageFilter, features
 
 from nikola import utils
 
 EXIF_TAG_NAMES = {}
+PLACEHOLDER_SIZE = 16
+_image_metadata_cache = {}
+
+SVG_NAMESPACE = 'http://www.w3.org/2000/svg'
+SVG_EDITOR_NAMESPACES = {
+    'http://www.inkscape.org/namespaces/inkscape',
+    'http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd',
+    'http://www.bohemiancoding.com/sketch/ns',
+    'http://ns.adobe.com/AdobeIllustrator/10.0/',
+    'http://ns.adobe.com/AdobeSVGViewerExtensions/3.0/',
+    'http://ns.adobe.com/Extensibility/1.0/',
+    'http://ns.adobe.com/Graphs/1.0/',
+    'http://ns.adobe.com/SaveForWeb/1.0/',
+    'http://ns.adobe.com/Variables/1.0/',
+    'http://ns.adobe.com/xap/1.0/',
+    'http://purl.org/dc/elements/1.1/',
+    'http://creativecommons.org/ns#',
+    'http://www.w3.org/1999/02/22-rdf-syntax-ns#',
+}
+SVG_NUMERIC_ATTRIBUTES = {
+    'cx', 'cy', 'd', 'dx', 'dy', 'fx', 'fy', 'height', 'offset', 'points',
+    'r', 'rx', 'ry', 'stroke-width', 'transform', 'viewBox', 'width',
+    'x', 'x1', 'x2', 'y', 'y1', 'y2',
+}
+SVG_PRECISION = 3
+_svg_number_re = re.compile(r'-?\d*\.\d{4,}(?:[eE][-+]?\d+)?')
+
+
+def _shorten_number(number, precision):
+    """Round a number to the given number of decimal places, as a short string."""
+    number = '{0:.{1}f}'.format(float(number), precision).rstrip('0').rstrip('.')
+    return '0' if number in ('', '-0') else number
+
+
+def _remove_svg_node(node):
+    """Remove a node from an SVG tree, keeping its tail text."""
+    parent = node.getparent()
+    if parent is None:
+        return
+    if node.tail:
+        previous = node.getprevious()
+        if previous is not None:
+            previous.tail = (previous.tail or '') + node.tail
+        else:
+            parent.text = (parent.text or '') + node.tail
+    parent.remove(node)
+
+
+def image_metadata_path(config, output_path):
+    """Return the path of the metadata file for an image in the output folder.
+
+    Metadata files are stored in CACHE_FOLDER/image_metadata, mirroring the
+    output folder, and are written by ImageProcessor.resize_image.
+    """
+    rel_path = os.path.relpath(output_path, config['OUTPUT_FOLDER'])
+    return os.path.join(config['CACHE_FOLDER'], 'image_metadata', rel_path + '.json')
+
+
+def read_image_metadata(config, output_path):
+    """Read the stored metadata for an image in the output folder.
+
+    Returns an empty dict if no metadata is available, or if it can't be read.
+    """
+    path = image_metadata_path(config, output_path)
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return {}
+    cached = _image_metadata_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        try:
+            with open(path, 'r', encoding='utf-8') as inf:
+                metadata = json.load(inf)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(metadata, dict):
+            return {}
+        cached = mtime, metadata
+        _image_metadata_cache[path] = cached
+    return cached[1]
+
+
+def write_image_metadata(metadata_path, metadata):
+    """Write image metadata to a file atomically."""
+    utils.write_json_atomic(metadata_path, metadata, sort_keys=True)
+
+
+def thumbnail_originals(config, path):
+    """Return the paths of the images that path may be a thumbnail of.
+
+    Thumbnails of images are named after IMAGE_THUMBNAIL_FORMAT, and
+    thumbnails of gallery images are named ``{name}.thumbnail{ext}``.
+    """
+    folder, name = os.path.split(path)
+    originals = []
+    for thumbnail_format in (config.get('IMAGE_THUMBNAIL_FORMAT', '{name}.thumbnail{ext}'), '{name}.thumbnail{ext}'):
+        pattern = re.escape(thumbnail_format).replace(re.escape('{name}'), '(?P<name>.+)').replace(re.escape('{ext}'), r'(?P<ext>\.[^.]+)')
+        match = re.fullmatch(pattern, name)
+        if match is not None:
+            original = os.path.join(folder, match.group('name') + match.group('ext'))
+            if original not in originals:
+                originals.append(original)
+    return originals
+
+
+def get_image_size(config, path):
+    """Get the size of an image in the output folder, as a (width, height) tuple.
+
+    The size is taken from the stored image metadata if it is newer than
+    the image. Otherwise, the image is opened once, and its size is added
+    to the metadata. Returns None if the size can't be determined.
+    """
+    name = os.path.basename(path)
+    metadata_path = image_metadata_path(config, path)
+    try:
+        image_mtime = os.stat(path).st_mtime
+    except OSError:
+        return None
+    metadata = read_image_metadata(config, path)
+    if name not in metadata.get('sizes', {}):
+        # Thumbnail sizes are stored with the metadata of their original
+        for original in thumbnail_originals(config, path):
+            original_metadata = read_image_metadata(config, original)
+            if name in original_metadata.get('sizes', {}):
+                metadata_path = image_metadata_path(config, original)
+                metadata = original_metadata
+                break
+    if name in metadata.get('sizes', {}) and os.stat(metadata_path).st_mtime >= image_mtime:
+        return tuple(metadata['sizes'][name])
+    if os.path.splitext(name)[1].lower() in {'.svg', '.svgz'}:
+        return None
+    try:
+        with Image.open(path) as im:
+            size = im.size
+    except Exception:
+        return None
+    metadata = dict(metadata)
+    metadata['sizes'] = dict(metadata.get('sizes', {}))
+    metadata['sizes'][name] = size
+    write_image_metadata(metadata_path, metadata)
+    return size
+
+
+def image_source(config, output_path):
+    """Return the source of an image that a task resizes into output_path.
+
+    Images from IMAGE_FOLDERS and GALLERY_FOLDERS are resized by the
+    scale_images and render_galleries tasks, which also write their
+    metadata when IMAGE_PLACEHOLDERS is enabled. Returns None for other
+    files.
+    """
+    name = os.path.basename(output_path)
+    extensions = tuple(ext.lower() for ext in ImageProcessor.image_ext_list_builtin + config.get('EXTRA_IMAGE_EXTENSIONS', []))
+    if name.startswith('.') or not name.lower().endswith(extensions):
+        return None
+    rel_path = os.path.relpath(output_path, config['OUTPUT_FOLDER'])
+    for folders, is_gallery in ((config['IMAGE_FOLDERS'], False), (config['GALLERY_FOLDERS'], True)):
+        for src, dst in folders.items():
+            dst = os.path.normpath(dst) if dst else ''
+            if dst and not rel_path.startswith(dst + os.sep):
+                continue
+            src_path = os.path.join(src, rel_path[len(dst):].lstrip(os.sep))
+            if not os.path.isfile(src_path):
+                continue
+            if is_gallery:
+                # Excluded gallery images are not resized
+                try:
+                    with open(os.path.join(os.path.dirname(src_path), 'exclude.meta'), 'r') as inf:
+                        if name in inf.read().split():
+                            continue
+                except OSError:
+                    pass
+            return src_path
+    return None
+
+
+def find_image_metadata(config, uri):
+    """Find the stored metadata of an image referenced by its URI.
+
+    Only site-root-relative URIs (like ``/images/foo.jpg``) are supported.
+    Returns a tuple of the metadata path and the metadata.  The path is
+    also returned if there is no metadata yet, but an image task will
+    write it (see image_source), so that it can be recorded as a
+    dependency.  Otherwise, it is None.
+    """
+    parts = urlsplit(uri)
+    if parts.scheme or parts.netloc or not parts.path.startswith('/'):
+        return None, {}
+    output_path = os.path.join(config['OUTPUT_FOLDER'], *parts.path.lstrip('/').split('/'))
+    metadata = read_image_metadata(config, output_path)
+    if not metadata and image_source(config, output_path) is None:
+        return None, {}
+    return image_metadata_path(config, output_path), metadata
+
+
+def placeholder_style(metadata):
+    """Return a CSS style showing the placeholder of an image while it loads."""
+    style = []
+    if metadata.get('dominant_color'):
+        style.append('background-color: {0};'.format(metadata['dominant_color']))
+    if metadata.get('placeholder'):
+        style.append("background-image: url('{0}'); background-size: cover;".format(metadata['placeholder']))
+    return ' '.join(style)
 
 
 class ImageProcessor:
@@ -85,7 +293,35 @@ class ImageProcessor:
 
         return exif or None
 
-    def resize_image(self, src, dst=None, max_size=None, bigger_panoramas=True, preserve_exif_data=False, exif_whitelist={}, preserve_icc_profiles=False, dst_paths=None, max_sizes=None):
+    def image_placeholder(self, im):
+        """Compute a tiny blurred placeholder and the dominant color of an image.
+
+        Returns a dict with ``placeholder`` (a base64 WebP data URI, or JPEG
+        if Pillow lacks WebP support) and ``dominant_color`` (a ``#rrggbb``
+        string).
+        """
+        # Shrink before converting, so the full-size image is neither copied
+        # nor converted. reduce() returns a new image, im is still used for
+        # the resized copies.
+        factor = max(1, max(im.size) // (PLACEHOLDER_SIZE * 2))
+        try:
+            small = im.reduce(factor)
+        except ValueError:
+            # Palette, bilevel and 16-bit images can't be reduced
+            small = im.convert('RGBA').reduce(factor)
+        small.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE), Image.Resampling.BILINEAR)
+        small = small.convert('RGB')
+        color = small.resize((1, 1), Image.Resampling.BOX).getpixel((0, 0))
+        small = small.filter(ImageFilter.GaussianBlur(1))
+        fmt = 'WEBP' if features.check('webp') else 'JPEG'
+        buf = io.BytesIO()
+        small.save(buf, fmt, quality=50)
+        return {
+            'placeholder': 'data:image/{0};base64,{1}'.format(fmt.lower(), base64.b64encode(buf.getvalue()).decode('ascii')),
+            'dominant_color': '#{0:02x}{1:02x}{2:02x}'.format(*color),
+        }
+
+    def resize_image(self, src, dst=None, max_size=None, bigger_panoramas=True, preserve_exif_data=False, exif_whitelist={}, preserve_icc_profiles=False, dst_paths=None, max_sizes=None, metadata_path=None, optimize_svg=False):
         """Make a copy of the image in the requested size(s).
 
         max_sizes should be a list of sizes, and the image would be resized to fit in a
@@ -93,6 +329,13 @@ class ImageProcessor:
 
         dst_paths is a list of the destination paths, and should be the same length as max_sizes.
 
+        If metadata_path is set, a JSON file is written there, containing a
+        placeholder and the dominant color of the image (see
+        image_placeholder), as well as the sizes of the resized images,
+        keyed by file name.
+
+        If optimize_svg is True, SVG images are optimized (see optimize_svg).
+
         Backwards compatibility:
 
         * If max_sizes is None, it's set to [max_size]
@@ -108,7 +351,9 @@ class ImageProcessor:
             raise ValueError('resize_image called with incompatible arguments: {} / {}'.format(dst_paths, max_sizes))
         extension = os.path.splitext(src)[1].lower()
         if extension in {'.svg', '.svgz'}:
-            self.resize_svg(src, dst_paths, max_sizes, bigger_panoramas)
+            self.resize_svg(src, dst_paths, max_sizes, bigger_panoramas, optimize_svg)
+            if metadata_path:
+                write_image_metadata(metadata_path, {'sizes': {}})
             return
 
         _im = Image.open(src)
@@ -135,9 +380,21 @@ class ImageProcessor:
 
         icc_profile = _im.info.get('icc_profile') if preserve_icc_profiles else None
 
+        metadata = None
+        if metadata_path:
+            # The image is already decoded, so computing the placeholder is cheap
+            try:
+                metadata = self.image_placeholder(_im)
+            except Exception as e:
+                self.logger.warning("Can't compute placeholder for {0} ({1})".format(src, e))
+                metadata = {}
+            metadata['sizes'] = {}
+
         for dst, max_size in zip(dst_paths, max_sizes):
             if is_animated:  # Animated gif, leave as-is
                 utils.copy_file(src, dst)
+                if metadata is not None:
+                    metadata['sizes'][os.path.basename(dst)] = _im.size
                 continue
 
             im = _im.copy()
@@ -167,59 +424,104 @@ class ImageProcessor:
                     save_args['exif'] = piexif.dump(exif)
 
                 im.save(dst, **save_args)
+                if metadata is not None:
+                    metadata['sizes'][os.path.basename(dst)] = im.size
             except Exception as e:
                 self.logger.warning("Can't process {0}, using original "
                                     "image! ({1})".format(src, e))
                 utils.copy_file(src, dst)
+                if metadata is not None:
+                    metadata['sizes'][os.path.basename(dst)] = _im.size
 
-    def resize_svg(self, src, dst_paths, max_sizes, bigger_panoramas):
-        """Make a copy of an svg at the requested sizes."""
+        if metadata is not None:
+            write_image_metadata(metadata_path, metadata)
+
+    def resize_svg(self, src, dst_paths, max_sizes, bigger_panoramas, optimize=False):
+        """Make a copy of an svg at the requested sizes.
+
+        The SVG is parsed only once, and every size is written from the
+        same tree. If optimize is True, the tree is cleaned up first (see
+        optimize_svg).
+        """
         # Resize svg based on viewport hacking.
         # note that this can also lead to enlarged svgs
-        if src.endswith('.svgz'):
-            with gzip.GzipFile(src, 'rb') as op:
-                xml = op.read()
-        else:
-            with open(src, 'rb') as op:
-                xml = op.read()
+        try:
+            if src.endswith('.svgz'):
+                with gzip.open(src, 'rb') as op:
+                    tree = lxml.etree.parse(op)
+            else:
+                tree = lxml.etree.parse(src)
+            root = tree.getroot()
+            width = root.attrib.pop('width')
+            height = root.attrib.pop('height')
+            w = int(re.search("[0-9]+", width).group(0))
+            h = int(re.search("[0-9]+", height).group(0))
+            if optimize:
+                root = self.optimize_svg(root)
+                tree = lxml.etree.ElementTree(root)
+        except (KeyError, AttributeError) as e:
+            self.logger.warning("No width/height in %s. Original exception: %s" % (src, e))
+            for dst in dst_paths:
+                utils.copy_file(src, dst)
+            return
+        except Exception as e:
+            self.logger.warning("Can't process {0}, using original "
+                                "image! ({1})".format(src, e))
+            for dst in dst_paths:
+                utils.copy_file(src, dst)
+            return
 
+        # calculate new size preserving aspect ratio.
+        ratio = float(w) / h
         for dst, max_size in zip(dst_paths, max_sizes):
             try:
-                tree = lxml.etree.XML(xml)
-                width = tree.attrib['width']
-                height = tree.attrib['height']
-                w = int(re.search("[0-9]+", width).group(0))
-                h = int(re.search("[0-9]+", height).group(0))
-                # calculate new size preserving aspect ratio.
-                ratio = float(w) / h
                 # Panoramas get larger thumbnails because they look *awful*
                 if bigger_panoramas and w > 3 * h:
                     max_size = max_size * 4
                 if w > h:
-                    w = max_size
-                    h = max_size / ratio
-                else:
-                    w = max_size * ratio
-                    h = max_size
-                w = int(w)
-                h = int(h)
-                tree.attrib.pop("width")
-                tree.attrib.pop("height")
-                tree.attrib['viewport'] = "0 0 %ipx %ipx" % (w, h)
-                if dst.endswith('.svgz'):
-                    op = gzip.GzipFile(dst, 'wb')
+                    new_w = max_size
+                    new_h = max_size / ratio
                 else:
-                    op = open(dst, 'wb')
-                op.write(lxml.etree.tostring(tree))
-                op.close()
-            except (KeyError, AttributeError) as e:
-                self.logger.warning("No width/height in %s. Original exception: %s" % (src, e))
-                utils.copy_file(src, dst)
+                    new_w = max_size * ratio
+                    new_h = max_size
+                root.attrib['viewport'] = "0 0 %ipx %ipx" % (int(new_w), int(new_h))
+                # libxml2 writes (and compresses) the output file directly
+                tree.write(dst, compression=9 if dst.endswith('.svgz') else 0)
             except Exception as e:
                 self.logger.warning("Can't process {0}, using original "
                                     "image! ({1})".format(src, e))
                 utils.copy_file(src, dst)
 
+    def optimize_svg(self, root, precision=SVG_PRECISION):
+        """Return an optimized copy of an SVG tree.
+
+        Removes comments (including the ones outside the root element),
+        metadata, and elements and attributes in editor namespaces (like
+        Inkscape and Sodipodi), and rounds numbers in geometry attributes
+        to the given number of decimal places.
+        """
+        # Copying the root element leaves out the top-level comments
+        root = copy.deepcopy(root)
+        for node in list(root.iter(lxml.etree.Comment, lxml.etree.ProcessingInstruction)):
+            _remove_svg_node(node)
+        for node in list(root.iter('{%s}metadata' % SVG_NAMESPACE)):
+            _remove_svg_node(node)
+        for node in list(root.iter()):
+            if not isinstance(node.tag, str):
+                continue
+            if lxml.etree.QName(node).namespace in SVG_EDITOR_NAMESPACES:
+                _remove_svg_node(node)
+                continue
+            for attr in list(node.attrib):
+                qname = lxml.etree.QName(attr)
+                if qname.namespace in SVG_EDITOR_NAMESPACES:
+                    del node.attrib[attr]
+                elif qname.namespace is None and qname.localname in SVG_NUMERIC_ATTRIBUTES:
+                    node.attrib[attr] = _svg_number_re.sub(
+                        lambda m: _shorten_number(m.group(0), precision), node.attrib[attr])
+        lxml.etree.cleanup_namespaces(root)
+        return root
+
     def image_date(self, src):
         """Try to figure out the date of the image."""
         if src not in self.dates:
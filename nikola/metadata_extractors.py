@@ -30,8 +30,6 @@ import re
 from enum import Enum
 from io import StringIO
 
-import natsort
-
 from nikola.plugin_categories import MetadataExtractor
 from nikola.utils import unslugify
 
@@ -159,6 +157,7 @@ class NikolaMetadata(MetadataExtractor):
 
     def write_metadata(self, metadata: dict, comment_wrap=False) -> str:
         """Write metadata in this extractor’s format."""
+        import natsort
         metadata = metadata.copy()
         order = ('title', 'slug', 'date', 'tags', 'category', 'link', 'description', 'type')
         f = '.. {0}: {1}'
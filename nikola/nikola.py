@@ -34,6 +34,7 @@ import logging
 import operator
 import os
 import pathlib
+import re
 import sys
 import typing
 from typing import Any, Callable, Iterable, Optional
@@ -43,16 +44,13 @@ from copy import copy
 from urllib.parse import urlparse, urlsplit, urlunsplit, urljoin, unquote, parse_qs
 
 import dateutil.tz
-import lxml.etree
-import lxml.html
-import natsort
-import PyRSS2Gen as rss
 from blinker import signal
 
-from . import DEBUG, SHOW_TRACEBACKS, filters, utils, hierarchy_utils, shortcodes
+from . import DEBUG, SHOW_TRACEBACKS, __version__, filters, utils, hierarchy_utils, shortcodes
 from . import metadata_extractors
 from .metadata_extractors import default_metadata_extractors_by
 from .post import Post  # NOQA
+from .post_index import PostIndex
 from .plugin_manager import PluginCandidate, PluginInfo, PluginManager
 from .plugin_categories import (
     TemplateSystem,
@@ -348,6 +346,9 @@ TAXONOMY_COMPATIBILITY_PLUGIN_NAME_MAP = {
 # Default value for the pattern used to name translated files
 DEFAULT_TRANSLATIONS_PATTERN = '{path}.{lang}.{ext}'
 
+# Plugin categories imported only when tasks are generated (or a path handler is missing)
+DEFERRED_PLUGIN_CATEGORIES = ("Task", "LateTask", "TaskMultiplier")
+
 
 def _enclosure(post, lang):
     """Add an enclosure to RSS."""
@@ -397,6 +398,9 @@ class Nikola:
         self.timeline = []
         self.pages = []
         self._scanned = False
+        self._post_index = None
+        # Kinds of paths handled by task plugins, as kind: [category, plugin name]
+        self._path_handler_plugins = None
         self._template_system: Optional[TemplateSystem] = None
         self._THEMES = None
         self._MESSAGES = None
@@ -407,11 +411,17 @@ class Nikola:
         self.invariant = config.pop('__invariant__', False)
         self.quiet = config.pop('__quiet__', False)
         self._doit_config = config.pop('DOIT_CONFIG', {})
+        # Set by the doit task loader, see set_doit_tasks
+        self.doit_num_process = 0
+        self._doit_tasks = {}
+        self._doit_dep_manager = None
+        self._doit_selected = None
         self.original_cwd = config.pop('__cwd__', False)
         self.configuration_filename = config.pop('__configuration_filename__', False)
         self.configured = bool(config)
         self.injected_deps = defaultdict(list)
         self.shortcode_registry = {}
+        self.shortcode_cache = None
         self.metadata_extractors_by = default_metadata_extractors_by()
         self.registered_auto_watched_folders = set()
 
@@ -507,9 +517,11 @@ class Nikola:
             'FILES_FOLDERS': {'files': ''},
             'FILTERS': {},
             'FORCE_ISO8601': False,
+            'FRAGMENT_CACHE_FOLDER': None,
             'FRONT_INDEX_HEADER': '',
             'GALLERY_FOLDERS': {'galleries': 'galleries'},
             'GALLERY_SORT_BY_DATE': True,
+            'GALLERY_PHOTOS_PER_PAGE': 0,
             'GALLERIES_USE_THUMBNAIL': False,
             'GALLERIES_DEFAULT_THUMBNAIL': None,
             'GLOBAL_CONTEXT_FILLER': [],
@@ -526,6 +538,8 @@ class Nikola:
             'INDEX_FILE': 'index.html',
             'INDEX_TEASERS': False,
             'IMAGE_THUMBNAIL_SIZE': 400,
+            'IMAGE_PLACEHOLDERS': False,
+            'IMAGE_ATTRIBUTES_EAGER_COUNT': 1,
             'IMAGE_THUMBNAIL_FORMAT': '{name}.thumbnail{ext}',
             'INDEXES_TITLE': "",
             'INDEXES_PAGES': "",
@@ -556,7 +570,9 @@ class Nikola:
             'POSTS': (("posts/*.txt", "posts", "post.tmpl"),),
             'PRESERVE_EXIF_DATA': False,
             'PRESERVE_ICC_PROFILES': False,
+            'OPTIMIZE_SVG_IMAGES': False,
             'PAGES': (("pages/*.txt", "pages", "page.tmpl"),),
+            'PANDOC_BATCH': False,
             'PANDOC_OPTIONS': [],
             'PRETTY_URLS': True,
             'FUTURE_IS_NOW': False,
@@ -577,6 +593,7 @@ class Nikola:
             'RSS_PATH': '',
             'RSS_FILENAME_BASE': 'rss',
             'SEARCH_FORM': '',
+            'SHORTCODE_CACHE': False,
             'SHOW_BLOG_TITLE': True,
             'SHOW_INDEX_PAGE_NAVIGATION': False,
             'SHOW_SOURCELINK': True,
@@ -628,7 +645,10 @@ class Nikola:
         }
 
         # set global_context for template rendering
-        self._GLOBAL_CONTEXT = {}
+        self._GLOBAL_CONTEXT = utils.VersionedDict()
+        # Values computed from the global context, as (version, value) pairs by language
+        self._shortcode_contexts = {}
+        self._template_language_layers = {}
 
         # dependencies for all pages, not included in global context
         self.ALL_PAGE_DEPS = {}
@@ -995,6 +1015,18 @@ class Nikola:
             self.state._set_site(self)
             self.cache._set_site(self)
 
+        # Highlighted code is shared by all compilers and listings.  The cache
+        # is process-wide, so it follows the last site created, and is only
+        # enabled for sites loaded from conf.py.
+        if self.configured and self.configuration_filename:
+            utils.HIGHLIGHT_CACHE.folder = os.path.abspath(os.path.join(self.config['CACHE_FOLDER'], 'highlight'))
+            utils.HIGHLIGHT_CACHE.prune()
+        else:
+            utils.HIGHLIGHT_CACHE.folder = None
+
+        # Theme and files folders are indexed once per site.
+        utils.ASSET_INDEX.clear()
+
         # WebP files have no official MIME type yet, but we need to recognize them (Issue #3671)
         mimetypes.add_type('image/webp', '.webp')
 
@@ -1038,7 +1070,11 @@ class Nikola:
         ] + [path for path in extra_plugins_dirs if path]
         self._plugin_places = [pathlib.Path(p) for p in self._plugin_places]
 
-        self.plugin_manager = PluginManager(plugin_places=self._plugin_places)
+        # The parsed .plugin files are cached for sites loaded from conf.py.
+        manifest_path = None
+        if self.configured and self.configuration_filename:
+            manifest_path = pathlib.Path(os.path.abspath(os.path.join(self.config['CACHE_FOLDER'], 'plugin_manifest.json')))
+        self.plugin_manager = PluginManager(plugin_places=self._plugin_places, manifest_path=manifest_path)
 
         compilers = defaultdict(set)
         # Also add aliases for combinations with TRANSLATIONS_PATTERN
@@ -1083,7 +1119,7 @@ class Nikola:
                 good_candidates.add(p)
 
         good_candidates = self._filter_duplicate_plugins(good_candidates)
-        self.plugin_manager.load_plugins(good_candidates)
+        self.plugin_manager.load_plugins(good_candidates, lazy=True)
 
         # Search for compiler plugins which we disabled but shouldn't have
         self._activate_plugins_of_category("PostScanner")
@@ -1115,7 +1151,7 @@ class Nikola:
                     utils.LOGGER.debug('Not loading compiler extension %s', p.name)
             if to_add:
                 extra_candidates = self._filter_duplicate_plugins(to_add)
-                self.plugin_manager.load_plugins(extra_candidates)
+                self.plugin_manager.load_plugins(extra_candidates, lazy=True)
 
         # Jupyter theme configuration.  If a website has ipynb enabled in post_pages
         # we should enable the Jupyter CSS (leaving that up to the theme itself).
@@ -1142,16 +1178,16 @@ class Nikola:
         # Emit signal for SignalHandlers which need to start running immediately.
         signal('sighandlers_loaded').send(self)
 
-        self._commands = {}
-
-        command_plugins = self._activate_plugins_of_category("Command")
-        for plugin_info in command_plugins:
-            plugin_info.plugin_object.short_help = plugin_info.description
-            self._commands[plugin_info.name] = plugin_info.plugin_object
+        if not commands_only:
+            utils.use_nikola_pygments_formatter()
 
-        self._activate_plugins_of_category("Task")
-        self._activate_plugins_of_category("LateTask")
-        self._activate_plugins_of_category("TaskMultiplier")
+        # Commands and tasks are imported and activated only when used
+        self._commands = {}
+        self.plugin_manager.on_import("Command", self._activate_command)
+        for plugin_info in self.plugin_manager.get_plugins_of_category("Command", load=False):
+            self._commands[plugin_info.name] = plugin_info
+        for category in DEFERRED_PLUGIN_CATEGORIES:
+            self.plugin_manager.on_import(category, self._activate_plugin)
 
         # Activate all required compiler plugins
         self.compiler_extensions = self._activate_plugins_of_category("CompilerExtension")
@@ -1191,6 +1227,16 @@ class Nikola:
                     if args:
                         actions[i] = functools.partial(f, **args)
 
+        # Cache the output of pure shortcodes between builds
+        if self.config['SHORTCODE_CACHE']:
+            try:
+                salt = json.dumps([__version__, self.config], cls=utils.CustomEncoder, sort_keys=True)
+            except (TypeError, ValueError) as e:
+                utils.LOGGER.warning('Cannot enable SHORTCODE_CACHE, the configuration cannot be serialized: {0}'.format(e))
+            else:
+                self.shortcode_cache = shortcodes.ShortcodeCache(
+                    os.path.join(self.config['CACHE_FOLDER'], 'shortcodes'), salt)
+
         # Signal that we are configured
         signal('configured').send(self)
 
@@ -1311,7 +1357,11 @@ class Nikola:
         self.ALL_PAGE_DEPS['feed_read_more_link'] = self.config.get('FEED_READ_MORE_LINK')
 
     def _activate_plugin(self, plugin_info: PluginInfo) -> None:
+        path_handlers = set(self.path_handlers)
         plugin_info.plugin_object.set_site(self)
+        if plugin_info.category in DEFERRED_PLUGIN_CATEGORIES:
+            for kind in set(self.path_handlers) - path_handlers:
+                self._get_path_handler_plugins()[kind] = [plugin_info.category, plugin_info.name]
 
         if plugin_info.category == "TemplateSystem" or self._loading_commands_only:
             return
@@ -1324,6 +1374,37 @@ class Nikola:
             if candidate.exists() and candidate.is_dir():
                 self.template_system.inject_directory(str(candidate))
 
+    def _activate_command(self, plugin_info: PluginInfo) -> None:
+        self._activate_plugin(plugin_info)
+        plugin_info.plugin_object.short_help = plugin_info.description
+
+    def _activate_deferred_plugins(self) -> None:
+        """Import and activate all task plugins, which are otherwise loaded when tasks are generated."""
+        for category in DEFERRED_PLUGIN_CATEGORIES:
+            self.plugin_manager.get_plugins_of_category(category)
+
+    def _get_path_handler_plugins(self) -> dict:
+        """Return which task plugins register which path handlers, as remembered in the cache."""
+        if self._path_handler_plugins is None:
+            self._path_handler_plugins = (self.cache.get('path_handler_plugins') if self.configured else None) or {}
+        return self._path_handler_plugins
+
+    def _activate_path_handler_plugin(self, kind) -> None:
+        """Import and activate the task plugin that handles paths of the given kind.
+
+        If that plugin is not known (from an earlier run), all task plugins are
+        activated, and the plugins that register path handlers are remembered.
+        """
+        known = self._get_path_handler_plugins().get(kind)
+        if known is not None:
+            self.plugin_manager.get_plugin_by_name(known[1], known[0])
+            if kind in self.path_handlers:
+                return
+        before = dict(self._get_path_handler_plugins())
+        self._activate_deferred_plugins()
+        if self.configured and self._path_handler_plugins != before:
+            self.cache.set('path_handler_plugins', self._path_handler_plugins)
+
     def _activate_plugins_of_category(self, category) -> list[PluginInfo]:
         """Activate all the plugins of a given category and return them."""
         # this code duplicated in tests/base.py
@@ -1358,10 +1439,14 @@ class Nikola:
     def _get_messages(self):
         try:
             if self._MESSAGES is None:
+                cache_path = None
+                if self.configured and self.configuration_filename:
+                    cache_path = os.path.abspath(os.path.join(self.config['CACHE_FOLDER'], 'messages.json'))
                 self._MESSAGES = utils.load_messages(self.THEMES,
                                                      self.translations,
                                                      self.default_lang,
-                                                     themes_dirs=self.themes_dirs)
+                                                     themes_dirs=self.themes_dirs,
+                                                     cache_path=cache_path)
             return self._MESSAGES
         except utils.LanguageNotFoundError as e:
             utils.LOGGER.error('''Cannot load language "{0}".  Please make sure it is supported by Nikola itself, or that you have the appropriate messages files in your themes.'''.format(e.lang))
@@ -1389,6 +1474,22 @@ class Nikola:
 
     GLOBAL_CONTEXT = property(_get_global_context)
 
+    def invalidate_post_index(self):
+        """Drop the post index, so that it is built again when it is used next.
+
+        Call this after changing posts in the timeline (like their tags or
+        slugs); replacing the timeline is detected automatically.
+        """
+        self._post_index = None
+
+    def _get_post_index(self):
+        """Return a PostIndex for the timeline, indexing it again if it changed."""
+        if self._post_index is None or not self._post_index.is_for(self.timeline):
+            self._post_index = PostIndex(self.timeline)
+        return self._post_index
+
+    post_index = property(_get_post_index)
+
     def _get_template_system(self):
         if self._template_system is None:
             # Load template plugin
@@ -1466,24 +1567,35 @@ class Nikola:
         If ``is_fragment`` is set to ``True``, a HTML fragment will
         be rendered and not a whole HTML document.
         """
+        import lxml.html
         if "post" in context and context["post"] is not None:
             utils.TEMPLATES_LOGGER.debug("For %s, template %s builds %s", context["post"].source_path, template_name, output_name)
         else:
             utils.TEMPLATES_LOGGER.debug("Template %s builds %s", template_name, output_name)
-        local_context: dict[str, Any] = {}
-        local_context["template_name"] = template_name
-        local_context.update(self.GLOBAL_CONTEXT)
-        local_context.update(context)
+        global_context = self.GLOBAL_CONTEXT
+        lang = context['lang'] if 'lang' in context else global_context['lang']
+        # The context is layered: the global context, then the values that
+        # only depend on the language (computed once per language), then
+        # the page's own values.  Both template engines copy the context
+        # they are given, so the layers are merged into a plain dict.
+        overlay = dict(context)
         for k in self._GLOBAL_CONTEXT_TRANSLATABLE:
-            local_context[k] = local_context[k](local_context['lang'])
-        local_context['is_rtl'] = local_context['lang'] in LEGAL_VALUES['RTL_LANGUAGES']
-        local_context['url_type'] = self.config['URL_TYPE'] if url_type is None else url_type
-        local_context["translations_feedorder"] = sorted(
-            local_context["translations"],
-            key=lambda x: (int(x != local_context['lang']), x)
-        )
-        # string, arguments
-        local_context["formatmsg"] = lambda s, *a: s % a
+            if k in overlay:
+                overlay[k] = overlay[k](lang)
+        language_layer = self._get_template_language_layer(lang)
+        for k in language_layer.keys() & overlay.keys():
+            if k not in self._GLOBAL_CONTEXT_TRANSLATABLE:
+                del overlay[k]
+        if 'translations' in overlay:
+            overlay['translations_feedorder'] = sorted(overlay['translations'], key=lambda x: (int(x != lang), x))
+        else:
+            # Each page gets its own list, as it did before the layer existed.
+            overlay['translations_feedorder'] = list(language_layer['translations_feedorder'])
+        overlay['url_type'] = self.config['URL_TYPE'] if url_type is None else url_type
+        local_context: dict[str, Any] = {"template_name": template_name}
+        local_context.update(global_context)
+        local_context.update(language_layer)
+        local_context.update(overlay)
         for h in local_context['template_hooks'].values():
             h.context = context
 
@@ -1524,6 +1636,28 @@ class Nikola:
         with open(output_name, "wb+") as post_file:
             post_file.write(data)
 
+    def _get_template_language_layer(self, lang):
+        """Return the template context values that only depend on lang.
+
+        Translatable global context values are resolved for lang, and
+        is_rtl, translations_feedorder and formatmsg are added.  The result
+        is computed again when the global context is changed.
+        """
+        global_context = self.GLOBAL_CONTEXT
+        version, layer = self._template_language_layers.get(lang, (None, None))
+        if version == global_context.version:
+            return layer
+        layer = {k: global_context[k](lang) for k in self._GLOBAL_CONTEXT_TRANSLATABLE}
+        layer['is_rtl'] = lang in LEGAL_VALUES['RTL_LANGUAGES']
+        layer['translations_feedorder'] = sorted(
+            global_context['translations'],
+            key=lambda x: (int(x != lang), x)
+        )
+        # string, arguments
+        layer['formatmsg'] = lambda s, *a: s % a
+        self._template_language_layers[lang] = (global_context.version, layer)
+        return layer
+
     def rewrite_links(self, doc, src, lang, url_type=None):
         """Replace links in document to point to the right places."""
         # First let lxml replace most of them
@@ -1681,18 +1815,20 @@ class Nikola:
 
         """
         def render_shortcode(*args, **kw):
-            context = self.GLOBAL_CONTEXT.copy()
+            lang = utils.LocaleBorg().current_lang
+            context = self._get_shortcode_context(lang).copy()
             context.update(kw)
             context['_args'] = args
-            context['lang'] = utils.LocaleBorg().current_lang
-            for k in self._GLOBAL_CONTEXT_TRANSLATABLE:
-                context[k] = context[k](context['lang'])
+            context['lang'] = lang
             output = self.template_system.render_template_to_string(t_data, context)
             if fname is not None:
                 dependencies = [fname] + self.template_system.get_deps(fname, context)
             else:
                 dependencies = []
             return output, dependencies
+        # Templates can use anything in the global context (like _link), so
+        # they are only cached if they say they are pure, in a comment
+        render_shortcode.nikola_shortcode_pure = bool(re.search(r'\bnikola_shortcode_pure\b', t_data))
         return render_shortcode
 
     def _register_templated_shortcodes(self):
@@ -1721,14 +1857,29 @@ class Nikola:
                     self.register_shortcode(name, self._make_renderfunc(
                         fd.read(), os.path.join(sc_dir, fname)))
 
+    def _get_shortcode_context(self, lang):
+        """Return the global context for template shortcodes in lang.
+
+        Translatable values are resolved once per language.  The result is
+        computed again when the global context is changed.
+        """
+        global_context = self.GLOBAL_CONTEXT
+        version, context = self._shortcode_contexts.get(lang, (None, None))
+        if version == global_context.version:
+            return context
+        context = global_context.copy()
+        for k in self._GLOBAL_CONTEXT_TRANSLATABLE:
+            context[k] = context[k](lang)
+        self._shortcode_contexts[lang] = (global_context.version, context)
+        return context
+
     def _template_shortcode_handler(self, *args, **kw):
         t_data = kw.pop('data', '')
-        context = self.GLOBAL_CONTEXT.copy()
+        lang = utils.LocaleBorg().current_lang
+        context = self._get_shortcode_context(lang).copy()
         context.update(kw)
         context['_args'] = args
-        context['lang'] = utils.LocaleBorg().current_lang
-        for k in self._GLOBAL_CONTEXT_TRANSLATABLE:
-            context[k] = context[k](context['lang'])
+        context['lang'] = lang
         output = self.template_system.render_template_to_string(t_data, context)
         dependencies = self.template_system.get_string_deps(t_data, context)
         return output, dependencies
@@ -1746,7 +1897,7 @@ class Nikola:
             extra_context = {}
         if lang is None:
             lang = utils.LocaleBorg().current_lang
-        return shortcodes.apply_shortcodes(data, self.shortcode_registry, self, filename, lang=lang, extra_context=extra_context)
+        return shortcodes.apply_shortcodes(data, self.shortcode_registry, self, filename, lang=lang, extra_context=extra_context, cache=self.shortcode_cache)
 
     def apply_shortcodes_uuid(self, data, _shortcodes, filename=None, lang=None, extra_context=None):
         """Apply shortcodes from the registry on data."""
@@ -1756,12 +1907,13 @@ class Nikola:
             extra_context = {}
         deps = []
         for k, v in _shortcodes.items():
-            replacement, _deps = shortcodes.apply_shortcodes(v, self.shortcode_registry, self, filename, lang=lang, extra_context=extra_context)
+            replacement, _deps = shortcodes.apply_shortcodes(v, self.shortcode_registry, self, filename, lang=lang, extra_context=extra_context, cache=self.shortcode_cache)
             data = data.replace(k, replacement)
             deps.extend(_deps)
         return data, deps
 
     def _get_rss_copyright(self, lang, rss_plain):
+        import lxml.html
         if rss_plain:
             return (
                 self.config['RSS_COPYRIGHT_PLAIN'](lang) or
@@ -1773,6 +1925,9 @@ class Nikola:
                          rss_teasers, rss_plain, feed_length=10, feed_url=None,
                          enclosure=_enclosure, rss_links_append_query=None, copyright_=None):
         """Generate an ExtendedRSS2 feed object for later use."""
+        import lxml.etree
+        import lxml.html
+        import PyRSS2Gen as rss
         rss_obj = utils.ExtendedRSS2(
             title=title,
             link=utils.encodelink(link),
@@ -1903,6 +2058,9 @@ class Nikola:
         if lang is None:
             lang = utils.LocaleBorg().current_lang
 
+        if kind not in self.path_handlers and getattr(self, 'plugin_manager', None) is not None:
+            # Task plugins register their path handlers when activated
+            self._activate_path_handler_plugin(kind)
         try:
             path = self.path_handlers[kind](name, lang, **kwargs)
         except KeyError:
@@ -1966,7 +2124,7 @@ class Nikola:
 
         link://slug/yellow-camaro => /posts/cars/awful/yellow-camaro/index.html
         """
-        results = [p for p in self.timeline if p.meta('slug') == name]
+        results = self.post_index.with_slug(name, utils.LocaleBorg().current_lang)
         if not results:
             utils.LOGGER.warning("Cannot resolve path request for slug: {0}".format(name))
         else:
@@ -1981,7 +2139,7 @@ class Nikola:
 
         link://slug_source/yellow-camaro => /posts/cars/awful/yellow-camaro.rst
         """
-        results = [p for p in self.timeline if p.meta('slug') == name]
+        results = self.post_index.with_slug(name, utils.LocaleBorg().current_lang)
         if not results:
             utils.LOGGER.warning("Cannot resolve path request for slug: {0}".format(name))
         else:
@@ -1996,7 +2154,7 @@ class Nikola:
 
         link://filename/manual.txt => /docs/handbook.html
         """
-        results = [p for p in self.timeline if p.source_path == name]
+        results = self.post_index.with_source_path(name)
         if not results:
             utils.LOGGER.warning("Cannot resolve path request for filename: {0}".format(name))
         else:
@@ -2112,6 +2270,9 @@ class Nikola:
                         task_dep.append('{0}_{1}'.format(name, multi.plugin_object.name))
             if pluginInfo.plugin_object.is_default:
                 task_dep.append(pluginInfo.plugin_object.name)
+        if self._template_system is not None:
+            # The tasks have collected their template dependencies
+            self._template_system.save_caches()
         yield {
             'basename': name,
             'doc': doc,
@@ -2120,6 +2281,41 @@ class Nikola:
             'task_dep': task_dep
         }
 
+    def set_doit_tasks(self, tasks, dep_manager, selected):
+        """Remember the tasks loaded by doit, and which of them were selected."""
+        self._doit_tasks = {task.name: task for task in tasks}
+        self._doit_dep_manager = dep_manager
+        self._doit_selected = set()
+        creators = {target: task.name for task in tasks for target in task.targets}
+        pending = list(selected or [])
+        while pending:
+            name = pending.pop()
+            if name in self._doit_selected:
+                continue
+            task = self._doit_tasks.get(name)
+            if task is None:
+                # Wildcards and the like, assume that any task may run
+                self._doit_selected = None
+                return
+            self._doit_selected.add(name)
+            pending.extend(task.task_dep)
+            pending.extend(task.setup_tasks)
+            pending.extend(creators[dep] for dep in task.file_dep if dep in creators)
+
+    def task_will_run(self, name):
+        """Check if doit will run the task with the given name in this build.
+
+        Returns None if that is not known, like when the site is not built
+        by doit. Tasks are checked before running the tasks they depend on,
+        so tasks may still run if this returns False.
+        """
+        task = self._doit_tasks.get(name)
+        if task is None or self._doit_dep_manager is None:
+            return None
+        if self._doit_selected is not None and name not in self._doit_selected:
+            return False
+        return self._doit_dep_manager.get_status(task, self._doit_tasks).status != 'up-to-date'
+
     def parse_category_name(self, category_name):
         """Parse a category name into a hierarchy."""
         if self.config['CATEGORY_ALLOW_HIERARCHIES']:
@@ -2152,6 +2348,7 @@ class Nikola:
 
     def _sort_category_hierarchy(self):
         """Sort category hierarchy."""
+        import natsort
         # First create a hierarchy of TreeNodes
         self.category_hierarchy_lookup = {}
 
@@ -2178,6 +2375,7 @@ class Nikola:
 
         This function also takes priority, title and source path into account.
         """
+        import natsort
         # Last tie breaker: sort by source path (A-Z)
         posts = sorted(posts, key=lambda p: p.source_path)
         # Next tie breaker: sort by title if language is given (A-Z)
@@ -2211,6 +2409,7 @@ class Nikola:
         self.post_per_input_file = {}
         self.timeline = []
         self.pages = []
+        self.invalidate_post_index()
 
         for p in sorted(self.plugin_manager.get_plugins_of_category('PostScanner'), key=operator.attrgetter('name')):
             try:
@@ -2438,6 +2637,9 @@ class Nikola:
 
         Feeds are considered archives when no future updates to them are expected.
         """
+        import lxml.etree
+        import lxml.html
+
         def atom_link(link_rel, link_type, link_href):
             link = lxml.etree.Element("link")
             link.set("rel", link_rel)
@@ -250,6 +250,10 @@ class TemplateSystem(BasePlugin):
         """Get the path to a template or return None."""
         raise NotImplementedError()
 
+    def save_caches(self) -> None:
+        """Save the caches filled while finding dependencies, if any."""
+        pass
+
 
 class TaskMultiplier(BasePlugin):
     """Take a task and return *more* tasks."""
@@ -283,6 +287,22 @@ class PageCompiler(BasePlugin):
     }
     config_dependencies = []
 
+    def get_versions(self) -> dict[str, str]:
+        """Return the versions of the libraries and tools used by this compiler.
+
+        Compiled fragments cached in ``FRAGMENT_CACHE_FOLDER`` are not reused
+        when these change.
+        """
+        return {}
+
+    def get_config_options(self) -> dict[str, Any]:
+        """Return the values of the configuration options used by this compiler.
+
+        Compiled fragments cached in ``FRAGMENT_CACHE_FOLDER`` are not reused
+        when these change.
+        """
+        return {}
+
     def get_dep_filename(self, post: Post, lang: str) -> str:
         """Return the .dep file's name for the given post and language."""
         return post.translated_base_path(lang) + '.dep'
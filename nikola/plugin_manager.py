@@ -27,19 +27,25 @@
 """The Nikola plugin manager. Inspired by yapsy."""
 
 import configparser
+import dataclasses
+import hashlib
 import importlib
 import importlib.util
+import json
 import logging
+import os
+import stat
 import sys
 import time
 
 from collections import deque
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, Optional
+from typing import Callable, Iterable, Optional
 
+from . import __version__
 from .plugin_categories import BasePlugin, CATEGORIES
-from .utils import get_logger
+from .utils import get_logger, write_json_atomic
 
 
 LEGACY_PLUGIN_NAMES: dict[str, str] = {
@@ -52,6 +58,15 @@ CATEGORY_NAMES: set[str] = set(CATEGORIES.keys())
 CATEGORY_TYPES: set[type[BasePlugin]] = set(CATEGORIES.values())
 
 
+def _dir_mtime(path) -> Optional[int]:
+    """Return the modification time of a directory, or None if it is not a directory."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns if stat.S_ISDIR(st.st_mode) else None
+
+
 @dataclass(frozen=True)
 class PluginCandidate:
     """A candidate plugin that was located but not yet loaded (imported)."""
@@ -66,21 +81,80 @@ class PluginCandidate:
     module_name: str
 
 
-@dataclass(frozen=True)
 class PluginInfo:
-    """A plugin that was loaded (imported)."""
-
-    name: str
-    description: Optional[str]
-    friendly_name: str
-    plugin_id: str
-    category: str
-    compiler: Optional[str]
-    source_dir: Path
-    py_file_location: Path
-    module_name: str
-    module_object: object
-    plugin_object: BasePlugin
+    """A plugin that was loaded.
+
+    The plugin module is imported, and the plugin object is created, the first
+    time module_object or plugin_object is used, or when load() is called.
+    Plugins created with a module_object and a plugin_object (as in earlier
+    versions, when PluginInfo was a frozen dataclass) are already loaded.
+    """
+
+    _fields = ("name", "description", "friendly_name", "plugin_id", "category", "compiler",
+               "source_dir", "py_file_location", "module_name")
+
+    def __init__(self, name: str, description: Optional[str], friendly_name: str, plugin_id: str,
+                 category: str, compiler: Optional[str], source_dir: Path, py_file_location: Path,
+                 module_name: str, module_object: Optional[object] = None,
+                 plugin_object: Optional[BasePlugin] = None, *, full_module_name: Optional[str] = None,
+                 manager: Optional["PluginManager"] = None):
+        """Initialize the plugin information."""
+        self.name = name
+        self.description = description
+        self.friendly_name = friendly_name
+        self.plugin_id = plugin_id
+        self.category = category
+        self.compiler = compiler
+        self.source_dir = source_dir
+        self.py_file_location = py_file_location
+        self.module_name = module_name
+        self.full_module_name = full_module_name or module_name
+        self.manager = manager
+        self._module_object = module_object
+        self._plugin_object = plugin_object
+        self._failed = False
+
+    def _key(self) -> tuple:
+        """Return the values compared by __eq__, without importing the plugin."""
+        return tuple(getattr(self, f) for f in self._fields) + (self._module_object, self._plugin_object)
+
+    def __eq__(self, other):
+        """Compare plugins by their fields, like the former dataclass did."""
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self):
+        """Hash the plugin by the fields that do not change when it is loaded."""
+        return hash((self.name, self.plugin_id, self.category, self.py_file_location))
+
+    def __repr__(self):
+        """Return a representation like the former dataclass had."""
+        fields = ", ".join(f"{f}={getattr(self, f)!r}" for f in self._fields)
+        return f"{self.__class__.__name__}({fields})"
+
+    @property
+    def loaded(self) -> bool:
+        """Check if the plugin was imported successfully."""
+        return self._plugin_object is not None
+
+    def load(self) -> bool:
+        """Import the plugin if needed. Returns False if the plugin cannot be loaded."""
+        if self._plugin_object is None and not self._failed and self.manager is not None:
+            self.manager._import_plugin(self)
+        return self._plugin_object is not None
+
+    @property
+    def module_object(self) -> Optional[object]:
+        """Get the plugin module, importing it if needed."""
+        self.load()
+        return self._module_object
+
+    @property
+    def plugin_object(self) -> Optional[BasePlugin]:
+        """Get the plugin object, importing the plugin if needed."""
+        self.load()
+        return self._plugin_object
 
 
 class PluginManager:
@@ -92,78 +166,172 @@ class PluginManager:
     candidates: list[PluginCandidate]
     plugins: list[PluginInfo]
     _plugins_by_category: dict[str, list[PluginInfo]]
+    _import_callbacks: dict[str, list[Callable[[PluginInfo], None]]]
     has_warnings: bool = False
 
-    def __init__(self, plugin_places: list[Path]):
-        """Initialize the plugin manager."""
+    def __init__(self, plugin_places: list[Path], manifest_path: Optional[Path] = None):
+        """Initialize the plugin manager.
+
+        If manifest_path is set, the parsed .plugin files are stored there
+        and reused by later runs, as long as the plugin directories and files
+        did not change.
+        """
         self.plugin_places = plugin_places
+        self.manifest_path = manifest_path
         self.candidates = []
         self.plugins = []
         self._plugins_by_category = {}
+        self._import_callbacks = {}
         self.logger = get_logger("PluginManager")
 
     def locate_plugins(self) -> list[PluginCandidate]:
         """Locate plugins in plugin_places."""
         self.candidates = []
 
-        plugin_folders: deque = deque([place for place in self.plugin_places if place.exists() and place.is_dir()])
+        manifest = self._load_manifest()
+        plugin_files = self._cached_plugin_files(manifest)
+        if plugin_files is None:
+            plugin_files, dir_mtimes = self._walk_plugin_places()
+        else:
+            dir_mtimes = manifest["dirs"]
+
+        cached_files = manifest["files"]
+        files = {}
+        for plugin_file in plugin_files:
+            entry = self._read_plugin_file(plugin_file, cached_files.get(str(plugin_file)))
+            files[str(plugin_file)] = entry
+            for message in entry["warnings"]:
+                self.logger.warning(message)
+                self.has_warnings = True
+            if entry["candidate"] is not None:
+                candidate = PluginCandidate(**dict(entry["candidate"], source_dir=Path(entry["candidate"]["source_dir"])))
+                self.logger.debug(f"Discovered {candidate.plugin_id}")
+                self.candidates.append(candidate)
+
+        new_manifest = {
+            "version": __version__,
+            "places": [str(place) for place in self.plugin_places],
+            "dirs": dir_mtimes,
+            "files": files,
+        }
+        if new_manifest != manifest:
+            self._save_manifest(new_manifest)
+        return self.candidates
+
+    def _walk_plugin_places(self) -> tuple[list[Path], dict[str, Optional[int]]]:
+        """Find .plugin files in plugin_places, and the modification times of all directories looked at."""
+        dir_mtimes: dict[str, Optional[int]] = {}
+        plugin_folders: deque = deque()
+        for place in self.plugin_places:
+            # Missing places are remembered too, in case they are created later.
+            dir_mtimes[str(place)] = _dir_mtime(place)
+            if dir_mtimes[str(place)] is not None:
+                plugin_folders.append(place)
+
         plugin_files: list[Path] = []
         while plugin_folders:
             base_folder = plugin_folders.popleft()
+            dir_mtimes[str(base_folder)] = _dir_mtime(base_folder)
             items = list(base_folder.iterdir())
             plugin_folders.extend([item for item in items if item.is_dir() and item.name != "__pycache__"])
             plugin_files.extend([item for item in items if item.suffix == ".plugin" and not item.is_dir()])
-
-        for plugin_file in plugin_files:
-            source_dir = plugin_file.parent
-            config = configparser.ConfigParser()
-            config.read(plugin_file)
-            name = config["Core"]["name"]
-            module_name = config["Core"]["module"]
-            plugin_id = f"Plugin {name} from {plugin_file}"
-            description = None
-            if "Documentation" in config:
-                description = config["Documentation"].get("Description")
-            if "Nikola" not in config:
-                self.logger.warning(f"{plugin_id} does not specify Nikola configuration - plugin will not be loaded")
-                self.logger.warning("Please add a [Nikola] section to the {plugin_file} file with a PluginCategory entry")
-                self.has_warnings = True
-                continue
-            category = config["Nikola"].get("PluginCategory")
-            compiler = config["Nikola"].get("Compiler")
-            friendly_name = config["Nikola"].get("friendlyname") or name
-            if not category:
-                self.logger.warning(f"{plugin_id} does not specify any category (Nikola.PluginCategory is missing in .plugin file) - plugin will not be loaded")
-                self.has_warnings = True
-                continue
-            if category in LEGACY_PLUGIN_NAMES:
-                category = LEGACY_PLUGIN_NAMES[category]
-            if category not in CATEGORY_NAMES:
-                self.logger.warning(f"{plugin_id} specifies invalid category '{category}' in the .plugin file - plugin will not be loaded")
-                self.has_warnings = True
-                continue
-            self.logger.debug(f"Discovered {plugin_id}")
-            self.candidates.append(
-                PluginCandidate(
-                    name=name,
-                    description=description,
-                    friendly_name=friendly_name,
-                    plugin_id=plugin_id,
-                    category=category,
-                    compiler=compiler,
-                    source_dir=source_dir,
-                    module_name=module_name,
-                )
-            )
-        return self.candidates
-
-    def load_plugins(self, candidates: Iterable[PluginCandidate]) -> list[PluginInfo]:
-        """Load selected candidate plugins."""
+        return plugin_files, dir_mtimes
+
+    def _cached_plugin_files(self, manifest: dict) -> Optional[list[Path]]:
+        """Return the .plugin files from the manifest, or None if any plugin directory changed."""
+        if not manifest["dirs"] or manifest["places"] != [str(place) for place in self.plugin_places]:
+            return None
+        for folder, mtime in manifest["dirs"].items():
+            if _dir_mtime(folder) != mtime:
+                return None
+        return [Path(plugin_file) for plugin_file in manifest["files"]]
+
+    def _read_plugin_file(self, plugin_file: Path, cached: Optional[dict]) -> dict:
+        """Parse a .plugin file, or reuse the cached entry if the file did not change."""
+        st = plugin_file.stat()
+        stamp = [st.st_mtime_ns, st.st_size]
+        if cached is not None and cached["stamp"] == stamp:
+            return cached
+        data = plugin_file.read_bytes()
+        sha256 = hashlib.sha256(data).hexdigest()
+        if cached is not None and cached["sha256"] == sha256:
+            return dict(cached, stamp=stamp)
+
+        candidate, warnings = self._parse_plugin_file(plugin_file, data.decode("utf-8"))
+        if candidate is not None:
+            candidate = dataclasses.asdict(candidate)
+            candidate["source_dir"] = str(candidate["source_dir"])
+        return {"stamp": stamp, "sha256": sha256, "candidate": candidate, "warnings": warnings}
+
+    def _parse_plugin_file(self, plugin_file: Path, text: str) -> tuple[Optional[PluginCandidate], list[str]]:
+        """Parse the contents of a .plugin file into a candidate and a list of warnings."""
+        source_dir = plugin_file.parent
+        config = configparser.ConfigParser()
+        config.read_string(text, str(plugin_file))
+        name = config["Core"]["name"]
+        module_name = config["Core"]["module"]
+        plugin_id = f"Plugin {name} from {plugin_file}"
+        description = None
+        if "Documentation" in config:
+            description = config["Documentation"].get("Description")
+        if "Nikola" not in config:
+            return None, [
+                f"{plugin_id} does not specify Nikola configuration - plugin will not be loaded",
+                f"Please add a [Nikola] section to the {plugin_file} file with a PluginCategory entry",
+            ]
+        category = config["Nikola"].get("PluginCategory")
+        compiler = config["Nikola"].get("Compiler")
+        friendly_name = config["Nikola"].get("friendlyname") or name
+        if not category:
+            return None, [f"{plugin_id} does not specify any category (Nikola.PluginCategory is missing in .plugin file) - plugin will not be loaded"]
+        if category in LEGACY_PLUGIN_NAMES:
+            category = LEGACY_PLUGIN_NAMES[category]
+        if category not in CATEGORY_NAMES:
+            return None, [f"{plugin_id} specifies invalid category '{category}' in the .plugin file - plugin will not be loaded"]
+        return PluginCandidate(
+            name=name,
+            description=description,
+            friendly_name=friendly_name,
+            plugin_id=plugin_id,
+            category=category,
+            compiler=compiler,
+            source_dir=source_dir,
+            module_name=module_name,
+        ), []
+
+    def _load_manifest(self) -> dict:
+        """Load the plugin manifest, or return an empty one."""
+        empty = {"version": __version__, "places": [], "dirs": {}, "files": {}}
+        if self.manifest_path is None:
+            return empty
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as inf:
+                manifest = json.load(inf)
+        except (OSError, ValueError):
+            return empty
+        if not isinstance(manifest, dict) or manifest.get("version") != __version__ or set(manifest) != set(empty):
+            return empty
+        return manifest
+
+    def _save_manifest(self, manifest: dict) -> None:
+        """Write the plugin manifest atomically."""
+        if self.manifest_path is None:
+            return
+        try:
+            write_json_atomic(self.manifest_path, manifest)
+        except OSError as e:
+            self.logger.debug(f"Cannot write plugin manifest {self.manifest_path}: {e}")
+
+    def load_plugins(self, candidates: Iterable[PluginCandidate], lazy: bool = False) -> list[PluginInfo]:
+        """Load selected candidate plugins.
+
+        If lazy is True, the plugins are only registered, and each of them is
+        imported the first time it is used.
+        """
         plugins_root = Path(__file__).parent.parent
         new_plugins = []
 
         for candidate in candidates:
-            name = candidate.name
             module_name = candidate.module_name
             source_dir = candidate.source_dir
             py_file_location = source_dir / f"{module_name}.py"
@@ -175,7 +343,6 @@ class PluginManager:
                 self.has_warnings = True
                 continue
 
-            plugin_id += f" ({py_file_location})"
             full_module_name = module_name
 
             try:
@@ -188,47 +355,8 @@ class PluginManager:
             except ValueError:
                 pass
 
-            try:
-                spec = importlib.util.spec_from_file_location(full_module_name, py_file_location)
-                module_object = importlib.util.module_from_spec(spec)
-                if full_module_name not in sys.modules:
-                    sys.modules[full_module_name] = module_object
-                spec.loader.exec_module(module_object)
-            except Exception:
-                self.logger.exception(f"{plugin_id} threw an exception while loading")
-                self.has_warnings = True
-                continue
-
-            plugin_classes = [
-                c
-                for c in vars(module_object).values()
-                if isinstance(c, type) and issubclass(c, BasePlugin) and c not in CATEGORY_TYPES
-            ]
-            if len(plugin_classes) == 0:
-                self.logger.warning(f"{plugin_id} does not have any plugin classes - plugin will not be loaded")
-                self.has_warnings = True
-                continue
-            elif len(plugin_classes) > 1:
-                self.logger.warning(f"{plugin_id} has multiple plugin classes; this is not supported - plugin will not be loaded")
-                self.has_warnings = True
-                continue
-
-            plugin_class = plugin_classes[0]
-
-            if not issubclass(plugin_class, CATEGORIES[candidate.category]):
-                self.logger.warning(f"{plugin_id} has category '{candidate.category}' in the .plugin file, but the implementation class {plugin_class} does not inherit from this category - plugin will not be loaded")
-                self.has_warnings = True
-                continue
-
-            try:
-                plugin_object = plugin_class()
-            except Exception:
-                self.logger.exception(f"{plugin_id} threw an exception while creating the instance")
-                self.has_warnings = True
-                continue
-            self.logger.debug(f"Loaded {plugin_id}")
             info = PluginInfo(
-                name=name,
+                name=candidate.name,
                 description=candidate.description,
                 friendly_name=candidate.friendly_name,
                 plugin_id=candidate.plugin_id,
@@ -237,8 +365,8 @@ class PluginManager:
                 source_dir=source_dir,
                 py_file_location=py_file_location,
                 module_name=module_name,
-                module_object=module_object,
-                plugin_object=plugin_object,
+                full_module_name=full_module_name,
+                manager=self,
             )
             self.plugins.append(info)
             new_plugins.append(info)
@@ -247,6 +375,9 @@ class PluginManager:
         for plugin_info in self.plugins:
             self._plugins_by_category[plugin_info.category].append(plugin_info)
 
+        if not lazy:
+            new_plugins = [info for info in new_plugins if info.load()]
+
         if self.has_warnings:
             self.logger.warning("Some plugins failed to load. Please review the above warning messages.")
             # TODO remove following messages and delay in v8.3.1
@@ -256,14 +387,83 @@ class PluginManager:
 
         return new_plugins
 
-    def get_plugins_of_category(self, category: str) -> list[PluginInfo]:
-        """Get loaded plugins of a given category."""
+    def _import_plugin(self, info: PluginInfo) -> None:
+        """Import the module of a plugin and create the plugin object."""
+        plugin_id = f"{info.plugin_id} ({info.py_file_location})"
+        plugin_object = None
+        try:
+            spec = importlib.util.spec_from_file_location(info.full_module_name, info.py_file_location)
+            module_object = importlib.util.module_from_spec(spec)
+            if info.full_module_name not in sys.modules:
+                sys.modules[info.full_module_name] = module_object
+            spec.loader.exec_module(module_object)
+        except Exception:
+            self.logger.exception(f"{plugin_id} threw an exception while loading")
+        else:
+            plugin_object = self._create_plugin_object(info, plugin_id, module_object)
+
+        if plugin_object is None:
+            info._failed = True
+            self.has_warnings = True
+            self.plugins.remove(info)
+            if info in self._plugins_by_category.get(info.category, []):
+                self._plugins_by_category[info.category].remove(info)
+            return
+
+        self.logger.debug(f"Loaded {plugin_id}")
+        info._module_object = module_object
+        info._plugin_object = plugin_object
+        for callback in self._import_callbacks.get(info.category, []):
+            callback(info)
+
+    def _create_plugin_object(self, info: PluginInfo, plugin_id: str, module_object: object) -> Optional[BasePlugin]:
+        """Find the plugin class in an imported module and instantiate it."""
+        plugin_classes = [
+            c
+            for c in vars(module_object).values()
+            if isinstance(c, type) and issubclass(c, BasePlugin) and c not in CATEGORY_TYPES
+        ]
+        if len(plugin_classes) == 0:
+            self.logger.warning(f"{plugin_id} does not have any plugin classes - plugin will not be loaded")
+            return None
+        elif len(plugin_classes) > 1:
+            self.logger.warning(f"{plugin_id} has multiple plugin classes; this is not supported - plugin will not be loaded")
+            return None
+
+        plugin_class = plugin_classes[0]
+
+        if not issubclass(plugin_class, CATEGORIES[info.category]):
+            self.logger.warning(f"{plugin_id} has category '{info.category}' in the .plugin file, but the implementation class {plugin_class} does not inherit from this category - plugin will not be loaded")
+            return None
+
+        try:
+            return plugin_class()
+        except Exception:
+            self.logger.exception(f"{plugin_id} threw an exception while creating the instance")
+            return None
+
+    def on_import(self, category: str, callback: Callable[[PluginInfo], None]) -> None:
+        """Call callback with every plugin of a category once it is imported, including already imported ones."""
+        self._import_callbacks.setdefault(category, []).append(callback)
+        for plugin_info in list(self._plugins_by_category.get(category, [])):
+            if plugin_info.loaded:
+                callback(plugin_info)
+
+    def get_plugins_of_category(self, category: str, load: bool = True) -> list[PluginInfo]:
+        """Get loaded plugins of a given category.
+
+        Unless load is False, the plugins are imported first, and the ones
+        that cannot be imported are left out.
+        """
+        if load:
+            for p in list(self._plugins_by_category.get(category, [])):
+                p.load()
         return self._plugins_by_category.get(category, [])
 
     def get_plugin_by_name(self, name: str, category: Optional[str] = None) -> Optional[PluginInfo]:
         """Get a loaded plugin by name and optionally by category. Returns None if no such plugin is loaded."""
-        for p in self.plugins:
-            if p.name == name and (category is None or p.category == category):
+        for p in list(self.plugins):
+            if p.name == name and (category is None or p.category == category) and p.load():
                 return p
 
     # Aliases for Yapsy compatibility
@@ -271,7 +471,7 @@ class PluginManager:
     def getPluginsOfCategory(self, category: str) -> list[PluginInfo]:
         """Get loaded plugins of a given category."""
         self.logger.warning("Legacy getPluginsOfCategory method was used, it may be removed in the future. Please change it to get_plugins_of_category.")
-        return self._plugins_by_category.get(category, [])
+        return self.get_plugins_of_category(category)
 
     # TODO: remove in v9
     def getPluginByName(self, name: str, category: Optional[str] = None) -> Optional[PluginInfo]:
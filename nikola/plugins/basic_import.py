@@ -32,9 +32,6 @@ import datetime
 import os
 from urllib.parse import urlparse
 
-from lxml import etree, html
-from mako.template import Template
-
 from nikola import utils
 
 links = {}
@@ -64,6 +61,7 @@ class ImportMixin:
     @classmethod
     def get_channel_from_file(cls, filename):
         """Get channel from XML file."""
+        from lxml import etree
         tree = etree.fromstring(cls.read_xml_file(filename))
         channel = tree.find('channel')
         return channel
@@ -89,6 +87,7 @@ class ImportMixin:
 
     def generate_base_site(self):
         """Generate a base Nikola site."""
+        from mako.template import Template
         if not os.path.exists(self.output_folder):
             os.system('nikola init -q ' + self.output_folder)
         else:
@@ -118,6 +117,7 @@ class ImportMixin:
     @classmethod
     def write_content(cls, filename, content, rewrite_html=True):
         """Write content to file."""
+        from lxml import etree, html
         if rewrite_html:
             try:
                 doc = html.document_fromstring(content)
@@ -135,6 +135,7 @@ class ImportMixin:
     @classmethod
     def write_post(cls, filename, content, headers, compiler, rewrite_html=True):
         """Ask the specified compiler to write the post to disk."""
+        from lxml import etree, html
         if rewrite_html:
             try:
                 doc = html.document_fromstring(content)
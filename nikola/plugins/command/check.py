@@ -34,8 +34,6 @@ import time
 from collections import defaultdict
 from urllib.parse import unquote, urlparse, urljoin, urldefrag
 
-import lxml.html
-import requests
 from doit.loader import generate_tasks
 
 from nikola.plugin_categories import Command
@@ -193,6 +191,8 @@ class CommandCheck(Command):
 
     def analyze(self, fname, find_sources=False, check_remote=False, ignore_query_strings=False):
         """Analyze links on a page."""
+        import lxml.html
+        import requests
         rv = False
         self.whitelist = [re.compile(x) for x in self.site.config['LINK_CHECK_WHITELIST']]
         self.internal_redirects = [urljoin('/', _[0]) for _ in self.site.config['REDIRECTIONS']]
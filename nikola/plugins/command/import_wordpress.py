@@ -35,9 +35,6 @@ import sys
 from collections import defaultdict
 from urllib.parse import urlparse, unquote
 
-import requests
-from lxml import etree
-
 from nikola.plugin_categories import Command, CompilerExtension
 from nikola import utils, hierarchy_utils
 from nikola.nikola import DEFAULT_TRANSLATIONS_PATTERN
@@ -453,6 +450,7 @@ to
         An optional 'xml_preprocessor' allows to modify the xml
         (typically to deal with variations in tags injected by some WP plugin)
         """
+        from lxml import etree
         xml_string = cls.read_xml_file(filename)
         if xml_preprocessor:
             xml_string = xml_preprocessor(xml_string)
@@ -519,6 +517,7 @@ to
 
     def download_url_content_to_file(self, url, dst_path):
         """Download some content (attachments) to a file."""
+        import requests
         try:
             request = requests.get(url, auth=self.auth)
             if request.status_code >= 400:
@@ -37,7 +37,6 @@ from urllib.parse import urlsplit, urlunsplit
 
 import dateutil.tz
 import dateutil.zoneinfo
-from mako.template import Template
 
 import nikola
 from nikola.nikola import DEFAULT_INDEX_READ_MORE_LINK, DEFAULT_FEED_READ_MORE_LINK, LEGAL_VALUES
@@ -278,6 +277,7 @@ class CommandInit(Command):
     @staticmethod
     def create_configuration(target):
         """Create configuration file."""
+        from mako.template import Template
         template_path = pkg_resources_path('nikola', 'conf.py.in')
         conf_template = Template(filename=template_path)
         conf_path = os.path.join(target, 'conf.py')
@@ -287,6 +287,7 @@ class CommandInit(Command):
     @staticmethod
     def create_configuration_to_string():
         """Return configuration file as a string."""
+        from mako.template import Template
         template_path = pkg_resources_path('nikola', 'conf.py.in')
         conf_template = Template(filename=template_path)
         return conf_template.render(**prepare_config(SAMPLE_CONF))
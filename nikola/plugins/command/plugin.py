@@ -33,12 +33,6 @@ import sys
 import shutil
 import subprocess
 
-import requests
-
-import pygments
-from pygments.lexers import PythonLexer
-from pygments.formatters import TerminalFormatter
-
 from nikola.plugin_categories import Command
 from nikola import utils
 
@@ -211,6 +205,7 @@ class CommandPlugin(Command):
 
     def do_install(self, url, name, show_install_notes=True):
         """Download and install a plugin."""
+        import requests
         data = self.get_json(url)
         if name in data:
             utils.makedirs(self.output_dir)
@@ -277,6 +272,9 @@ class CommandPlugin(Command):
             LOGGER.warning('This plugin has a sample config file.  Integrate it with yours in order to make this plugin work!')
             print('Contents of the conf.py.sample file:\n')
             if self.site.colorful:
+                import pygments
+                from pygments.lexers import PythonLexer
+                from pygments.formatters import TerminalFormatter
                 print(pygments.highlight(confpy_path.read_text(), PythonLexer(), TerminalFormatter()))
             else:
                 print(confpy_path.read_text())
@@ -300,6 +298,7 @@ class CommandPlugin(Command):
 
     def get_json(self, url):
         """Download the JSON file with all plugins."""
+        import requests
         if self.json is None:
             try:
                 self.json = requests.get(url).json()
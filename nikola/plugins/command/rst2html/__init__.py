@@ -28,8 +28,7 @@
 
 
 import io
-import lxml.html
-from mako.template import Template
+
 from nikola.plugin_categories import Command
 from nikola.utils import pkg_resources_path
 
@@ -44,6 +43,8 @@ class CommandRst2Html(Command):
 
     def _execute(self, options, args):
         """Compile reStructuredText to standalone HTML files."""
+        import lxml.html
+        from mako.template import Template
         compiler = self.site.plugin_manager.get_plugin_by_name('rest', 'PageCompiler').plugin_object
         if len(args) != 1:
             print("This command takes only one argument (input file name).")
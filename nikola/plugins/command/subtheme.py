@@ -29,8 +29,6 @@
 import configparser
 import os
 
-import requests
-
 from nikola import utils
 from nikola.plugin_categories import Command
 
@@ -78,6 +76,7 @@ class CommandSubTheme(Command):
 
     def _execute(self, options, args):
         """Given a swatch name and a parent theme, creates a custom theme."""
+        import requests
         name = options['name']
         swatch = options['swatch']
         if not swatch:
@@ -36,11 +36,6 @@ import shutil
 import sys
 import time
 
-import requests
-import pygments
-from pygments.lexers import PythonLexer
-from pygments.formatters import TerminalFormatter
-
 from nikola.plugin_categories import Command
 from nikola import utils
 
@@ -52,7 +47,7 @@ class CommandTheme(Command):
 
     json = None
     name = 'theme'
-    doc_usage = '[-u url] [-i theme_name] [-r theme_name] [-l] [--list-installed] [-g] [-n theme_name] [-c template_name] [-d]'
+    doc_usage = '[-u url] [-i theme_name] [-r theme_name] [-l] [--list-installed] [-g] [-n theme_name] [-c template_name] [-d] [--precompile]'
     doc_purpose = 'manage themes'
     output_dir = 'themes'
     cmd_options = [
@@ -148,6 +143,13 @@ class CommandTheme(Command):
             'default': False,
             'help': 'Show diffs of custom templates compared to base file',
         },
+        {
+            'name': 'precompile',
+            'long': 'precompile',
+            'type': bool,
+            'default': False,
+            'help': 'Compile the Jinja templates of the current theme into Python modules',
+        },
     ]
 
     def _execute(self, options, args):
@@ -166,6 +168,7 @@ class CommandTheme(Command):
         new_parent = options.get('new_parent')
         new_legacy_meta = options.get('new_legacy_meta')
         diff = options.get('diff')
+        precompile = options.get('precompile')
         command_count = [
             bool(x)
             for x in (
@@ -177,6 +180,7 @@ class CommandTheme(Command):
                 copy_template,
                 new,
                 diff,
+                precompile,
             )
         ].count(True)
         if command_count > 1 or command_count == 0:
@@ -199,6 +203,8 @@ class CommandTheme(Command):
             return self.new_theme(new, new_engine, new_parent, new_legacy_meta)
         elif diff:
             return self.diff_custom_templates()
+        elif precompile:
+            return self.precompile_templates()
 
     def do_install_deps(self, url, name):
         """Install themes and their dependencies."""
@@ -222,6 +228,7 @@ class CommandTheme(Command):
 
     def do_install(self, name, data):
         """Download and install a theme."""
+        import requests
         if name in data:
             utils.makedirs(self.output_dir)
             url = data[name]
@@ -255,6 +262,9 @@ class CommandTheme(Command):
             print('Contents of the conf.py.sample file:\n')
             with io.open(confpypath, 'r', encoding='utf-8-sig') as fh:
                 if self.site.colorful:
+                    import pygments
+                    from pygments.lexers import PythonLexer
+                    from pygments.formatters import TerminalFormatter
                     print(pygments.highlight(fh.read(), PythonLexer(), TerminalFormatter()))
                 else:
                     print(fh.read())
@@ -423,6 +433,7 @@ class CommandTheme(Command):
 
     def get_json(self, url):
         """Download the JSON file with all plugins."""
+        import requests
         if self.json is None:
             try:
                 try:
@@ -441,3 +452,12 @@ class CommandTheme(Command):
                 sys.exit(2)
 
         return self.json
+
+    def precompile_templates(self):
+        """Compile the templates of the current theme into Python modules."""
+        template_system = self.site.template_system
+        if template_system.name != 'jinja':
+            LOGGER.error("Only Jinja themes can be precompiled. Mako templates are kept compiled in the cache folder.")
+            return 1
+        count = template_system.precompile()
+        LOGGER.info("Compiled {0} templates into {1}".format(count, template_system.modules_folder))
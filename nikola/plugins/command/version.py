@@ -26,9 +26,6 @@
 
 """Print Nikola version."""
 
-
-import requests
-
 from nikola.plugin_categories import Command
 from nikola import __version__
 
@@ -58,6 +55,7 @@ class CommandVersion(Command):
         """Print the version number."""
         print("Nikola v" + __version__)
         if options.get('check'):
+            import requests
             data = requests.get(URL).json()
             pypi_version = data['info']['version']
             if pypi_version == __version__:
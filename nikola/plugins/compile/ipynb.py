@@ -29,6 +29,7 @@
 import io
 import json
 import os
+import threading
 
 try:
     import nbconvert
@@ -47,6 +48,23 @@ from nikola.plugin_categories import PageCompiler
 from nikola.utils import makedirs, req_missing, LocaleBorg
 
 
+class ThreadLocalHTMLExporter(threading.local):
+    """Export notebooks as HTML using per-thread exporters.
+
+    Creating an exporter (loading its configuration and templates) is
+    expensive, so it is only done once per thread.
+    """
+
+    def __init__(self, config):
+        """Create an HTMLExporter."""
+        self.exporter = HTMLExporter(config=config)
+
+    def export(self, nb_json):
+        """Export a notebook node as HTML."""
+        body, _ = self.exporter.from_notebook_node(nb_json)
+        return body
+
+
 class CompileIPynb(PageCompiler):
     """Compile IPynb into HTML."""
 
@@ -56,19 +74,24 @@ class CompileIPynb(PageCompiler):
     default_kernel = 'python3'
     supports_metadata = True
 
+    def set_site(self, site):
+        """Set Nikola site."""
+        self._html_exporter = None
+        super().set_site(site)
+
     def _compile_string(self, nb_json):
         """Export notebooks as HTML strings."""
         self._req_missing_ipynb()
-        c = Config(get_default_jupyter_config())
-        c.merge(Config(self.site.config['IPYNB_CONFIG']))
-        if 'template_file' not in self.site.config['IPYNB_CONFIG'].get('Exporter', {}):
-            if NBCONVERT_VERSION_MAJOR >= 6:
-                c['Exporter']['template_file'] = 'classic/base.html.j2'
-            else:
-                c['Exporter']['template_file'] = 'basic.tpl'  # not a typo
-        exportHtml = HTMLExporter(config=c)
-        body, _ = exportHtml.from_notebook_node(nb_json)
-        return body
+        if self._html_exporter is None:
+            c = Config(get_default_jupyter_config())
+            c.merge(Config(self.site.config['IPYNB_CONFIG']))
+            if 'template_file' not in self.site.config['IPYNB_CONFIG'].get('Exporter', {}):
+                if NBCONVERT_VERSION_MAJOR >= 6:
+                    c['Exporter']['template_file'] = 'classic/base.html.j2'
+                else:
+                    c['Exporter']['template_file'] = 'basic.tpl'  # not a typo
+            self._html_exporter = ThreadLocalHTMLExporter(c)
+        return self._html_exporter.export(nb_json)
 
     @staticmethod
     def _nbformat_read(in_file):
@@ -78,6 +101,16 @@ class CompileIPynb(PageCompiler):
         if flag is None:
             req_missing(['notebook>=4.0.0'], 'build this site (compile ipynb)')
 
+    def get_versions(self):
+        """Return the versions of the libraries used by this compiler."""
+        if flag is None:
+            return {}
+        return {'nbconvert': nbconvert.__version__, 'nbformat': nbformat.__version__}
+
+    def get_config_options(self):
+        """Return the values of the configuration options used by this compiler."""
+        return {'IPYNB_CONFIG': self.site.config['IPYNB_CONFIG']}
+
     def compile_string(self, data, source_path=None, is_two_file=True, post=None, lang=None):
         """Compile notebooks into HTML strings."""
         new_data, shortcodes = sc.extract_shortcodes(data)
@@ -113,10 +146,17 @@ class CompileIPynb(PageCompiler):
             lang = LocaleBorg().current_lang
         source = post.translated_source_path(lang)
         with io.open(source, "r", encoding="utf-8-sig") as in_file:
-            nb_json = nbformat.read(in_file, current_nbformat)
+            nb_str = in_file.read()
+        # Only the metadata is needed, so the notebook is not validated
+        # and converted by nbformat (which is slow for large notebooks).
+        try:
+            metadata = json.loads(nb_str).get('metadata', {})
+        except (ValueError, AttributeError):
+            # Let nbformat complain about broken notebooks
+            metadata = nbformat.reads(nb_str, current_nbformat).get('metadata', {})
         # Metadata might not exist in two-file posts or in hand-crafted
         # .ipynb files.
-        return nb_json.get('metadata', {}).get('nikola', {})
+        return metadata.get('nikola', {})
 
     def create_post(self, path, **kw):
         """Create a new post."""
@@ -33,9 +33,10 @@ import threading
 
 from nikola import shortcodes as sc
 from nikola.plugin_categories import PageCompiler
-from nikola.utils import makedirs, req_missing, write_metadata, LocaleBorg, map_metadata, NikolaPygmentsHTML
+from nikola.utils import makedirs, req_missing, write_metadata, LocaleBorg, map_metadata, NikolaPygmentsHTML, highlight_code
 
 try:
+    import markdown
     from markdown import Markdown
 except ImportError:
     Markdown = None
@@ -44,6 +45,7 @@ except ImportError:
 try:
     import markdown.extensions.codehilite
     markdown.extensions.codehilite.get_formatter_by_name = lambda _, **args: NikolaPygmentsHTML(**args)
+    markdown.extensions.codehilite.highlight = highlight_code
 except ImportError:
     pass
 
@@ -105,6 +107,20 @@ class CompileMarkdown(PageCompiler):
                 self.converters[lang] = ThreadLocalMarkdown(extensions, lang_extension_configs)
         self.supports_metadata = 'markdown.extensions.meta' in extensions
 
+    def get_versions(self):
+        """Return the versions of the libraries used by this compiler."""
+        if Markdown is None:
+            return {}
+        return {'markdown': markdown.__version__}
+
+    def get_config_options(self):
+        """Return the values of the configuration options used by this compiler."""
+        extension_configs = self.site.config.get("MARKDOWN_EXTENSION_CONFIGS")
+        return {
+            'MARKDOWN_EXTENSIONS': self.site.config.get("MARKDOWN_EXTENSIONS"),
+            'MARKDOWN_EXTENSION_CONFIGS': extension_configs.values if extension_configs else None,
+        }
+
     def compile_string(self, data, source_path=None, is_two_file=True, post=None, lang=None):
         """Compile Markdown into HTML strings."""
         if lang is None:
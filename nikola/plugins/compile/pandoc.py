@@ -32,12 +32,54 @@ You will need, of course, to install pandoc
 
 import io
 import os
+import shutil
 import subprocess
+import tempfile
+import threading
 from pathlib import Path
 
 from nikola.plugin_categories import PageCompiler
 from nikola.utils import req_missing, makedirs, write_metadata
 
+# Readers for the extensions pandoc itself recognizes, used when
+# converting several files in one pandoc process.
+PANDOC_BATCH_READERS = {
+    '.creole': 'creole',
+    '.htm': 'html',
+    '.html': 'html',
+    '.ipynb': 'ipynb',
+    '.latex': 'latex',
+    '.markdown': 'markdown',
+    '.md': 'markdown',
+    '.muse': 'muse',
+    '.org': 'org',
+    '.rst': 'rst',
+    '.tex': 'latex',
+    '.textile': 'textile',
+    '.wiki': 'mediawiki',
+}
+
+# Run with ``pandoc lua``.  Every manifest line is
+# ``reader<TAB>source<TAB>destination``.  Documents that fail are
+# reported on stderr and skipped.
+PANDOC_BATCH_SCRIPT = """\
+for line in io.lines(arg[1]) do
+  local reader, source, dest = line:match('^([^\\t]*)\\t([^\\t]*)\\t(.*)$')
+  local ok, err = pcall(function ()
+    local inf = assert(io.open(source, 'rb'))
+    local text = inf:read('a'):gsub('^\\239\\187\\191', '')
+    inf:close()
+    local html = pandoc.write(pandoc.read(text, reader), 'html')
+    local outf = assert(io.open(dest, 'wb'))
+    outf:write(html, '\\n')
+    outf:close()
+  end)
+  if not ok then
+    io.stderr:write(source, ': ', tostring(err), '\\n')
+  end
+end
+"""
+
 
 class CompilePandoc(PageCompiler):
     """Compile markups into HTML using pandoc."""
@@ -48,8 +90,26 @@ class CompilePandoc(PageCompiler):
     def set_site(self, site):
         """Set Nikola site."""
         self.config_dependencies = [str(site.config['PANDOC_OPTIONS'])]
+        self._pandoc_version = None
+        self._batch_done = False
+        self._batch_dir = None
+        self._batch_results = {}
+        self._batch_lock = threading.Lock()
         super().set_site(site)
 
+    def get_versions(self):
+        """Return the version of pandoc."""
+        if self._pandoc_version is None:
+            try:
+                self._pandoc_version = subprocess.check_output(['pandoc', '--version'], text=True).splitlines()[0]
+            except (OSError, subprocess.CalledProcessError):
+                self._pandoc_version = ''
+        return {'pandoc': self._pandoc_version}
+
+    def get_config_options(self):
+        """Return the values of the configuration options used by this compiler."""
+        return {'PANDOC_OPTIONS': self.site.config['PANDOC_OPTIONS']}
+
     def _get_pandoc_options(self, source: str) -> list[str]:
         """Obtain pandoc args from config depending on type and file extensions."""
         # Union[List[str], Dict[str, List[str]]]
@@ -68,11 +128,99 @@ class CompilePandoc(PageCompiler):
             pandoc_options = []
         return pandoc_options
 
+    def _batch_format(self, source):
+        """Return the pandoc reader for source if it can be converted in a batch, or None."""
+        options = self._get_pandoc_options(source)
+        reader = None
+        while options:
+            option = options.pop(0)
+            if option in ('-f', '-r', '--from', '--read') and options:
+                reader = options.pop(0)
+            elif option.startswith(('--from=', '--read=')):
+                reader = option.split('=', 1)[1]
+            else:
+                # Anything else (filters, bibliographies, writer options…)
+                # needs the real command line.
+                return None
+        return reader or PANDOC_BATCH_READERS.get(Path(source).suffix.lower())
+
+    def _batch_jobs(self):
+        """Find sources that will be compiled in this build."""
+        jobs = {}
+        for post in self.site.timeline:
+            if post.compiler is not self:
+                continue
+            for lang in self.site.config['TRANSLATIONS']:
+                if not post.is_translation_available(lang) and not self.site.config['SHOW_UNTRANSLATED_POSTS']:
+                    continue
+                source = post.translated_source_path(lang)
+                dest = post.translated_base_path(lang)
+                if source in jobs or not os.path.isfile(source) or '\t' in source or '\n' in source:
+                    continue
+                will_run = self.site.task_will_run('render_posts:' + dest)
+                if will_run is None:
+                    # Not built by doit, guess from the modification times
+                    will_run = not os.path.isfile(dest) or os.stat(dest).st_mtime < os.stat(source).st_mtime
+                if not will_run:
+                    continue
+                reader = self._batch_format(source)
+                if reader is not None:
+                    jobs[source] = reader
+        return jobs
+
+    def _run_batch(self):
+        """Convert all stale sources with a single pandoc process."""
+        self._batch_done = True
+        jobs = self._batch_jobs()
+        if len(jobs) < 2:
+            return
+        self._batch_dir = tempfile.TemporaryDirectory(prefix='nikola-pandoc-')
+        script = os.path.join(self._batch_dir.name, 'batch.lua')
+        manifest = os.path.join(self._batch_dir.name, 'manifest.txt')
+        outputs = {}
+        with open(script, 'w', encoding='utf-8') as outf:
+            outf.write(PANDOC_BATCH_SCRIPT)
+        with open(manifest, 'w', encoding='utf-8') as outf:
+            for i, (source, reader) in enumerate(jobs.items()):
+                outputs[source] = os.path.join(self._batch_dir.name, '{0}.html'.format(i))
+                outf.write('\t'.join((reader, os.path.abspath(source), outputs[source])) + '\n')
+        self.logger.debug('Converting {0} files with one pandoc process'.format(len(jobs)))
+        try:
+            result = subprocess.run(['pandoc', 'lua', script, manifest], capture_output=True, text=True, check=True)
+        except (OSError, subprocess.CalledProcessError) as e:
+            self.logger.warning('Batched pandoc conversion failed, converting files one by one: {0}'.format(e))
+            return
+        if result.stderr:
+            # Failed documents are converted again one by one, which reports
+            # the error for the right file.
+            self.logger.debug(result.stderr)
+        for source, output in outputs.items():
+            if os.path.isfile(output):
+                self._batch_results[source] = (output, os.stat(source).st_mtime_ns)
+
+    def _use_batch_output(self, source, dest):
+        """Copy the batched conversion of source to dest, if there is one."""
+        if not self.site.config['PANDOC_BATCH'] or self.site.doit_num_process:
+            # Parallel workers would each convert the whole batch
+            return False
+        with self._batch_lock:
+            if not self._batch_done:
+                self._run_batch()
+        try:
+            output, mtime = self._batch_results[source]
+        except KeyError:
+            return False
+        if os.stat(source).st_mtime_ns != mtime:
+            return False
+        shutil.copyfile(output, dest)
+        return True
+
     def compile(self, source, dest, is_two_file=True, post=None, lang=None):
         """Compile the source file into HTML and save as dest."""
         makedirs(os.path.dirname(dest))
         try:
-            subprocess.check_call(['pandoc', '-o', dest, source] + self._get_pandoc_options(source))
+            if not self._use_batch_output(source, dest):
+                subprocess.check_call(['pandoc', '-o', dest, source] + self._get_pandoc_options(source))
             with open(dest, 'r', encoding='utf-8-sig') as inf:
                 output, shortcode_deps = self.site.apply_shortcodes(inf.read())
             with open(dest, 'w', encoding='utf-8') as outf:
@@ -85,7 +233,7 @@ class CompilePandoc(PageCompiler):
             else:
                 post._depfile[dest] += shortcode_deps
         except OSError as e:
-            if e.strreror == 'No such file or directory':
+            if e.strerror == 'No such file or directory':
                 req_missing(['pandoc'], 'build this site (compile with pandoc)', python=False)
 
     def compile_string(self, data, source_path=None, is_two_file=True, post=None, lang=None):
@@ -29,12 +29,15 @@
 import io
 import logging
 import os
+import sys
+from collections import OrderedDict
 
 import docutils.core
 import docutils.nodes
 import docutils.transforms
 import docutils.utils
 import docutils.io
+import docutils.readers.doctree
 import docutils.readers.standalone
 import docutils.writers.html5_polyglot
 import docutils.parsers.rst.directives
@@ -50,6 +53,9 @@ from nikola.utils import (
     map_metadata
 )
 
+# How many documents parsed while scanning are kept around to be compiled.
+DOCTREE_CACHE_SIZE = 500
+
 
 class CompileRest(PageCompiler):
     """Compile reStructuredText into HTML."""
@@ -67,13 +73,39 @@ class CompileRest(PageCompiler):
             lang = LocaleBorg().current_lang
         source_path = post.translated_source_path(lang)
 
-        # Silence reST errors, some of which are due to a different
-        # environment. Real issues will be reported while compiling.
-        null_logger = logging.getLogger('NULL')
-        null_logger.setLevel(1000)
         with io.open(source_path, 'r', encoding='utf-8-sig') as inf:
             data = inf.read()
-            _, _, _, document = rst2html(data, logger=null_logger, source_path=source_path, transforms=self.site.rst_transforms)
+        # Only parse the document, without writing HTML. The document is
+        # kept so it can be compiled without parsing it again, which is
+        # possible if the compiled text (without Nikola-style metadata
+        # comments in one-file posts) is the same.
+        from nikola import metadata_extractors
+        extractor = metadata_extractors.DEFAULT_EXTRACTOR
+        if extractor is not None and extractor.extract_text(data):
+            _, data = self.split_metadata(data)
+        from nikola import shortcodes as sc
+        new_data, shortcodes = sc.extract_shortcodes(data)
+        language_code = LEGAL_VALUES['DOCUTILS_LOCALES'].get(lang, 'en')
+        # Errors are reported while compiling, in case the document
+        # is parsed again in a different environment.
+        messages = []
+        transforms = self.get_transforms(hide_docinfo=False)
+        document = rst2doctree(
+            new_data, source_path=source_path, settings_overrides=self._settings_overrides(language_code),
+            messages=messages, transforms=transforms)
+        if not getattr(document.settings, '_nikola_site_dependent', False):
+            key = (source_path, language_code)
+            self._doctrees.pop(key, None)
+            self._doctrees[key] = {
+                'data': data,
+                'document': document,
+                'messages': messages,
+                'max_level': document.reporter.max_level,
+                'shortcodes': shortcodes,
+            }
+            while len(self._doctrees) > DOCTREE_CACHE_SIZE:
+                self._doctrees.popitem(last=False)
+
         meta = {}
         if 'title' in document:
             meta['title'] = document['title']
@@ -93,6 +125,16 @@ class CompileRest(PageCompiler):
 
                 meta[name] = value
 
+        # Put back the shortcodes extracted before parsing
+        if shortcodes:
+            for name, value in meta.items():
+                for sc_id, shortcode in shortcodes.items():
+                    if isinstance(value, list):
+                        value = [v.replace(sc_id, shortcode) for v in value]
+                    else:
+                        value = value.replace(sc_id, shortcode)
+                meta[name] = value
+
         # Put 'authors' meta field contents in 'author', too
         if 'authors' in meta and 'author' not in meta:
             meta['author'] = '; '.join(meta['authors'])
@@ -111,8 +153,63 @@ class CompileRest(PageCompiler):
             m_data, data = self.split_metadata(data, post, lang)
             add_ln = len(m_data.splitlines()) + 1
 
+        language_code = LEGAL_VALUES['DOCUTILS_LOCALES'].get(LocaleBorg().current_lang, 'en')
+        settings_overrides = self._settings_overrides(language_code)
+        hide_docinfo = self.site.config.get('HIDE_REST_DOCINFO', False)
+
+        parsed = self._doctrees.pop((source_path, language_code), None)
+        if parsed is not None and parsed['data'] == data:
+            # Reuse the document parsed while reading metadata
+            shortcodes = parsed['shortcodes']
+            document = parsed['document']
+            observer = get_observer({'logger': self.logger, 'source': source_path, 'add_ln': add_ln})
+            for msg in parsed['messages']:
+                observer(msg)
+            if hide_docinfo:
+                RemoveDocinfo(document).apply()
+            output, error_level, deps = doctree2html(document, logger=self.logger, source_path=source_path, l_add_ln=add_ln)
+            error_level = max(error_level, parsed['max_level'])
+        else:
+            from nikola import shortcodes as sc
+            new_data, shortcodes = sc.extract_shortcodes(data)
+            output, error_level, deps, _ = rst2html(
+                new_data, settings_overrides=settings_overrides, logger=self.logger, source_path=source_path, l_add_ln=add_ln, transforms=self.get_transforms(hide_docinfo))
+        if not isinstance(output, str):
+            # To prevent some weird bugs here or there.
+            # Original issue: empty files.  `output` became a bytestring.
+            output = output.decode('utf-8')
+
+        output, shortcode_deps = self.site.apply_shortcodes_uuid(output, shortcodes, filename=source_path, extra_context={'post': post})
+        return output, error_level, deps, shortcode_deps
+
+    def get_transforms(self, hide_docinfo):
+        """Return the list of extra docutils transforms to apply to documents.
+
+        The list is built from ``site.rst_transforms`` the first time it is
+        needed (when all plugins have registered their transforms), without
+        duplicates, and does not change afterwards.
+        """
+        if self._transforms is None:
+            transforms = list(dict.fromkeys(self.site.rst_transforms))
+            self._transforms = {
+                False: [t for t in transforms if t is not RemoveDocinfo],
+                True: [t for t in transforms if t is not RemoveDocinfo] + [RemoveDocinfo],
+            }
+        return self._transforms[bool(hide_docinfo)]
+
+    def get_versions(self):
+        """Return the versions of the libraries used by this compiler."""
+        return {'docutils': docutils.__version__}
+
+    def get_config_options(self):
+        """Return the values of the configuration options used by this compiler."""
+        return {option: self.site.config.get(option) for option in (
+            'HIDE_REST_DOCINFO', 'USE_REST_DOCINFO_METADATA', 'REST_FILE_INSERTION_ENABLED')}
+
+    def _settings_overrides(self, language_code):
+        """Return the docutils settings used to compile posts."""
         default_template_path = os.path.join(os.path.dirname(__file__), 'template.txt')
-        settings_overrides = {
+        return {
             'initial_header_level': 1,
             'record_dependencies': True,
             'stylesheet_path': None,
@@ -122,25 +219,13 @@ class CompileRest(PageCompiler):
             # warnings about it from reST.
             'math_output': 'mathjax /assets/js/mathjax.js',
             'template': default_template_path,
-            'language_code': LEGAL_VALUES['DOCUTILS_LOCALES'].get(LocaleBorg().current_lang, 'en'),
+            'language_code': language_code,
             'doctitle_xform': self.site.config.get('USE_REST_DOCINFO_METADATA'),
             'file_insertion_enabled': self.site.config.get('REST_FILE_INSERTION_ENABLED'),
+            # For directives that need the site, like thumbnail
+            'nikola_site': self.site,
         }
 
-        from nikola import shortcodes as sc
-        new_data, shortcodes = sc.extract_shortcodes(data)
-        if self.site.config.get('HIDE_REST_DOCINFO', False):
-            self.site.rst_transforms.append(RemoveDocinfo)
-        output, error_level, deps, _ = rst2html(
-            new_data, settings_overrides=settings_overrides, logger=self.logger, source_path=source_path, l_add_ln=add_ln, transforms=self.site.rst_transforms)
-        if not isinstance(output, str):
-            # To prevent some weird bugs here or there.
-            # Original issue: empty files.  `output` became a bytestring.
-            output = output.decode('utf-8')
-
-        output, shortcode_deps = self.site.apply_shortcodes_uuid(output, shortcodes, filename=source_path, extra_context={'post': post})
-        return output, error_level, deps, shortcode_deps
-
     def compile(self, source, dest, is_two_file=True, post=None, lang=None):
         """Compile the source file into HTML and save as dest."""
         makedirs(os.path.dirname(dest))
@@ -183,6 +268,8 @@ class CompileRest(PageCompiler):
     def set_site(self, site):
         """Set Nikola site."""
         super().set_site(site)
+        self._doctrees = OrderedDict()
+        self._transforms = None
         self.config_dependencies = []
         for plugin_info in self.get_compiler_extensions():
             self.config_dependencies.append(plugin_info.name)
@@ -235,6 +322,7 @@ class NikolaReader(docutils.readers.standalone.Reader):
         """Initialize the reader."""
         self.transforms = kwargs.pop('transforms', [])
         self.logging_settings = kwargs.pop('nikola_logging_settings', {})
+        self.messages = kwargs.pop('nikola_messages', None)
         docutils.readers.standalone.Reader.__init__(self, *args, **kwargs)
 
     def get_transforms(self):
@@ -245,10 +333,52 @@ class NikolaReader(docutils.readers.standalone.Reader):
         """Create and return a new empty document tree (root node)."""
         document = docutils.utils.new_document(self.source.source_path, self.settings)
         document.reporter.stream = False
-        document.reporter.attach_observer(get_observer(self.logging_settings))
+        if self.messages is None:
+            document.reporter.attach_observer(get_observer(self.logging_settings))
+        else:
+            document.reporter.attach_observer(self.messages.append)
         return document
 
 
+class NikolaDoctreeReader(docutils.readers.doctree.Reader):
+    """Nikola-specific docutils reader for already parsed documents."""
+
+    def __init__(self, *args, **kwargs):
+        """Initialize the reader."""
+        self.logging_settings = kwargs.pop('nikola_logging_settings', {})
+        docutils.readers.doctree.Reader.__init__(self, *args, **kwargs)
+
+    def parse(self):
+        """Reuse the document, with a new reporter."""
+        docutils.readers.doctree.Reader.parse(self)
+        self.document.reporter.stream = False
+        self.document.reporter.attach_observer(get_observer(self.logging_settings))
+
+
+class NikolaHTMLTranslator(docutils.writers.html5_polyglot.HTMLTranslator):
+    """HTML translator for Nikola.
+
+    Images with a ``placeholder_style`` attribute (set by the thumbnail
+    directive) get it in their ``style``.
+    """
+
+    def emptytag(self, node, tagname, suffix='\n', **attributes):
+        """Construct and return an XML-compatible empty tag."""
+        style = node.get('placeholder_style') if tagname == 'img' else None
+        if style:
+            attributes['style'] = ' '.join(filter(None, (style, attributes.get('style'))))
+        return super().emptytag(node, tagname, suffix, **attributes)
+
+
+class NikolaHTMLWriter(docutils.writers.html5_polyglot.Writer):
+    """HTML writer using NikolaHTMLTranslator."""
+
+    def __init__(self):
+        """Initialize the writer."""
+        super().__init__()
+        self.translator_class = NikolaHTMLTranslator
+
+
 def shortcode_role(name, rawtext, text, lineno, inliner,
                    options={}, content=[]):
     """Return a shortcode role that passes through raw inline HTML."""
@@ -370,6 +500,8 @@ def rst2html(source, source_path=None, source_class=docutils.io.StringInput,
                                   'logger': logger, 'source': source_path,
                                   'add_ln': l_add_ln
                               })
+    if writer is None and writer_name == 'html5_polyglot':
+        writer = NikolaHTMLWriter()
 
     pub = docutils.core.Publisher(reader, parser, writer, settings=settings,
                                   source_class=source_class,
@@ -385,6 +517,68 @@ def rst2html(source, source_path=None, source_class=docutils.io.StringInput,
     return pub.writer.parts['docinfo'] + pub.writer.parts['fragment'], pub.document.reporter.max_level, pub.settings.record_dependencies, pub.document
 
 
+def rst2doctree(source, source_path=None, settings_overrides=None, config_section='nikola',
+                messages=None, logger=None, l_add_ln=0, transforms=None):
+    """Parse reST and apply the reader transforms, without writing HTML.
+
+    Return the document, which can be written with ``doctree2html``. If
+    ``messages`` is a list, system messages are appended to it instead of
+    being logged.
+    """
+    logging_settings = {'logger': logger, 'source': source_path, 'add_ln': l_add_ln}
+    reader = NikolaReader(transforms=transforms or [], nikola_messages=messages,
+                          nikola_logging_settings=logging_settings)
+    pub = docutils.core.Publisher(reader, None, None,
+                                  source_class=docutils.io.StringInput,
+                                  destination_class=docutils.io.StringOutput)
+    # The writer is only used for its settings here
+    pub.set_components(None, 'restructuredtext', 'html5_polyglot')
+    pub.process_programmatic_settings(None, settings_overrides, config_section)
+    pub.set_source(source, None)
+    pub.settings._nikola_source_path = source_path
+    pub.set_destination(None, None)
+    try:
+        pub.document = pub.reader.read(pub.source, pub.parser, pub.settings)
+        pub.document.transformer.populate_from_components(
+            (pub.source, pub.reader, pub.reader.parser, pub.destination))
+        pub.document.transformer.apply_transforms()
+    except Exception as error:
+        # Same as docutils.core.Publisher.publish
+        if pub.settings.traceback:
+            raise
+        pub.report_Exception(error)
+        sys.exit(1)
+    return pub.document
+
+
+def doctree2html(document, logger=None, source_path=None, l_add_ln=0):
+    """Write a document parsed by ``rst2doctree`` as HTML.
+
+    Return the HTML, the error level and the dependencies, like ``rst2html``.
+    """
+    logging_settings = {'logger': logger, 'source': source_path, 'add_ln': l_add_ln}
+    reader = NikolaDoctreeReader(nikola_logging_settings=logging_settings)
+    pub = docutils.core.Publisher(reader, None, NikolaHTMLWriter(), settings=document.settings,
+                                  source=docutils.io.DocTreeInput(document),
+                                  destination_class=docutils.io.StringOutput)
+    pub.set_components(None, 'null', 'html5_polyglot')
+    pub.set_destination(None, None)
+    pub.publish()
+
+    return pub.writer.parts['docinfo'] + pub.writer.parts['fragment'], pub.document.reporter.max_level, pub.settings.record_dependencies
+
+
+def mark_site_dependent(document):
+    """Mark a document whose contents depend on the state of the site while parsing.
+
+    Documents are parsed while scanning posts, and the result is reused
+    when compiling them. Directives and roles that need all posts (or other
+    things that are not ready while scanning) should call this, so that
+    the document is parsed again when compiling it.
+    """
+    document.settings._nikola_site_dependent = True
+
+
 # Alignment helpers for extensions
 _align_options_base = ('left', 'center', 'right')
 
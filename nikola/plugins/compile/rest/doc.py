@@ -31,6 +31,7 @@ from docutils.parsers.rst import roles
 
 from nikola.utils import split_explicit_title, LOGGER, slugify
 from nikola.plugin_categories import RestExtension
+from nikola.plugins.compile.rest import mark_site_dependent
 
 
 class Plugin(RestExtension):
@@ -94,6 +95,7 @@ def _doc_link(rawtext, text, options={}, content=[]):
 
 def doc_role(name, rawtext, text, lineno, inliner, options={}, content=[]):
     """Handle the doc role."""
+    mark_site_dependent(inliner.document)
     success, twin_slugs, title, permalink, slug = _doc_link(rawtext, text, options, content)
     if success:
         if twin_slugs:
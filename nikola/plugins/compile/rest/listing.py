@@ -131,7 +131,7 @@ class CodeBlock(Directive):
             linenostart=linenostart,
             **extra_kwargs
         )
-        out = pygments.highlight(code, lexer, formatter)
+        out = utils.highlight_code(code, lexer, formatter)
         node = nodes.raw('', out, format='html')
 
         self.add_name(node)
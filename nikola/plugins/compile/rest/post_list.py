@@ -30,6 +30,7 @@ from docutils.parsers.rst import Directive, directives
 
 from nikola import utils
 from nikola.plugin_categories import RestExtension
+from nikola.plugins.compile.rest import mark_site_dependent
 
 # WARNING: the directive name is post-list
 #          (with a DASH instead of an UNDERSCORE)
@@ -109,6 +110,7 @@ class PostListDirective(Directive):
                 filename=filename)
         self.state.document.settings.record_dependencies.add(
             "####MAGIC####TIMELINE")
+        mark_site_dependent(self.state.document)
         for d in deps:
             self.state.document.settings.record_dependencies.add(d)
         if output:
@@ -28,10 +28,13 @@
 
 import os
 
+import docutils.nodes
 from docutils.parsers.rst import directives
 from docutils.parsers.rst.directives.images import Image, Figure
 
+from nikola.image_processing import find_image_metadata, placeholder_style
 from nikola.plugin_categories import RestExtension
+from nikola.plugins.compile.rest import mark_site_dependent
 
 
 class Plugin(RestExtension):
@@ -74,8 +77,29 @@ class Thumbnail(Figure):
         else:
             self.arguments[0] = '.thumbnail'.join(os.path.splitext(uri))
         self.options['target'] = uri
+
+        style = None
+        site = getattr(self.state.document.settings, 'nikola_site', None)
+        if site is not None and site.config['IMAGE_PLACEHOLDERS']:
+            # Image metadata may not exist yet while scanning posts
+            mark_site_dependent(self.state.document)
+            metadata_path, metadata = find_image_metadata(site.config, uri)
+            if metadata_path:
+                # Recorded even if the image is not resized yet, so the
+                # post is compiled again once the metadata exists
+                self.state.document.settings.record_dependencies.add(metadata_path)
+            if metadata:
+                size = metadata.get('sizes', {}).get(os.path.basename(self.arguments[0].rstrip('?')))
+                if size and not {'width', 'height', 'scale'} & set(self.options):
+                    self.options['width'], self.options['height'] = (str(v) for v in size)
+                self.options.setdefault('loading', 'lazy')
+                style = placeholder_style(metadata)
+
         if self.content:
             (node,) = Figure.run(self)
         else:
             (node,) = Image.run(self)
+        if style:
+            for image in node.findall(docutils.nodes.image):
+                image['placeholder_style'] = style
         return [node]
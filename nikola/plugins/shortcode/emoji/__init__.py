@@ -44,3 +44,6 @@ class Plugin(ShortcodePlugin):
             output = '''<span class="emoji error">{}</span>'''.format(name)
 
         return output, []
+
+
+Plugin.handler.nikola_shortcode_pure = True
@@ -32,6 +32,7 @@ from urllib.parse import urlunsplit
 import pygments
 
 from nikola.plugin_categories import ShortcodePlugin
+from nikola.utils import highlight_code
 
 
 class Plugin(ShortcodePlugin):
@@ -72,6 +73,9 @@ class Plugin(ShortcodePlugin):
             formatter = pygments.formatters.get_formatter_by_name(
                 'html', linenos=linenumbers)
             output = '<a href="{1}">{0}</a>  <a href="{3}">({2})</a>' .format(
-                fname, target, src_label, src_target) + pygments.highlight(data, lexer, formatter)
+                fname, target, src_label, src_target) + highlight_code(data, lexer, formatter)
 
         return output, deps
+
+
+Plugin.handler.nikola_shortcode_pure = True
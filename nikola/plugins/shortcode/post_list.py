@@ -27,14 +27,12 @@
 """Post list shortcode."""
 
 
-import operator
 import os
 import uuid
 
 import natsort
 
 from nikola import utils
-from nikola.packages.datecond import date_in_range
 from nikola.plugin_categories import ShortcodePlugin
 
 
@@ -158,59 +156,34 @@ class PostListShortcode(ShortcodePlugin):
         sections = [s.strip().lower() for s in sections.split(',')] if sections else []
         slugs = [s.strip() for s in slugs.split(',')] if slugs else []
 
-        filtered_timeline = []
         posts = []
         step = None if reverse is False else -1
 
         if type is not False:
             post_type = type
 
-        if post_type == 'page' or post_type == 'pages':
-            timeline = [p for p in site.timeline if not p.use_in_feeds]
-        elif post_type == 'all':
-            timeline = [p for p in site.timeline]
-        else:  # post
-            timeline = [p for p in site.timeline if p.use_in_feeds]
-
-        # self_post should be removed from timeline because this is redundant
-        timeline = [p for p in timeline if p.source_path != filename]
-
-        if categories:
-            timeline = [p for p in timeline if p.meta('category', lang=lang).lower() in categories]
-
-        if sections:
-            timeline = [p for p in timeline if p.section_name(lang).lower() in sections]
-
         if tags:
             tags = {t.strip().lower() for t in tags.split(',')}
-            if require_all_tags:
-                compare = set.issubset
-            else:
-                compare = operator.and_
-            for post in timeline:
-                post_tags = {t.lower() for t in post.tags}
-                if compare(tags, post_tags):
-                    filtered_timeline.append(post)
-        else:
-            filtered_timeline = timeline
+
+        # self_post should be removed from timeline because this is redundant
+        current_lang = utils.LocaleBorg().current_lang
+        post_index = site.post_index
+        filtered_timeline = post_index.query(
+            post_type, categories=categories, sections=sections, tags=tags,
+            require_all_tags=require_all_tags, lang=lang, tags_lang=current_lang,
+            exclude_source_path=filename)
 
         if sort:
             filtered_timeline = natsort.natsorted(filtered_timeline, key=lambda post: post.meta[lang][sort], alg=natsort.ns.F | natsort.ns.IC)
 
         if date:
-            _now = utils.current_time()
-            filtered_timeline = [p for p in filtered_timeline if date_in_range(utils.html_unescape(date), p.date, now=_now)]
-
-        for post in filtered_timeline[start:stop:step]:
-            if slugs:
-                cont = True
-                for slug in slugs:
-                    if slug == post.meta('slug'):
-                        cont = False
+            filtered_timeline = post_index.in_date_range(filtered_timeline, utils.html_unescape(date), now=utils.current_time())
 
-                if cont:
-                    continue
+        filtered_timeline = filtered_timeline[start:stop:step]
+        if slugs:
+            filtered_timeline = post_index.with_slugs(filtered_timeline, slugs, current_lang)
 
+        for post in filtered_timeline:
             bp = post.translated_base_path(lang)
             if os.path.exists(bp) and state:
                 state.document.settings.record_dependencies.add(bp)
@@ -28,6 +28,7 @@
 
 import os.path
 
+from nikola.image_processing import find_image_metadata, placeholder_style
 from nikola.plugin_categories import ShortcodePlugin
 
 
@@ -54,16 +55,30 @@ class ThumbnailShortcode(ShortcodePlugin):
         elif align:
             imgclass += ' align-{0}'.format(align)
 
+        deps = []
+        width = height = style = None
+        if self.site.config['IMAGE_PLACEHOLDERS']:
+            metadata_path, metadata = find_image_metadata(self.site.config, uri)
+            if metadata_path:
+                # Recorded even if the image is not resized yet, so the
+                # post is compiled again once the metadata exists
+                deps.append(metadata_path)
+            if metadata:
+                width, height = metadata.get('sizes', {}).get(os.path.basename(src.rstrip('?')), (None, None))
+                style = placeholder_style(metadata)
+
         output = '<a href="{0}" class="image-reference"'.format(uri)
         if linktitle:
             output += ' title="{0}"'.format(linktitle)
         output += '><img src="{0}"'.format(src)
-        for item, name in ((alt, 'alt'), (title, 'title'), (imgclass, 'class')):
+        for item, name in ((alt, 'alt'), (title, 'title'), (imgclass, 'class'), (width, 'width'), (height, 'height'), (style, 'style')):
             if item:
                 output += ' {0}="{1}"'.format(name, item)
+        if style is not None:
+            output += ' loading="lazy"'
         output += '></a>'
 
         if data:
             output = '<div class="figure {0}">{1}{2}</div>'.format(figclass, output, data)
 
-        return output, []
+        return output, deps
@@ -27,7 +27,6 @@
 """Render image galleries."""
 
 import datetime
-import glob
 import io
 import json
 import mimetypes
@@ -42,7 +41,7 @@ from PIL import Image
 
 from nikola.plugin_categories import Task
 from nikola import utils
-from nikola.image_processing import ImageProcessor
+from nikola.image_processing import ImageProcessor, image_metadata_path, read_image_metadata
 from nikola.post import Post
 
 try:
@@ -90,6 +89,9 @@ class Galleries(Task, ImageProcessor):
             'disable_indexes': site.config['DISABLE_INDEXES'],
             'galleries_use_thumbnail': site.config['GALLERIES_USE_THUMBNAIL'],
             'galleries_default_thumbnail': site.config['GALLERIES_DEFAULT_THUMBNAIL'],
+            'photos_per_page': site.config['GALLERY_PHOTOS_PER_PAGE'],
+            'image_placeholders': site.config['IMAGE_PLACEHOLDERS'],
+            'optimize_svg_images': site.config['OPTIMIZE_SVG_IMAGES'],
         }
 
         # Verify that no folder in GALLERY_FOLDERS appears twice
@@ -102,12 +104,65 @@ class Galleries(Task, ImageProcessor):
             appearing_paths.add(source)
             appearing_paths.add(dest)
 
-        # Find all galleries we need to process
-        self.find_galleries()
-        # Create self.gallery_links
-        self.create_galleries_paths()
+        # Galleries are found the first time they are needed, see load_galleries
+        self._galleries_loaded = False
+        self._cache_path = os.path.join(self.kw['cache_folder'], 'galleries_cache.json')
+        self._cache = None
+        self._cache_dirty = False
+        self._index_posts = {}
+
+    def load_galleries(self):
+        """Find all galleries and create their paths, if not done yet."""
+        if not self._galleries_loaded:
+            self._galleries_loaded = True
+            # Find all galleries we need to process
+            self.find_galleries()
+            # Create self.gallery_links
+            self.create_galleries_paths()
+            self._save_cache()
+
+    def _read_cache(self):
+        """Read the cache of directory listings and metadata files."""
+        if self._cache is None:
+            try:
+                with open(self._cache_path, 'r', encoding='utf-8') as inf:
+                    self._cache = json.load(inf)
+            except (OSError, ValueError):
+                self._cache = {}
+            self._cache.setdefault('listings', {})
+            self._cache.setdefault('metadata', {})
+        return self._cache
+
+    def _save_cache(self):
+        """Save the cache of directory listings and metadata files, if it changed."""
+        if not self._cache_dirty:
+            return
+        utils.write_json_atomic(self._cache_path, self._cache, sort_keys=True)
+        self._cache_dirty = False
+
+    def list_directory(self, path):
+        """Return the names of the subdirectories and files in a directory.
+
+        Listings are cached (across runs) by the directory mtime.
+        """
+        listings = self._read_cache()['listings']
+        mtime = os.stat(path).st_mtime_ns
+        entry = listings.get(path)
+        if entry is None or entry['mtime'] != mtime:
+            dirs, files = [], []
+            with os.scandir(path) as it:
+                for dir_entry in it:
+                    if dir_entry.is_dir():
+                        dirs.append(dir_entry.name)
+                    else:
+                        files.append(dir_entry.name)
+            entry = {'mtime': mtime, 'dirs': sorted(dirs), 'files': sorted(files)}
+            listings[path] = entry
+            self._cache_dirty = True
+        return entry['dirs'], entry['files']
 
     def _find_gallery_path(self, name):
+        self.load_galleries()
         # The system using self.proper_gallery_links and self.improper_gallery_links
         # is similar as in listings.py.
         if name in self.proper_gallery_links:
@@ -177,6 +232,7 @@ class Galleries(Task, ImageProcessor):
             self.kw['||template_hooks|{0}||'.format(k)] = v.calculate_deps()
 
         self.site.scan_posts()
+        self.load_galleries()
         yield self.group_task()
 
         template_name = "gallery.tmpl"
@@ -189,8 +245,8 @@ class Galleries(Task, ImageProcessor):
         for gallery, input_folder, output_folder in self.gallery_list:
 
             # Create subfolder list
-            folder_list = [(x, x.split(os.sep)[-2]) for x in
-                           glob.glob(os.path.join(gallery, '*') + os.sep)]
+            folder_list = [(os.path.join(gallery, x) + os.sep, x) for x in
+                           self.list_directory(gallery)[0] if not x.startswith('.')]
 
             # Parse index into a post (with translations)
             post = self.parse_index(gallery, input_folder, output_folder)
@@ -316,37 +372,46 @@ class Galleries(Task, ImageProcessor):
 
                 template_dep_context = context.copy()
                 template_dep_context.update(self.site.GLOBAL_CONTEXT)
-                file_dep = self.site.template_system.template_deps(
-                    template_name, template_dep_context) + image_list + thumbs
-                file_dep_dest = self.site.template_system.template_deps(
-                    template_name, template_dep_context) + dest_img_list + thumbs
+                page_deps = self.site.template_system.template_deps(
+                    template_name, template_dep_context)
                 if post:
-                    file_dep += [post.translated_base_path(l) for l in self.kw['translations']]
-                    file_dep_dest += [post.translated_base_path(l) for l in self.kw['translations']]
+                    page_deps += [post.translated_base_path(l) for l in self.kw['translations']]
+                file_dep = page_deps + image_list + thumbs
+                file_dep_dest = page_deps + dest_img_list + thumbs
 
                 context["pagekind"] = ["gallery_page"]
 
-                yield utils.apply_filters({
-                    'basename': self.name,
-                    'name': dst,
-                    'file_dep': file_dep + dest_img_list + fpost_list,
-                    'targets': [dst],
-                    'actions': [
-                        (self.render_gallery_index, (
-                            template_name,
-                            dst,
-                            context.copy(),
-                            dest_img_list,
-                            img_titles,
-                            thumbs,
-                            img_metadata))],
-                    'clean': True,
-                    'uptodate': [utils.config_changed({
-                        1: self.kw.copy(),
-                        2: self.site.config["COMMENTS_IN_GALLERIES"],
-                        3: context.copy(),
-                    }, 'nikola.plugins.task.galleries:gallery')],
-                }, self.kw['filters'])
+                if self.kw['photos_per_page']:
+                    for task in self.create_gallery_pages(
+                            template_name, dst, context, image_list, img_titles,
+                            thumbs, dest_img_list, img_metadata,
+                            page_deps + fpost_list):
+                        yield task
+                else:
+                    # Remove pages left over from GALLERY_PHOTOS_PER_PAGE
+                    for task in self.remove_stale_gallery_pages(dst, lang, 1, 0):
+                        yield task
+                    yield utils.apply_filters({
+                        'basename': self.name,
+                        'name': dst,
+                        'file_dep': file_dep + dest_img_list + fpost_list,
+                        'targets': [dst],
+                        'actions': [
+                            (self.render_gallery_index, (
+                                template_name,
+                                dst,
+                                context.copy(),
+                                dest_img_list,
+                                img_titles,
+                                thumbs,
+                                img_metadata))],
+                        'clean': True,
+                        'uptodate': [utils.config_changed({
+                            1: self.kw.copy(),
+                            2: self.site.config["COMMENTS_IN_GALLERIES"],
+                            3: context.copy(),
+                        }, 'nikola.plugins.task.galleries:gallery')],
+                    }, self.kw['filters'])
 
                 # RSS for the gallery
                 if self.kw["generate_rss"]:
@@ -376,11 +441,21 @@ class Galleries(Task, ImageProcessor):
                         }, 'nikola.plugins.task.galleries:rss')],
                     }, self.kw['filters'])
 
+        # Metadata files were read above, store them for the next build
+        self._save_cache()
+
     def find_galleries(self):
         """Find all galleries to be processed according to conf.py."""
         self.gallery_list = []
+        listings = self._read_cache()['listings']
+        seen = set()
         for input_folder, output_folder in self.kw['gallery_folders'].items():
-            for root, dirs, files in os.walk(input_folder, followlinks=True):
+            if not os.path.isdir(input_folder):
+                continue
+            folders = [input_folder]
+            while folders:
+                root = folders.pop(0)
+                seen.add(root)
                 # If output folder is empty, the top-level gallery
                 # index will collide with the main page for the site.
                 # Don't generate the top-level gallery index in that
@@ -389,6 +464,11 @@ class Galleries(Task, ImageProcessor):
                 if (output_folder or root != input_folder and
                         (not self.kw['disable_indexes'] and self.kw['index_path'] == '')):
                     self.gallery_list.append((root, input_folder, output_folder))
+                folders = [os.path.join(root, d) for d in self.list_directory(root)[0]] + folders
+        # Forget about directories that no longer exist
+        for path in set(listings) - seen:
+            del listings[path]
+            self._cache_dirty = True
 
     def create_galleries_paths(self):
         """Given a list of galleries, put their paths into self.gallery_links."""
@@ -477,6 +557,12 @@ class Galleries(Task, ImageProcessor):
 
         self.logger.debug("Using {0} for gallery {1}".format(
             used_path, gallery))
+        metadata_cache = self._read_cache()['metadata']
+        mtime = os.stat(used_path).st_mtime_ns
+        entry = metadata_cache.get(used_path)
+        if entry is not None and entry['mtime'] == mtime:
+            return used_path, entry['order'], entry['captions'], entry['custom_metadata']
+
         with open(used_path, "r", encoding='utf-8-sig') as meta_file:
             if YAML is None:
                 utils.req_missing(['ruamel.yaml'], 'use metadata.yml files for galleries')
@@ -500,10 +586,24 @@ class Galleries(Task, ImageProcessor):
                 else:
                     self.logger.error("no 'name:' for ({0}) in {1}".format(
                         img, used_path))
+        entry = {'mtime': mtime, 'order': order, 'captions': captions, 'custom_metadata': custom_metadata}
+        try:
+            # Only cache metadata that survives a round-trip through JSON
+            if json.loads(json.dumps(entry)) == entry:
+                metadata_cache[used_path] = entry
+                self._cache_dirty = True
+        except (TypeError, ValueError):
+            pass
         return used_path, order, captions, custom_metadata
 
     def parse_index(self, gallery, input_folder, output_folder):
         """Return a Post object if there is an index.txt."""
+        key = (gallery, input_folder, output_folder)
+        if key not in self._index_posts:
+            self._index_posts[key] = self._parse_index(gallery, input_folder, output_folder)
+        return self._index_posts[key]
+
+    def _parse_index(self, gallery, input_folder, output_folder):
         index_path = os.path.join(gallery, "index.txt")
         destination = os.path.join(output_folder,
                                    os.path.relpath(gallery, input_folder))
@@ -551,11 +651,9 @@ class Galleries(Task, ImageProcessor):
     def get_image_list(self, gallery_path):
         """Get list of included images."""
         # Gather image_list contains "gallery/name/image_name.jpg"
-        image_list = []
-
-        for ext in self.image_ext_list:
-            image_list += glob.glob(gallery_path + '/*' + ext.lower()) +\
-                glob.glob(gallery_path + '/*' + ext.upper())
+        extensions = tuple(ext.lower() for ext in self.image_ext_list) + tuple(ext.upper() for ext in self.image_ext_list)
+        image_list = [os.path.join(gallery_path, f) for f in self.list_directory(gallery_path)[1]
+                      if f.endswith(extensions) and not f.startswith('.')]
 
         # Filter ignored images
         excluded_image_list = self.get_excluded_images(gallery_path)
@@ -583,11 +681,16 @@ class Galleries(Task, ImageProcessor):
             ".thumbnail".join([fname, ext]))
         # thumb_path is "output/GALLERY_PATH/name/image_name.jpg"
         orig_dest_path = os.path.join(output_gallery, img_name)
+        targets = [thumb_path, orig_dest_path]
+        metadata_path = None
+        if self.kw['image_placeholders']:
+            metadata_path = image_metadata_path(self.site.config, orig_dest_path)
+            targets.append(metadata_path)
         yield utils.apply_filters({
             'basename': self.name,
             'name': orig_dest_path,
             'file_dep': [img],
-            'targets': [thumb_path, orig_dest_path],
+            'targets': targets,
             'actions': [
                 (self.resize_image,
                     [img], {
@@ -596,7 +699,9 @@ class Galleries(Task, ImageProcessor):
                         'bigger_panoramas': True,
                         'preserve_exif_data': self.kw['preserve_exif_data'],
                         'exif_whitelist': self.kw['exif_whitelist'],
-                        'preserve_icc_profiles': self.kw['preserve_icc_profiles']})],
+                        'preserve_icc_profiles': self.kw['preserve_icc_profiles'],
+                        'metadata_path': metadata_path,
+                        'optimize_svg': self.kw['optimize_svg_images']})],
             'clean': True,
             'uptodate': [utils.config_changed({
                 1: self.kw['thumbnail_size'],
@@ -604,6 +709,8 @@ class Galleries(Task, ImageProcessor):
                 3: self.kw['preserve_exif_data'],
                 4: self.kw['exif_whitelist'],
                 5: self.kw['preserve_icc_profiles'],
+                6: self.kw['image_placeholders'],
+                7: self.kw['optimize_svg_images'],
             }, 'nikola.plugins.task.galleries:resize_thumb')],
         }, self.kw['filters'])
 
@@ -642,39 +749,154 @@ class Galleries(Task, ImageProcessor):
             'uptodate': [utils.config_changed(self.kw.copy(), 'nikola.plugins.task.galleries:clean_file')],
         }, self.kw['filters'])
 
-    def render_gallery_index(
+    def create_gallery_pages(
             self,
             template_name,
-            output_name,
+            dst,
             context,
-            img_list,
+            image_list,
             img_titles,
             thumbs,
-            img_metadata):
-        """Build the gallery index."""
-        # The photo array needs to be created here, because
-        # it relies on thumbnails already being created on
-        # output
+            dest_img_list,
+            img_metadata,
+            page_deps):
+        """Create tasks for a gallery split into pages of GALLERY_PHOTOS_PER_PAGE photos.
+
+        Every page gets its own task, which depends only on the images
+        shown on it, and writes the photo data into a separate JSON file
+        loaded by the page, instead of inlining it.
+        """
+        lang = context['lang']
+        per_page = self.kw['photos_per_page']
+        all_data = self.sort_photos(
+            list(zip(image_list, thumbs, dest_img_list, img_titles)),
+            context['order'])
+        pages = [all_data[i:i + per_page] for i in range(0, len(all_data), per_page)] or [[]]
+        num_pages = len(pages)
+        gallery_folder = os.path.dirname(dst)
+        page_links = [utils.adjust_name_for_index_link(context['permalink'], i, i + 1, lang, self.site)
+                      for i in range(num_pages)]
+
+        for i, page in enumerate(pages):
+            page_dst = utils.adjust_name_for_index_path(dst, i, i + 1, lang, self.site)
+            json_dst = os.path.join(gallery_folder, 'photos-{0}.json'.format(i + 1))
+            page_images = [d[0] for d in page]
+            page_thumbs = [d[1] for d in page]
+            page_dest_images = [d[2] for d in page]
+
+            page_context = context.copy()
+            page_context['permalink'] = page_links[i]
+            page_context['current_page'] = i
+            page_context['page_links'] = page_links
+            page_context['prevlink'] = page_links[i - 1] if i > 0 else None
+            page_context['nextlink'] = page_links[i + 1] if i < num_pages - 1 else None
+            page_context['prev_next_links_reversed'] = False
+            page_context['photo_array_url'] = '/'.join(
+                os.path.relpath(json_dst, os.path.dirname(page_dst)).split(os.sep))
+            # Captions and order of other pages should not trigger a rebuild
+            page_uptodate_context = {k: v for k, v in page_context.items()
+                                     if k not in ('order', 'captions')}
+
+            yield utils.apply_filters({
+                'basename': self.name,
+                'name': page_dst,
+                'file_dep': page_deps + page_images + page_thumbs + page_dest_images,
+                'targets': [page_dst, json_dst],
+                'actions': [
+                    (self.render_gallery_page, (
+                        template_name,
+                        page_dst,
+                        json_dst,
+                        page_context.copy(),
+                        page_dest_images,
+                        [d[3] for d in page],
+                        page_thumbs,
+                        img_metadata))],
+                'clean': True,
+                'uptodate': [utils.config_changed({
+                    1: self.kw.copy(),
+                    2: self.site.config["COMMENTS_IN_GALLERIES"],
+                    3: page_uptodate_context,
+                    4: [(os.path.basename(d[0]), d[3], img_metadata.get(os.path.basename(d[0]))) for d in page],
+                }, 'nikola.plugins.task.galleries:gallery_page')],
+            }, self.kw['filters'])
+
+        for task in self.remove_stale_gallery_pages(dst, lang, num_pages, num_pages):
+            yield task
 
-        def url_from_path(p):
-            url = '/'.join(os.path.relpath(p, os.path.dirname(output_name) + os.sep).split(os.sep))
-            return url
+    def remove_stale_gallery_pages(self, dst, lang, num_pages, num_photo_files):
+        """Create a task removing gallery pages and photo files beyond the ones built now.
 
-        all_data = list(zip(img_list, thumbs, img_titles))
+        They are left over when GALLERY_PHOTOS_PER_PAGE is lowered or turned
+        off, or when photos are removed from the gallery.  The task runs when
+        the set of pages that are built changes.
+        """
+        gallery_folder = os.path.dirname(dst)
+        expected = [utils.adjust_name_for_index_path(dst, i, i + 1, lang, self.site) for i in range(num_pages)]
+        expected += [os.path.join(gallery_folder, 'photos-{0}.json'.format(i + 1)) for i in range(num_photo_files)]
+        yield utils.apply_filters({
+            'basename': self.name,
+            'name': dst + ':stale_pages',
+            'actions': [
+                (self.remove_pages_after, (dst, lang, num_pages, num_photo_files))
+            ],
+            'uptodate': [utils.config_changed({
+                1: expected,
+            }, 'nikola.plugins.task.galleries:stale_pages')],
+        }, self.kw['filters'])
 
+    def remove_pages_after(self, dst, lang, num_pages, num_photo_files):
+        """Remove the gallery pages and photo files after the given numbers of them."""
+        gallery_folder = os.path.dirname(dst)
+        i = num_pages
+        while True:
+            page_dst = utils.adjust_name_for_index_path(dst, i, i + 1, lang, self.site)
+            if not os.path.isfile(page_dst):
+                break
+            utils.remove_file(page_dst)
+            i += 1
+        i = num_photo_files
+        while True:
+            json_dst = os.path.join(gallery_folder, 'photos-{0}.json'.format(i + 1))
+            if not os.path.isfile(json_dst):
+                break
+            utils.remove_file(json_dst)
+            i += 1
+
+    def sort_photos(self, all_data, order):
+        """Sort gallery data by date or name, then apply the order from metadata.yml.
+
+        all_data is a list of tuples whose first element is the image path.
+        Images not listed in the order are placed after the listed ones.
+        """
         if self.kw['sort_by_date']:
             all_data.sort(key=lambda a: self.image_date(a[0]))
         else:  # Sort by name
             all_data.sort(key=lambda a: a[0])
 
-        if all_data:
-            img_list, thumbs, img_titles = zip(*all_data)
-        else:
-            img_list, thumbs, img_titles = [], [], []
+        if order:
+            by_name = OrderedDict((os.path.basename(a[0]), a) for a in all_data)
+            all_data = [by_name.pop(entry) for entry in order if entry in by_name] + list(by_name.values())
+        return all_data
+
+    def get_photo_array(self, output_name, img_list, thumbs, img_titles, img_metadata):
+        """Get the photo array for a gallery page, in the order of img_list."""
+        # The photo array needs to be created at render time, because
+        # it relies on thumbnails already being created on
+        # output
+
+        def url_from_path(p):
+            url = '/'.join(os.path.relpath(p, os.path.dirname(output_name) + os.sep).split(os.sep))
+            return url
 
         photo_info = OrderedDict()
         for img, thumb, title in zip(img_list, thumbs, img_titles):
+            image_metadata = {}
+            if self.kw['image_placeholders']:
+                image_metadata = read_image_metadata(self.site.config, img)
             w, h = _image_size_cache.get(thumb, (None, None))
+            if os.path.basename(thumb) in image_metadata.get('sizes', {}):
+                w, h = image_metadata['sizes'][os.path.basename(thumb)]
             if w is None:
                 if os.path.splitext(thumb)[1] in ['.svg', '.svgz']:
                     w, h = 200, 200
@@ -697,24 +919,55 @@ class Galleries(Task, ImageProcessor):
                 'width': w,
                 'height': h
             }
+            for key in ('placeholder', 'dominant_color'):
+                if key in image_metadata:
+                    photo_info[img_basename][key] = image_metadata[key]
             if img_basename in img_metadata:
                 photo_info[img_basename].update(img_metadata[img_basename])
-        photo_array = []
-        if context['order']:
-            for entry in context['order']:
-                photo_array.append(photo_info.pop(entry))
-            # Do we have any orphan entries from metadata.yml, or
-            # are the files from the gallery not listed in metadata.yml?
-            if photo_info:
-                for entry in photo_info:
-                    photo_array.append(photo_info[entry])
+        return photo_info
+
+    def render_gallery_index(
+            self,
+            template_name,
+            output_name,
+            context,
+            img_list,
+            img_titles,
+            thumbs,
+            img_metadata):
+        """Build the gallery index."""
+        all_data = self.sort_photos(list(zip(img_list, thumbs, img_titles)), context['order'])
+        if all_data:
+            img_list, thumbs, img_titles = zip(*all_data)
         else:
-            for entry in photo_info:
-                photo_array.append(photo_info[entry])
+            img_list, thumbs, img_titles = [], [], []
+        photo_array = list(self.get_photo_array(output_name, img_list, thumbs, img_titles, img_metadata).values())
 
         context['photo_array'] = photo_array
         context['photo_array_json'] = json.dumps(photo_array, sort_keys=True)
+        context['photo_array_url'] = None
+
+        self.site.render_template(template_name, output_name, context)
 
+    def render_gallery_page(
+            self,
+            template_name,
+            output_name,
+            json_name,
+            context,
+            img_list,
+            img_titles,
+            thumbs,
+            img_metadata):
+        """Build one page of a paginated gallery and its photo data file."""
+        photo_array = list(self.get_photo_array(output_name, img_list, thumbs, img_titles, img_metadata).values())
+
+        utils.makedirs(os.path.dirname(json_name))
+        with io.open(json_name, "w", encoding="utf-8") as outf:
+            json.dump(photo_array, outf, sort_keys=True)
+
+        context['photo_array'] = photo_array
+        context['photo_array_json'] = None
         self.site.render_template(template_name, output_name, context)
 
     def gallery_rss(self, img_list, dest_img_list, img_titles, lang, permalink, output_path, title):
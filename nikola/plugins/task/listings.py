@@ -30,7 +30,6 @@ import os
 from collections import defaultdict
 
 import natsort
-from pygments import highlight
 from pygments.lexers import get_lexer_for_filename, guess_lexer, TextLexer
 
 from nikola.plugin_categories import Task
@@ -135,7 +134,7 @@ class Listings(Task):
                         except Exception:
                             lexer = TextLexer()
                         fd.seek(0)
-                    code = highlight(
+                    code = utils.highlight_code(
                         fd.read(), lexer,
                         utils.NikolaPygmentsHTML(in_name, linenos='table'))
                 title = os.path.basename(in_name)
@@ -40,8 +40,11 @@ def update_deps(post, lang, task):
     This is done for example by the ReST page compiler, which writes its
     dependencies into a .dep file. This file is read and incorporated when calling
     post.fragment_deps(), and only available /after/ compiling the fragment.
+
+    Files that do not exist yet (like the metadata of images that are not
+    resized yet) are only added by the next build, which orders the tasks.
     """
-    task.file_dep.update([p for p in post.fragment_deps(lang) if not p.startswith("####MAGIC####")])
+    task.file_dep.update([p for p in post.fragment_deps(lang) if not p.startswith("####MAGIC####") and os.path.exists(p)])
 
 
 class RenderPosts(Task):
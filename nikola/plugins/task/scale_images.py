@@ -29,7 +29,7 @@
 import os
 
 from nikola.plugin_categories import Task
-from nikola.image_processing import ImageProcessor
+from nikola.image_processing import ImageProcessor, image_metadata_path
 from nikola import utils
 
 
@@ -56,15 +56,20 @@ class ScaleImage(Task, ImageProcessor):
                     name=thumb_name,
                     ext=thumb_ext,
                 ))
+                targets = [dst_file, thumb_file]
+                metadata_file = None
+                if self.kw['image_placeholders']:
+                    metadata_file = image_metadata_path(self.site.config, dst_file)
+                    targets.append(metadata_file)
                 yield {
                     'name': dst_file,
                     'file_dep': [src_file],
-                    'targets': [dst_file, thumb_file],
-                    'actions': [(self.process_image, (src_file, dst_file, thumb_file))],
+                    'targets': targets,
+                    'actions': [(self.process_image, (src_file, dst_file, thumb_file, metadata_file))],
                     'clean': True,
                 }
 
-    def process_image(self, src, dst, thumb):
+    def process_image(self, src, dst, thumb, metadata=None):
         """Resize an image."""
         self.resize_image(
             src,
@@ -73,7 +78,9 @@ class ScaleImage(Task, ImageProcessor):
             bigger_panoramas=True,
             preserve_exif_data=self.kw['preserve_exif_data'],
             exif_whitelist=self.kw['exif_whitelist'],
-            preserve_icc_profiles=self.kw['preserve_icc_profiles']
+            preserve_icc_profiles=self.kw['preserve_icc_profiles'],
+            metadata_path=metadata,
+            optimize_svg=self.kw['optimize_svg_images'],
         )
 
     def gen_tasks(self):
@@ -88,6 +95,8 @@ class ScaleImage(Task, ImageProcessor):
             'preserve_exif_data': self.site.config['PRESERVE_EXIF_DATA'],
             'exif_whitelist': self.site.config['EXIF_WHITELIST'],
             'preserve_icc_profiles': self.site.config['PRESERVE_ICC_PROFILES'],
+            'image_placeholders': self.site.config['IMAGE_PLACEHOLDERS'],
+            'optimize_svg_images': self.site.config.get('OPTIMIZE_SVG_IMAGES', False),
         }
 
         self.image_ext_list = self.image_ext_list_builtin
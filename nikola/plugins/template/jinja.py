@@ -26,20 +26,49 @@
 
 """Jinja template handler."""
 
+import hashlib
 import io
 import json
 import os
+from collections import OrderedDict
 from typing import Callable, Optional
 
+from nikola import __version__
 from nikola.plugin_categories import TemplateSystem
-from nikola.utils import makedirs, req_missing, slugify, sort_posts, _smartjoin_filter
+from nikola.utils import TemplateDependencyCache, get_logger, makedirs, req_missing, slugify, sort_posts, write_json_atomic, _smartjoin_filter
 
 try:
     import jinja2
     import jinja2.nodes
     from jinja2 import meta
+    from jinja2.ext import Extension
+    from jinja2.loaders import BaseLoader, split_template_path
 except ImportError:
     jinja2 = None
+    Extension = BaseLoader = object
+
+LOGGER = get_logger('jinja')
+
+# How many compiled template strings (from shortcodes) to keep
+STRING_TEMPLATE_CACHE_SIZE = 200
+
+# Environment settings that change the code templates are compiled to
+COMPILE_SETTINGS = (
+    'block_start_string', 'block_end_string', 'variable_start_string',
+    'variable_end_string', 'comment_start_string', 'comment_end_string',
+    'line_statement_prefix', 'line_comment_prefix', 'trim_blocks',
+    'lstrip_blocks', 'newline_sequence', 'keep_trailing_newline', 'optimized',
+)
+
+
+def environment_fingerprint(environment):
+    """Return a hash of the extensions and settings templates are compiled with."""
+    autoescape = environment.autoescape
+    if not isinstance(autoescape, bool):
+        autoescape = '{0.__module__}.{0.__qualname__}'.format(autoescape)
+    settings = [sorted(environment.extensions), autoescape]
+    settings += [getattr(environment, name) for name in COMPILE_SETTINGS]
+    return hashlib.sha256(json.dumps(settings).encode('utf-8')).hexdigest()
 
 
 class JinjaTemplates(TemplateSystem):
@@ -57,6 +86,7 @@ class JinjaTemplates(TemplateSystem):
 
     dependency_cache = {}
     per_file_cache = {}
+    deps_cache = TemplateDependencyCache()
 
     def __init__(self):
         """Initialize Jinja2 environment with extended set of filters."""
@@ -74,10 +104,13 @@ class JinjaTemplates(TemplateSystem):
         """Create a new template lookup with set directories."""
         if jinja2 is None:
             req_missing(['jinja2'], 'use this theme')
+        self.modules_folder = os.path.join(cache_folder, 'jinja_modules')
         cache_folder = os.path.join(cache_folder, 'jinja')
         makedirs(cache_folder)
         cache = jinja2.FileSystemBytecodeCache(cache_folder)
+        self.deps_cache = TemplateDependencyCache(os.path.abspath(os.path.join(cache_folder, 'template_deps.json')))
         self.lookup = self._environment_factory(bytecode_cache=cache)
+        self.lookup.add_extension(PartialCacheExtension)
         self.lookup.trim_blocks = True
         self.lookup.lstrip_blocks = True
         self.lookup.filters['tojson'] = json.dumps
@@ -98,8 +131,9 @@ class JinjaTemplates(TemplateSystem):
 
     def create_lookup(self):
         """Create a template lookup."""
-        self.lookup.loader = jinja2.FileSystemLoader(self.directories,
-                                                     encoding='utf-8')
+        self.lookup.loader = PrecompiledLoader(self.directories, self.modules_folder)
+        self.lookup.partial_cache.clear()
+        self._string_templates = OrderedDict()
 
     def set_site(self, site):
         """Set the Nikola site."""
@@ -120,20 +154,44 @@ class JinjaTemplates(TemplateSystem):
 
     def render_template_to_string(self, template, context):
         """Render template to a string using context."""
-        return self.lookup.from_string(template).render(**context)
+        return self._get_string_template(template).render(**context)
+
+    def _get_string_template(self, text):
+        """Return the compiled template for text, compiling it only once."""
+        try:
+            template = self._string_templates[text]
+            self._string_templates.move_to_end(text)
+        except KeyError:
+            template = self.lookup.from_string(text)
+            self._string_templates[text] = template
+            if len(self._string_templates) > STRING_TEMPLATE_CACHE_SIZE:
+                self._string_templates.popitem(last=False)
+        return template
 
     def get_string_deps(self, text, context=None):
         """Find dependencies for a template string."""
-        deps = set([])
+        return self._deps_from_refs(self._template_refs(text), context)
+
+    def _template_refs(self, text):
+        """Return the names of the templates referenced in text.
+
+        Names built with the % operator are returned as a (format, variable)
+        pair, since they depend on the context.
+        """
         ast = self.lookup.parse(text)
-        simple_dep_names = [d for d in meta.find_referenced_templates(ast) if d]
-        formatted_dep_names = [
-            imp.template.left.value % (context[imp.template.right.name],)
+        refs = [[name] for name in meta.find_referenced_templates(ast) if name]
+        refs += [
+            [imp.template.left.value, imp.template.right.name]
             for imp in ast.find_all(jinja2.nodes.Import)
             if isinstance(imp.template, jinja2.nodes.Mod)
         ]
-        dep_names = simple_dep_names + formatted_dep_names
-        for dep_name in dep_names:
+        return refs
+
+    def _deps_from_refs(self, refs, context):
+        """Return paths to the templates in refs and their dependencies."""
+        deps = set([])
+        for ref in refs:
+            dep_name = ref[0] if len(ref) == 1 else ref[0] % (context[ref[1]],)
             filename = self.lookup.loader.get_source(self.lookup, dep_name)[1]
             sub_deps = [filename] + self.get_deps(filename, context)
             self.dependency_cache[dep_name] = sub_deps
@@ -142,9 +200,12 @@ class JinjaTemplates(TemplateSystem):
 
     def get_deps(self, filename, context=None):
         """Return paths to dependencies for the template loaded from filename."""
-        with io.open(filename, 'r', encoding='utf-8-sig') as fd:
-            text = fd.read()
-        return self.get_string_deps(text, context)
+        refs = self.deps_cache.refs(filename, lambda data: self._template_refs(data.decode('utf-8-sig')))
+        return self._deps_from_refs(refs, context)
+
+    def save_caches(self):
+        """Save the template dependency cache."""
+        self.deps_cache.save()
 
     def template_deps(self, template_name, context=None):
         """Generate list of dependencies for a template."""
@@ -153,6 +214,40 @@ class JinjaTemplates(TemplateSystem):
             self.dependency_cache[template_name] = [filename] + self.get_deps(filename, context)
         return self.dependency_cache[template_name]
 
+    def precompile(self):
+        """Compile the templates into modules that are loaded instead of the sources.
+
+        Return the number of compiled templates.
+        """
+        makedirs(self.modules_folder)
+        for fname in os.listdir(self.modules_folder):
+            if fname.startswith('tmpl_') and fname.endswith('.py'):
+                os.remove(os.path.join(self.modules_folder, fname))
+        source_loader = self.lookup.loader.source_loader
+        sources = {}
+        for name in source_loader.list_templates():
+            if not name.endswith('.tmpl'):
+                continue
+            source, filename, _ = source_loader.get_source(self.lookup, name)
+            try:
+                code = self.lookup.compile(source, name, filename, raw=True, defer_init=True)
+            except jinja2.TemplateSyntaxError as e:
+                LOGGER.warning('Cannot compile {0}: {1}'.format(filename, e))
+                continue
+            module_path = os.path.join(self.modules_folder, jinja2.ModuleLoader.get_module_filename(name))
+            with io.open(module_path, 'w', encoding='utf-8') as outf:
+                outf.write(code)
+            sources[name] = os.path.abspath(filename)
+        manifest_path = os.path.join(self.modules_folder, PrecompiledLoader.manifest_name)
+        write_json_atomic(manifest_path, {
+            'jinja2': jinja2.__version__,
+            'nikola': __version__,
+            'environment': environment_fingerprint(self.lookup),
+            'templates': sources,
+        })
+        self.create_lookup()
+        return len(sources)
+
     def get_template_path(self, template_name):
         """Get the path to a template or return None."""
         try:
@@ -160,3 +255,114 @@ class JinjaTemplates(TemplateSystem):
             return t.filename
         except jinja2.TemplateNotFound:
             return None
+
+
+class PartialCacheExtension(Extension):
+    """Render a part of a template once per key.
+
+    ``{% cache_partial lang %}...{% endcache_partial %}`` renders its
+    body the first time it is reached with a given key (one or more
+    comma-separated expressions), and reuses the output for the rest of
+    the build.
+    """
+
+    tags = {'cache_partial'}
+
+    def __init__(self, environment):
+        """Add the partial cache to the environment."""
+        super().__init__(environment)
+        environment.extend(partial_cache={})
+
+    def parse(self, parser):
+        """Parse a cache_partial block."""
+        lineno = next(parser.stream).lineno
+        key = parser.parse_tuple()
+        body = parser.parse_statements(['name:endcache_partial'], drop_needle=True)
+        # Templates from strings have no name, so the block is named after
+        # its contents: compiling the same string again reuses its entries
+        name = parser.name or '<string {0}>'.format(
+            hashlib.sha256(repr((key, body)).encode('utf-8')).hexdigest())
+        block_id = jinja2.nodes.Const('{0}:{1}'.format(name, lineno))
+        return jinja2.nodes.CallBlock(self.call_method('_cache_partial', [block_id, key]),
+                                      [], [], body).set_lineno(lineno)
+
+    def _cache_partial(self, block_id, key, caller):
+        """Return the cached output for key, rendering it if needed."""
+        try:
+            cache_key = (block_id, key)
+            hash(cache_key)
+        except TypeError:
+            # pagekind and other lists
+            cache_key = (block_id, repr(key))
+        try:
+            return self.environment.partial_cache[cache_key]
+        except KeyError:
+            value = self.environment.partial_cache[cache_key] = caller()
+            return value
+
+
+class PrecompiledLoader(BaseLoader):
+    """Load templates from modules written by ``nikola theme --precompile``.
+
+    A module is only used if it was compiled from the file the search path
+    finds now, by the same Jinja and Nikola versions, with the same
+    extensions and settings (see environment_fingerprint), and is newer
+    than that file.  Other templates are compiled from source as usual.
+    """
+
+    manifest_name = 'templates.json'
+
+    def __init__(self, searchpath, modules_folder):
+        """Create a loader for searchpath, using the modules in modules_folder."""
+        self.source_loader = jinja2.FileSystemLoader(searchpath, encoding='utf-8')
+        self.modules_folder = modules_folder
+        self.sources = {}
+        self.fingerprint = None
+        try:
+            with io.open(os.path.join(modules_folder, self.manifest_name), 'r', encoding='utf-8') as inf:
+                manifest = json.load(inf)
+            if manifest.get('jinja2') == jinja2.__version__ and manifest.get('nikola') == __version__:
+                self.sources = manifest['templates']
+                self.fingerprint = manifest['environment']
+        except (OSError, ValueError, KeyError, AttributeError):
+            self.sources = {}
+        self.module_loader = jinja2.ModuleLoader(modules_folder) if self.sources else None
+
+    def get_source(self, environment, template):
+        """Return the source of a template."""
+        return self.source_loader.get_source(environment, template)
+
+    def list_templates(self):
+        """Return the names of the templates in the search path."""
+        return self.source_loader.list_templates()
+
+    def load(self, environment, name, globals=None):
+        """Load a template, from its module if it is up to date."""
+        filename = self._module_source(environment, name)
+        if filename is None:
+            return self.source_loader.load(environment, name, globals)
+        template = self.module_loader.load(environment, name, globals)
+        template.filename = filename
+        return template
+
+    def _module_source(self, environment, name):
+        """Return the source file of the module for name, if it can be used."""
+        filename = self.sources.get(name)
+        if filename is None or environment_fingerprint(environment) != self.fingerprint:
+            return None
+        pieces = split_template_path(name)
+        for searchpath in self.source_loader.searchpath:
+            candidate = os.path.abspath(os.path.join(searchpath, *pieces))
+            if os.path.isfile(candidate):
+                break
+        else:
+            return None
+        if candidate != filename:
+            return None
+        module_path = os.path.join(self.modules_folder, jinja2.ModuleLoader.get_module_filename(name))
+        try:
+            if os.stat(module_path).st_mtime_ns < os.stat(filename).st_mtime_ns:
+                return None
+        except OSError:
+            return None
+        return filename
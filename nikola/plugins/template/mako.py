@@ -26,22 +26,30 @@
 
 """Mako template handler."""
 
+import glob
+import hashlib
+import importlib.util
 import io
 import os
 import re
-import shutil
+from collections import OrderedDict
 from typing import Callable
 
-from mako import exceptions, util, lexer, parsetree
+import mako
+import mako.cache
+from mako import codegen, exceptions, lexer, parsetree
 from mako.lookup import TemplateLookup
 from mako.template import Template
 from markupsafe import Markup  # It's ok, Mako requires it
 
 from nikola.plugin_categories import TemplateSystem
-from nikola.utils import makedirs, get_logger
+from nikola.utils import TemplateDependencyCache, makedirs, get_logger
 
 LOGGER = get_logger('mako')
 
+# How many compiled template strings (from shortcodes) to keep
+STRING_TEMPLATE_CACHE_SIZE = 200
+
 
 class MakoTemplates(TemplateSystem):
     """Support for Mako templates."""
@@ -53,6 +61,8 @@ class MakoTemplates(TemplateSystem):
     filters = {}
     directories = []
     cache_dir = None
+    deps_cache = TemplateDependencyCache()
+    _checked_modules = set()
 
     def _basic_environment_factory(self, **args) -> TemplateLookup:
         return TemplateLookup(**args)
@@ -61,40 +71,52 @@ class MakoTemplates(TemplateSystem):
 
     def get_string_deps(self, text, context=None, *, filename=None):
         """Find dependencies for a template string."""
+        return self._deps_from_refs(self._template_refs(text, filename), context, filename)
+
+    def _template_refs(self, text, filename=None):
+        """Return the file attributes of the inherit, namespace and include tags in text."""
         lex = lexer.Lexer(text=text, filename=filename, input_encoding='utf-8')
         lex.parse()
 
-        deps = []
+        refs = []
         for n in lex.template.nodes:
             keyword = getattr(n, 'keyword', None)
             if keyword in ["inherit", "namespace"] or isinstance(n, parsetree.IncludeTag):
-                filename = n.attributes["file"]
-                if '${' in filename:
-                    # Support for comment helper inclusions
-                    filename = re.sub(r'''\${context\[['"](.*?)['"]]}''', lambda m: context[m.group(1)], filename)
-                deps.append(filename)
-        # Some templates will include "foo.tmpl" and we need paths, so normalize them
-        # using the template lookup
-        for i, d in enumerate(deps):
-            dep = self.get_template_path(d)
+                refs.append(n.attributes["file"])
+        return refs
+
+    def _deps_from_refs(self, refs, context, filename):
+        """Return paths to the templates in refs."""
+        deps = []
+        for ref in refs:
+            if '${' in ref:
+                # Support for comment helper inclusions
+                ref = re.sub(r'''\${context\[['"](.*?)['"]]}''', lambda m: context[m.group(1)], ref)
+            # Some templates will include "foo.tmpl" and we need paths, so normalize them
+            # using the template lookup
+            dep = self.get_template_path(ref)
             if dep:
-                deps[i] = dep
+                deps.append(dep)
             else:
                 LOGGER.error("Cannot find template %s referenced in %s",
-                             d, filename)
+                             ref, filename)
+                deps.append(ref)
         return deps
 
     def get_deps(self, filename, context=None):
         """Get paths to dependencies for a template."""
-        text = util.read_file(filename)
-        return self.get_string_deps(text, context, filename=filename)
+        refs = self.deps_cache.refs(filename, lambda data: self._template_refs(data, filename))
+        return self._deps_from_refs(refs, context, filename)
+
+    def save_caches(self):
+        """Save the template dependency cache."""
+        self.deps_cache.save()
 
     def set_directories(self, directories, cache_folder):
         """Create a new template lookup with set directories."""
         cache_dir = os.path.join(cache_folder, '.mako.tmp')
-        if os.path.exists(cache_dir):
-            shutil.rmtree(cache_dir)
         self.directories = directories
+        self.deps_cache = TemplateDependencyCache(os.path.abspath(os.path.join(cache_dir, 'template_deps.json')))
         self.cache_dir = cache_dir
         self.create_lookup()
 
@@ -109,8 +131,44 @@ class MakoTemplates(TemplateSystem):
         self.lookup = self._basic_environment_factory(
             directories=self.directories,
             module_directory=self.cache_dir,
+            modulename_callable=self._module_filename if self.cache_dir else None,
+            cache_impl='nikola',
             input_encoding='utf-8',
             output_encoding='utf-8')
+        self._string_templates = OrderedDict()
+
+    def _module_filename(self, filename, uri):
+        """Return the path of the compiled module for a template.
+
+        The module is named after a hash of the template's contents and
+        path, and of the Mako version, so a module left over from another
+        theme, template or Mako release is never loaded.
+        """
+        with open(filename, 'rb') as inf:
+            data = inf.read()
+        digest = hashlib.sha256()
+        for part in (mako.__version__, str(codegen.MAGIC_NUMBER), filename):
+            digest.update(part.encode('utf-8') + b'\0')
+        digest.update(data)
+        base = os.path.normpath(os.path.join(self.cache_dir, uri.replace('\\', '/').lstrip('/')))
+        path = '{0}.{1}.py'.format(base, digest.hexdigest()[:16])
+        if path not in self._checked_modules:
+            self._remove_stale_modules(base, path)
+            self._checked_modules.add(path)
+        return path
+
+    def _remove_stale_modules(self, base, keep):
+        """Remove compiled modules of the template at base, except keep."""
+        pattern = glob.escape(base)
+        for path in glob.glob(pattern + '.py') + glob.glob(pattern + '.' + '[0-9a-f]' * 16 + '.py'):
+            if path == keep:
+                continue
+            for stale in (path, importlib.util.cache_from_source(path)):
+                try:
+                    os.remove(stale)
+                    LOGGER.debug("Removed stale template module %s", stale)
+                except FileNotFoundError:
+                    pass
 
     def set_site(self, site):
         """Set the Nikola site."""
@@ -138,7 +196,19 @@ class MakoTemplates(TemplateSystem):
     def render_template_to_string(self, template, context):
         """Render template to a string using context."""
         context.update(self.filters)
-        return Template(template, lookup=self.lookup).render(**context)
+        return self._get_string_template(template).render(**context)
+
+    def _get_string_template(self, text):
+        """Return the compiled template for text, compiling it only once."""
+        try:
+            template = self._string_templates[text]
+            self._string_templates.move_to_end(text)
+        except KeyError:
+            template = Template(text, lookup=self.lookup)
+            self._string_templates[text] = template
+            if len(self._string_templates) > STRING_TEMPLATE_CACHE_SIZE:
+                self._string_templates.popitem(last=False)
+        return template
 
     def template_deps(self, template_name, context=None):
         """Generate list of dependencies for a template."""
@@ -163,6 +233,45 @@ class MakoTemplates(TemplateSystem):
             return None
 
 
+class PartialCache(mako.cache.CacheImpl):
+    """Keep the output of cached defs and blocks in memory.
+
+    Lets themes render a partial once per key, for example
+    ``<%block name="footer" cached="True" cache_key="footer-${lang}">``.
+    Values are kept as long as the template is, which is for the whole
+    build, so Beaker is not needed and the cache arguments it supports
+    (such as cache_timeout) are ignored.
+    """
+
+    def __init__(self, cache):
+        """Create an empty cache for a template."""
+        super().__init__(cache)
+        self._values = {}
+
+    def get_or_create(self, key, creation_function, **kw):
+        """Return the value for key, creating it if needed."""
+        try:
+            return self._values[key]
+        except KeyError:
+            value = self._values[key] = creation_function()
+            return value
+
+    def set(self, key, value, **kw):
+        """Store value under key."""
+        self._values[key] = value
+
+    def get(self, key, **kw):
+        """Return the value for key, or None."""
+        return self._values.get(key)
+
+    def invalidate(self, key, **kw):
+        """Forget the value for key."""
+        self._values.pop(key, None)
+
+
+mako.cache.register_plugin('nikola', __name__, 'PartialCache')
+
+
 def striphtml(text):
     """Strip HTML tags from text."""
     return Markup(text).striptags()
@@ -37,14 +37,13 @@ from math import ceil  # for reading time feature
 from urllib.parse import urljoin
 
 import dateutil.tz
-import lxml.html
-import natsort
 from blinker import signal
 
 # for tearDown with _reload we cannot use 'from import' to get forLocaleBorg
 import nikola.utils
 from . import metadata_extractors
 from . import utils
+from .compile_cache import CompileCache
 from .utils import (
     current_time,
     Functionary,
@@ -182,6 +181,7 @@ class Post:
 
     def _set_tags(self):
         """Set post tags."""
+        import natsort
         self._tags = {}
         for lang in self.translated_to:
             if isinstance(self.meta[lang]['tags'], (list, tuple, set)):
@@ -726,12 +726,26 @@ class Post:
             return
         # Set the language to the right thing
         LocaleBorg().set_locale(lang)
-        self.compile_html(
-            self.translated_source_path(lang),
-            dest,
-            self.is_two_file,
-            self,
-            lang)
+        cache = None
+        deps = None
+        known_deps = len(self._depfile[dest])
+        if (self.config.get('FRAGMENT_CACHE_FOLDER') and
+                set(self.compiler.get_extra_targets(self, lang, dest)) <= {self.compiler.get_dep_filename(self, lang)}):
+            cache = CompileCache(self.config['FRAGMENT_CACHE_FOLDER'])
+            key = cache.key(self, lang, self._fragment_source_deps(lang))
+            deps = cache.get(key, dest)
+        if deps is not None:
+            LOGGER.debug('Using cached fragment for {0} ({1})'.format(self.source_path, lang))
+            self._depfile[dest] += deps
+        else:
+            result = self.compile_html(
+                self.translated_source_path(lang),
+                dest,
+                self.is_two_file,
+                self,
+                lang)
+            if cache is not None and result is not False:
+                cache.put(key, dest, self._depfile[dest][known_deps:])
         Post.write_depfile(dest, self._depfile[dest], post=self, lang=lang)
 
         signal('compiled').send({
@@ -745,8 +759,8 @@ class Post:
             LOGGER.info('{0} is scheduled to be published in the future ({1})'.format(
                 self.source_path, self.date))
 
-    def fragment_deps(self, lang):
-        """Return a list of dependencies to build this post's fragment."""
+    def _fragment_source_deps(self, lang):
+        """Return the source and metadata files this post's fragment is built from."""
         deps = [self.source_path]
         if os.path.isfile(self.metadata_path):
             deps.append(self.metadata_path)
@@ -754,7 +768,11 @@ class Post:
         if lang != self.default_lang:
             lang_deps = [get_translation_candidate(self.config, d, lang) for d in deps]
             deps += lang_deps
-        deps = [d for d in deps if os.path.exists(d)]
+        return [d for d in deps if os.path.exists(d)]
+
+    def fragment_deps(self, lang):
+        """Return a list of dependencies to build this post's fragment."""
+        deps = self._fragment_source_deps(lang)
         deps += self._get_dependencies(self._dependency_file_fragment[lang])
         deps += self._get_dependencies(self._dependency_file_fragment[None])
         return sorted(deps)
@@ -882,6 +900,8 @@ class Post:
         All links in the returned HTML will be relative.
         The HTML returned is a bare fragment, not a full document.
         """
+        import lxml.etree
+        import lxml.html
         if lang is None:
             lang = nikola.utils.LocaleBorg().current_lang
         file_name, real_lang = self._translated_file_path(lang)
@@ -958,6 +978,7 @@ class Post:
     @property
     def reading_time(self):
         """Return reading time based on length of text."""
+        import lxml.html
         if self._reading_time is None:
             text = self.text(strip_html=True)
             words_per_minute = 220
@@ -983,6 +1004,8 @@ class Post:
     @property
     def paragraph_count(self):
         """Return the paragraph count for this post."""
+        import lxml.etree
+        import lxml.html
         if self._paragraph_count is None:
             # duplicated with Post.text()
             lang = nikola.utils.LocaleBorg().current_lang
@@ -1005,6 +1028,8 @@ class Post:
     @property
     def remaining_paragraph_count(self):
         """Return the remaining paragraph count for this post (does not include teaser)."""
+        import lxml.etree
+        import lxml.html
         if self._remaining_paragraph_count is None:
             try:
                 # Just asking self.text() is easier here.
@@ -1267,6 +1292,7 @@ def hyphenate(dom, _lang):
 
 def insert_hyphens(node, hyphenator):
     """Insert hyphens into a node."""
+    import lxml.etree
     textattrs = ('text', 'tail')
     if isinstance(node, lxml.etree._Entity):
         # HTML entities have no .text
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+
+# Copyright © 2012-2025 Roberto Alsina and others.
+
+# Permission is hereby granted, free of charge, to any
+# person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the
+# Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the
+# Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice
+# shall be included in all copies or substantial portions of
+# the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS
+# OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Indexes of the timeline, used to answer post list queries quickly."""
+
+import bisect
+import datetime
+from collections import defaultdict
+
+import dateutil.parser
+
+from .packages.datecond import CLAUSE, date_in_range
+
+
+class PostIndex:
+    """Inverted indexes and a date-sorted array for a timeline.
+
+    Indexes store positions in the timeline, so results keep the timeline
+    order.  Per-language indexes (categories, sections, tags, slugs) are
+    built the first time they are needed.  Query results are the same as
+    filtering the timeline post by post.
+    """
+
+    def __init__(self, timeline):
+        """Index timeline."""
+        self.timeline = timeline
+        self._size = len(timeline)
+        self._positions = {id(post): i for i, post in enumerate(timeline)}
+        self._posts = [i for i, post in enumerate(timeline) if post.use_in_feeds]
+        self._pages = [i for i, post in enumerate(timeline) if not post.use_in_feeds]
+        self._post_set = set(self._posts)
+        self._page_set = set(self._pages)
+        self._source_paths = defaultdict(set)
+        for i, post in enumerate(timeline):
+            self._source_paths[post.source_path].add(i)
+        try:
+            by_date = sorted(range(len(timeline)), key=lambda i: timeline[i].date)
+        except TypeError:  # Naive and aware dates can't be compared
+            self._dates = None
+        else:
+            self._dates = [timeline[i].date for i in by_date]
+            self._date_positions = by_date
+        self._indexes = {}
+
+    def is_for(self, timeline):
+        """Check if this index was built for timeline.
+
+        Changes to the posts themselves are not detected, the site drops
+        the index when it scans the posts again.
+        """
+        return timeline is self.timeline and len(timeline) == self._size
+
+    def _index(self, kind, lang):
+        """Return an index (value → set of positions) of the given kind for lang."""
+        index = self._indexes.get((kind, lang))
+        if index is None:
+            index = defaultdict(set)
+            for i, post in enumerate(self.timeline):
+                if kind == 'category':
+                    index[post.meta('category', lang=lang).lower()].add(i)
+                elif kind == 'section':
+                    index[post.section_name(lang).lower()].add(i)
+                elif kind == 'tag':
+                    for tag in {t.lower() for t in post.tags_for_language(lang)}:
+                        index[tag].add(i)
+                elif kind == 'slug':
+                    index[post.meta('slug', lang=lang)].add(i)
+            self._indexes[kind, lang] = index
+        return index
+
+    def query(self, post_type='post', categories=None, sections=None, tags=None,
+              require_all_tags=False, lang=None, tags_lang=None, exclude_source_path=None):
+        """Return posts matching all the given filters, in timeline order.
+
+        ``categories``, ``sections`` and ``tags`` are lowercase values, of
+        which a post needs to have one (or, for tags with
+        ``require_all_tags``, all).  Categories and sections are looked up in
+        ``lang``, tags in ``tags_lang``.
+        """
+        if post_type == 'page' or post_type == 'pages':
+            base = self._pages
+            filters = [self._page_set]
+        elif post_type == 'all':
+            base = range(len(self.timeline))
+            filters = []
+        else:
+            base = self._posts
+            filters = [self._post_set]
+
+        if not (categories or sections or tags):
+            if exclude_source_path in self._source_paths:
+                excluded = self._source_paths[exclude_source_path]
+                return [self.timeline[i] for i in base if i not in excluded]
+            return [self.timeline[i] for i in base]
+
+        if categories:
+            index = self._index('category', lang)
+            filters.append(set().union(*(index.get(c, ()) for c in categories)))
+        if sections:
+            index = self._index('section', lang)
+            filters.append(set().union(*(index.get(s, ()) for s in sections)))
+        if tags:
+            index = self._index('tag', tags_lang)
+            matches = [index.get(t, set()) for t in tags]
+            if require_all_tags:
+                filters.append(set.intersection(*matches))
+            else:
+                filters.append(set().union(*matches))
+
+        # Start from the smallest set
+        filters.sort(key=len)
+        selected = filters[0].intersection(*filters[1:])
+        selected -= self._source_paths.get(exclude_source_path, set())
+        return [self.timeline[i] for i in sorted(selected)]
+
+    def with_slugs(self, posts, slugs, lang):
+        """Return the posts (in the given order) whose slug in lang is one of slugs."""
+        index = self._index('slug', lang)
+        selected = set().union(*(index.get(s, ()) for s in slugs))
+        return [post for post in posts if self._positions.get(id(post)) in selected]
+
+    def with_slug(self, slug, lang):
+        """Return the posts whose slug in lang is slug, in timeline order."""
+        return [self.timeline[i] for i in sorted(self._index('slug', lang).get(slug, ()))]
+
+    def with_source_path(self, source_path):
+        """Return the posts with the given source path, in timeline order."""
+        return [self.timeline[i] for i in sorted(self._source_paths.get(source_path, ()))]
+
+    def in_date_range(self, posts, date_range, now=None):
+        """Return the posts (in the given order) that match date_range.
+
+        Comparisons with full dates are answered by bisecting the date-sorted
+        array first; every remaining post is still checked with
+        ``date_in_range``.
+        """
+        candidates = self._date_candidates(date_range, now)
+        if candidates is not None:
+            posts = [post for post in posts if self._positions.get(id(post)) in candidates]
+        return [post for post in posts if date_in_range(date_range, post.date, now=now)]
+
+    def _date_candidates(self, date_range, now):
+        """Return positions of posts that may match date_range, or None if unknown."""
+        if self._dates is None:
+            return None
+        low, high = 0, len(self._dates)
+        for item in date_range.split(','):
+            match = CLAUSE.match(item.strip())
+            if match is None:
+                return None
+            attribute, comparison_operator, value = match.groups()
+            if attribute or value == 'today' or comparison_operator == '!=':
+                continue
+            try:
+                if value == 'now':
+                    right = now or datetime.datetime.now()
+                else:
+                    right = dateutil.parser.parse(value)
+                if comparison_operator in ('>', '<='):
+                    split = bisect.bisect_right(self._dates, right)
+                else:
+                    split = bisect.bisect_left(self._dates, right)
+                if comparison_operator in ('>', '>='):
+                    low = max(low, split)
+                elif comparison_operator in ('<', '<='):
+                    high = min(high, split)
+                else:  # ==
+                    low = max(low, split)
+                    high = min(high, bisect.bisect_right(self._dates, right))
+            except (TypeError, ValueError, OverflowError):
+                # Let date_in_range deal with (or complain about) it
+                return None
+        return set(self._date_positions[low:high])
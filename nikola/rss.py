@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+# Copyright © 2012-2025 Roberto Alsina and others.
+
+# Permission is hereby granted, free of charge, to any
+# person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the
+# Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the
+# Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice
+# shall be included in all copies or substantial portions of
+# the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS
+# OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""RSS feed classes, built on PyRSS2Gen."""
+
+import PyRSS2Gen as rss
+
+
+class ExtendedRSS2(rss.RSS2):
+    """Extended RSS class."""
+
+    xsl_stylesheet_href = None
+
+    def publish(self, handler):
+        """Publish a feed."""
+        if self.xsl_stylesheet_href:
+            handler.processingInstruction("xml-stylesheet", 'type="text/xsl" href="{0}" media="all"'.format(self.xsl_stylesheet_href))
+        super().publish(handler)
+
+    def publish_extensions(self, handler):
+        """Publish extensions."""
+        if self.self_url:
+            handler.startElement("atom:link", {
+                'href': self.self_url,
+                'rel': "self",
+                'type': "application/rss+xml"
+            })
+            handler.endElement("atom:link")
+
+
+class ExtendedItem(rss.RSSItem):
+    """Extended RSS item."""
+
+    def __init__(self, **kw):
+        """Initialize RSS item."""
+        self.creator = kw.pop('creator', None)
+
+        # It's an old style class
+        rss.RSSItem.__init__(self, **kw)
+
+    def publish_extensions(self, handler):
+        """Publish extensions."""
+        if self.creator:
+            handler.startElement("dc:creator", {})
+            handler.characters(self.creator)
+            handler.endElement("dc:creator")
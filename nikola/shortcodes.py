@@ -26,10 +26,15 @@
 
 """Support for Hugo-style shortcodes."""
 
+import hashlib
+import json
+import os
+import re
+import stat
 import sys
 import uuid
 
-from .utils import LOGGER
+from .utils import LOGGER, write_file_atomic
 
 
 class ParsingError(Exception):
@@ -60,28 +65,42 @@ def _format_position(data, pos):
     return "line {0}, column {1}".format(line + 1, col + 1)
 
 
+_WHITESPACE_RE = re.compile(r'\s*')
+_NONWHITESPACE_RE = re.compile(r'\S*')
+_QUOTED_STRING_RE = {
+    '"': re.compile(r'"((?:[^"\\]|\\.)*)("?)', re.DOTALL),
+    "'": re.compile(r"'((?:[^'\\]|\\.)*)('?)", re.DOTALL),
+}
+_UNQUOTED_STRING_RE = {
+    False: re.compile(r'(?:[^\s\\\'"]|\\.)*', re.DOTALL),
+    True: re.compile(r'(?:[^\s\\\'"=]|\\.)*', re.DOTALL),
+}
+_ESCAPE_RE = re.compile(r'\\(.)', re.DOTALL)
+_SHORTCODE_NAME_RE = re.compile(r'\{\{%\s*(\S*)')
+
+
+def _unescape(value):
+    """Replace backslash escapes by the escaped characters."""
+    if '\\' in value:
+        return _ESCAPE_RE.sub(r'\1', value)
+    return value
+
+
 def _skip_whitespace(data, pos, must_be_nontrivial=False):
     """Return first position after whitespace.
 
     If must_be_nontrivial is set to True, raises ParsingError
     if no whitespace is found.
     """
-    if must_be_nontrivial:
-        if pos == len(data) or not data[pos].isspace():
-            raise ParsingError("Expecting whitespace at {0}!".format(_format_position(data, pos)))
-    while pos < len(data):
-        if not data[pos].isspace():
-            break
-        pos += 1
-    return pos
+    end = _WHITESPACE_RE.match(data, pos).end()
+    if must_be_nontrivial and end == pos:
+        raise ParsingError("Expecting whitespace at {0}!".format(_format_position(data, pos)))
+    return end
 
 
 def _skip_nonwhitespace(data, pos):
     """Return first position not before pos which contains a non-whitespace character."""
-    for i, x in enumerate(data[pos:]):
-        if x.isspace():
-            return pos + i
-    return len(data)
+    return _NONWHITESPACE_RE.match(data, pos).end()
 
 
 def _parse_quoted_string(data, start):
@@ -89,22 +108,12 @@ def _parse_quoted_string(data, start):
 
     Returns the position after the string followed by the string itself.
     """
-    value = ''
-    qc = data[start]
-    pos = start + 1
-    while pos < len(data):
-        char = data[pos]
-        if char == '\\':
-            if pos + 1 < len(data):
-                value += data[pos + 1]
-                pos += 2
-            else:
-                raise ParsingError("Unexpected end of data while escaping ({0})".format(_format_position(data, pos)))
-        elif (char == "'" or char == '"') and char == qc:
-            return pos + 1, value
-        else:
-            value += char
-            pos += 1
+    match = _QUOTED_STRING_RE[data[start]].match(data, start)
+    if match.group(2):
+        return match.end(), _unescape(match.group(1))
+    if match.end() < len(data):
+        # Stopped at a backslash that is the last character
+        raise ParsingError("Unexpected end of data while escaping ({0})".format(_format_position(data, match.end())))
     raise ParsingError("Unexpected end of unquoted string (started at {0})!".format(_format_position(data, start)))
 
 
@@ -115,26 +124,15 @@ def _parse_unquoted_string(data, start, stop_at_equals):
     In case stop_at_equals is set to True, an equal sign will terminate
     the string.
     """
-    value = ''
-    pos = start
-    while pos < len(data):
+    pos = _UNQUOTED_STRING_RE[bool(stop_at_equals)].match(data, start).end()
+    if pos < len(data):
         char = data[pos]
         if char == '\\':
-            if pos + 1 < len(data):
-                value += data[pos + 1]
-                pos += 2
-            else:
-                raise ParsingError("Unexpected end of data while escaping ({0})".format(_format_position(data, pos)))
-        elif char.isspace():
-            break
-        elif char == '=' and stop_at_equals:
-            break
+            # Only possible if it is the last character
+            raise ParsingError("Unexpected end of data while escaping ({0})".format(_format_position(data, pos)))
         elif char == "'" or char == '"':
             raise ParsingError("Unexpected quotation mark in unquoted string ({0})".format(_format_position(data, pos)))
-        else:
-            value += char
-            pos += 1
-    return pos, value
+    return pos, _unescape(data[start:pos])
 
 
 def _parse_string(data, start, stop_at_equals=False, must_have_content=False):
@@ -203,6 +201,91 @@ def _parse_shortcode_args(data, start, shortcode_name, start_pos):
     raise ParsingError("Shortcode '{0}' starting at {1} is not terminated correctly with '%}}}}'!".format(shortcode_name, _format_position(data, start_pos)))
 
 
+class ShortcodeCache:
+    """Cache for the output of pure shortcodes, kept in a folder between builds.
+
+    A shortcode function is pure if its ``nikola_shortcode_pure`` attribute
+    is True: its output only depends on its arguments, data, language, the
+    site configuration and the files it returns as dependencies (not on the
+    post it is used in or on other posts).  Entries are keyed by the
+    shortcode name and arguments and a salt describing the site, and are
+    only used while the modification times and sizes of their dependencies
+    are unchanged.
+    """
+
+    def __init__(self, folder, salt=''):
+        """Initialize cache."""
+        self.folder = folder
+        self.salt = salt
+        self._entries = {}
+
+    def key(self, name, args, kw):
+        """Return the cache key for a shortcode call, or None if it cannot be cached."""
+        kw = {k: v for k, v in kw.items() if k not in ('site', 'post')}
+        try:
+            text = json.dumps([self.salt, name, args, kw], sort_keys=True)
+        except (TypeError, ValueError):
+            return None
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def call(self, name, f, args, kw):
+        """Call shortcode function f, or return its cached output and dependencies."""
+        key = self.key(name, args, kw)
+        if key is None:
+            return f(*args, **kw)
+        entry = self._get(key)
+        if entry is not None:
+            return entry['output'], entry['deps']
+        res = f(*args, **kw)
+        if not isinstance(res, tuple):
+            res = (res, [])
+        self._put(key, res[0], res[1])
+        return res
+
+    def _path(self, key):
+        return os.path.join(self.folder, key[:2], key + '.json')
+
+    def _get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            try:
+                with open(self._path(key), 'r', encoding='utf-8') as inf:
+                    entry = json.load(inf)
+            except (OSError, ValueError):
+                return None
+            self._entries[key] = entry
+        for dep, stamp in entry['stamps'].items():
+            if self._stamp(dep) != stamp:
+                return None
+        return entry
+
+    def _put(self, key, output, deps):
+        stamps = {}
+        for dep in deps:
+            stamps[dep] = self._stamp(dep)
+            if stamps[dep] is None:
+                # Not a file (or gone already), so changes can't be detected
+                return
+        entry = {'output': output, 'deps': list(deps), 'stamps': stamps}
+        try:
+            text = json.dumps(entry)
+        except (TypeError, ValueError):
+            return
+        self._entries[key] = entry
+        path = self._path(key)
+        write_file_atomic(path, text)
+
+    @staticmethod
+    def _stamp(path):
+        try:
+            st = os.stat(path)
+        except (OSError, TypeError, ValueError):
+            return None
+        if not stat.S_ISREG(st.st_mode):
+            return None
+        return [st.st_mtime_ns, st.st_size]
+
+
 def _new_sc_id():
     return str('SHORTCODE{0}REPLACEMENT'.format(str(uuid.uuid4()).replace('-', '')))
 
@@ -222,42 +305,49 @@ def extract_shortcodes(data):
     if not data:  # Empty
         return '', {}
 
-    def extract_data_chunk(data):
-        """Take a list of splitted shortcodes and return a string and a tail.
-
-        The string is data, the tail is ready for a new run of this same function.
-        """
-        text = []
-        for i, token in enumerate(data):
-            if token[0] == 'SHORTCODE_START':
-                name = token[3]
-                sc_id = _new_sc_id()
-                text.append(sc_id)
-                # See if this shortcode closes
-                for j in range(i, len(data)):
-                    if data[j][0] == 'SHORTCODE_END' and data[j][3] == name:
-                        # Extract this chunk
-                        shortcodes[sc_id] = ''.join(t[1] for t in data[i:j + 1])
-                        return ''.join(text), data[j + 1:]
+    text = []
+    ends = _find_shortcode_ends(splitted)
+    pos = 0
+    while pos < len(splitted):
+        token = splitted[pos]
+        if token[0] == 'SHORTCODE_START':
+            sc_id = _new_sc_id()
+            text.append(sc_id)
+            end = ends[pos]
+            if end is None:
                 # Doesn't close
                 shortcodes[sc_id] = token[1]
-                return ''.join(text), data[i + 1:]
-            elif token[0] == 'TEXT':
-                text.append(token[1])
-                return ''.join(text), data[1:]
-            elif token[0] == 'SHORTCODE_END':  # This is malformed
-                raise Exception('Closing unopened shortcode {}'.format(token[3]))
-
-    text = []
-    tail = splitted
-    while True:
-        new_text, tail = extract_data_chunk(tail)
-        text.append(new_text)
-        if not tail:
-            break
+                pos += 1
+            else:
+                # Extract this chunk
+                shortcodes[sc_id] = ''.join(t[1] for t in splitted[pos:end + 1])
+                pos = end + 1
+        elif token[0] == 'TEXT':
+            text.append(token[1])
+            pos += 1
+        else:  # This is malformed
+            raise Exception('Closing unopened shortcode {}'.format(token[3]))
     return ''.join(text), shortcodes
 
 
+def _find_shortcode_ends(tokens):
+    """Find the end of every shortcode in a list of tokens from _split_shortcodes.
+
+    Returns a list with, for every SHORTCODE_START token, the index of the
+    first SHORTCODE_END token with the same name after it, or None if the
+    shortcode is not closed.  Other entries are None.
+    """
+    ends = [None] * len(tokens)
+    next_end = {}
+    for pos in range(len(tokens) - 1, -1, -1):
+        token = tokens[pos]
+        if token[0] == 'SHORTCODE_END':
+            next_end[token[3]] = pos
+        elif token[0] == 'SHORTCODE_START':
+            ends[pos] = next_end.get(token[3])
+    return ends
+
+
 def _split_shortcodes(data):
     """Given input data, splits it into a sequence of texts, shortcode starts and shortcode ends.
 
@@ -274,16 +364,15 @@ def _split_shortcodes(data):
     pos = 0
     result = []
     while pos < len(data):
-        # Search for shortcode start
-        start = data.find('{{%', pos)
-        if start < 0:
+        # Search for shortcode start and extract name
+        match = _SHORTCODE_NAME_RE.search(data, pos)
+        if match is None:
             result.append(("TEXT", data[pos:]))
             break
+        start = match.start()
         result.append(("TEXT", data[pos:start]))
-        # Extract name
-        name_start = _skip_whitespace(data, start + 3)
-        name_end = _skip_nonwhitespace(data, name_start)
-        name = data[name_start:name_end]
+        name_end = match.end()
+        name = match.group(1)
         if not name:
             raise ParsingError("Syntax error: '{{{{%' must be followed by shortcode name ({0})!".format(_format_position(data, start)))
         # Finish shortcode
@@ -305,7 +394,7 @@ def _split_shortcodes(data):
     return result
 
 
-def apply_shortcodes(data, registry, site=None, filename=None, raise_exceptions=False, lang=None, extra_context=None):
+def apply_shortcodes(data, registry, site=None, filename=None, raise_exceptions=False, lang=None, extra_context=None, cache=None):
     """Apply Hugo-style shortcodes on data.
 
     {{% name parameters %}} will end up calling the registered "name" function with the given parameters.
@@ -317,6 +406,8 @@ def apply_shortcodes(data, registry, site=None, filename=None, raise_exceptions=
 
     The site parameter is passed with the same name to the shortcodes so they can access Nikola state.
 
+    If a ShortcodeCache is passed as cache, the output of pure shortcodes is taken from it when possible.
+
     >>> print(apply_shortcodes('==> {{% foo bar=baz %}} <==', {'foo': lambda *a, **k: k['bar']}))
     ==> baz <==
     >>> print(apply_shortcodes('==> {{% foo bar=baz %}}some data{{% /foo %}} <==', {'foo': lambda *a, **k: k['bar']+k['data']}))
@@ -329,6 +420,7 @@ def apply_shortcodes(data, registry, site=None, filename=None, raise_exceptions=
         # Split input data into text, shortcodes and shortcode endings
         sc_data = _split_shortcodes(data)
         # Now process data
+        ends = _find_shortcode_ends(sc_data)
         result = []
         dependencies = []
         pos = 0
@@ -341,18 +433,10 @@ def apply_shortcodes(data, registry, site=None, filename=None, raise_exceptions=
                 raise ParsingError("Found shortcode ending '{{{{% /{0} %}}}}' which isn't closing a started shortcode ({1})!".format(current[3], _format_position(data, current[2])))
             elif current[0] == "SHORTCODE_START":
                 name = current[3]
-                # Check if we can find corresponding ending
-                found = None
-                for p in range(pos + 1, len(sc_data)):
-                    if sc_data[p][0] == "SHORTCODE_END" and sc_data[p][3] == name:
-                        found = p
-                        break
-                if found:
+                found = ends[pos]
+                if found is not None:
                     # Found ending. Extract data argument:
-                    data_arg = []
-                    for p in range(pos + 1, found):
-                        data_arg.append(sc_data[p][1])
-                    data_arg = empty_string.join(data_arg)
+                    data_arg = empty_string.join(t[1] for t in sc_data[pos + 1:found])
                     pos = found + 1
                 else:
                     # Single shortcode
@@ -367,7 +451,10 @@ def apply_shortcodes(data, registry, site=None, filename=None, raise_exceptions=
                     f = registry[name]
                     if getattr(f, 'nikola_shortcode_pass_filename', None):
                         kw['filename'] = filename
-                    res = f(*args, **kw)
+                    if cache is not None and getattr(f, 'nikola_shortcode_pure', False):
+                        res = cache.call(name, f, args, kw)
+                    else:
+                        res = f(*args, **kw)
                     if not isinstance(res, tuple):  # For backards compatibility
                         res = (res, [])
                 else:
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+# Copyright © 2012-2025 Roberto Alsina and others.
+
+# Permission is hereby granted, free of charge, to any
+# person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the
+# Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the
+# Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice
+# shall be included in all copies or substantial portions of
+# the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS
+# OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Profile the imports done when Nikola starts (``nikola --startup-profile``)."""
+
+import os
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+
+__all__ = ('ImportTime', 'parse_importtime', 'profile_command', 'print_profile')
+
+
+@dataclass(frozen=True)
+class ImportTime:
+    """Time spent importing one module, in microseconds, as reported by ``-X importtime``."""
+
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(text: str) -> list[ImportTime]:
+    """Parse the ``-X importtime`` lines from stderr output, ignoring everything else."""
+    imports = []
+    for line in text.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            # The header line
+            continue
+        name = fields[2].rstrip()
+        module = name.lstrip()
+        imports.append(ImportTime(module, int(fields[0]), int(fields[1]), (len(name) - len(module) - 1) // 2))
+    return imports
+
+
+def profile_command(args: list[str], cwd=None) -> tuple[float, list[ImportTime], subprocess.CompletedProcess]:
+    """Run ``nikola *args`` with ``-X importtime`` and return its wall time and imports.
+
+    The output of the command is returned in the CompletedProcess object.
+    """
+    env = dict(os.environ)
+    env.pop('PYTHONPROFILEIMPORTTIME', None)
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-m', 'nikola'] + list(args),
+                            cwd=cwd, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            stdin=subprocess.DEVNULL, universal_newlines=True)
+    elapsed = time.perf_counter() - start
+    return elapsed, parse_importtime(result.stderr), result
+
+
+def print_profile(args: list[str], elapsed: float, imports: list[ImportTime], count: int = 25) -> None:
+    """Print a summary of a startup profile."""
+    total_us = sum(i.self_us for i in imports)
+    print('Startup profile of "nikola {0}": {1:.3f}s wall time, {2:.3f}s importing {3} modules'.format(
+        ' '.join(args), elapsed, total_us / 1e6, len(imports)))
+    print()
+    print('Slowest imports (in ms, cumulative time includes the modules they import):')
+    print('{0:>10} {1:>10}  {2}'.format('cumulative', 'self', 'module'))
+    for i in sorted(imports, key=lambda i: i.cumulative_us, reverse=True)[:count]:
+        print('{0:10.1f} {1:10.1f}  {2}'.format(i.cumulative_us / 1000, i.self_us / 1000, i.module))
+
+
+def main(args: list[str]) -> int:
+    """Profile a Nikola command and print the results."""
+    elapsed, imports, result = profile_command(args)
+    sys.stdout.write(result.stdout)
+    # Pass on everything the command logged
+    sys.stderr.write(''.join(line + '\n' for line in result.stderr.splitlines() if not line.startswith('import time:')))
+    print()
+    print_profile(args, elapsed, imports)
+    return result.returncode
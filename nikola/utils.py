@@ -27,12 +27,12 @@
 """Utility functions."""
 
 import configparser
+import copy
 import datetime
 import hashlib
 import io
 import urllib
 
-import lxml.html
 import operator
 import os
 import re
@@ -41,7 +41,9 @@ import shutil
 import socket
 import subprocess
 import sys
+import tempfile
 import threading
+import time
 from collections import defaultdict, OrderedDict
 from html import unescape as html_unescape
 from importlib import reload as _reload
@@ -51,54 +53,39 @@ from urllib.parse import unquote as urlunquote
 from urllib.parse import urlparse, urlunparse
 from zipfile import ZipFile
 
-import babel.dates
 import dateutil.parser
 import dateutil.tz
-import pygments.formatters
-import pygments.formatters._mapping
-import PyRSS2Gen as rss
 from blinker import signal
 from doit import tools
 from doit.cmdparse import CmdParse
-from nikola.packages.pygments_better_html import BetterHtmlFormatter
 from typing import Any, Callable, Iterable, Match, Optional, Union
-from unidecode import unidecode
 
 # Renames
-from nikola import DEBUG  # NOQA
+from nikola import DEBUG, __version__  # NOQA
 from .log import LOGGER, TEMPLATES_LOGGER, get_logger  # NOQA
 from .hierarchy_utils import TreeNode, clone_treenode, flatten_tree_structure, sort_classifications
 from .hierarchy_utils import join_hierarchical_category_path, parse_escaped_hierarchical_category_name
 
 from importlib import resources
 
-try:
-    import toml
-except ImportError:
-    toml = None
-
-try:
-    from ruamel.yaml import YAML
-except ImportError:
-    YAML = None
-
 try:
     import hsluv
 except ImportError:
     hsluv = None
 
-__all__ = ('CustomEncoder', 'get_theme_path', 'get_theme_path_real',
+# NikolaPygmentsHTML is defined on first use, see __getattr__
+__all__ = ('CustomEncoder', 'get_theme_path', 'get_theme_path_real',  # NOQA: F822
            'get_theme_chain', 'load_messages', 'copy_tree', 'copy_file',
            'slugify', 'unslugify', 'to_datetime', 'apply_filters',
-           'config_changed', 'get_crumbs', 'get_tzname', 'get_asset_path',
-           '_reload', 'Functionary', 'TranslatableSetting',
+           'config_changed', 'get_crumbs', 'write_file_atomic', 'write_json_atomic', 'get_tzname', 'get_asset_path',
+           '_reload', 'Functionary', 'VersionedDict', 'TranslatableSetting',
            'TemplateHookRegistry', 'LocaleBorg',
            'sys_encode', 'sys_decode', 'makedirs', 'get_parent_theme_name',
            'demote_headers', 'get_translation_candidate', 'write_metadata',
            'ask', 'ask_yesno', 'options2docstring', 'os_path_split',
            'get_displayed_page_number', 'adjust_name_for_index_path_list',
            'adjust_name_for_index_path', 'adjust_name_for_index_link',
-           'NikolaPygmentsHTML', 'create_redirect', 'clean_before_deployment',
+           'NikolaPygmentsHTML', 'use_nikola_pygments_formatter', 'highlight_code', 'create_redirect', 'clean_before_deployment',
            'sort_posts', 'smartjoin', 'indent', 'load_data', 'html_unescape',
            'rss_writer', 'map_metadata', 'req_missing', 'bool_from_meta',
            # Deprecated, moved to hierarchy_utils:
@@ -219,6 +206,59 @@ class Functionary(defaultdict):
         return self[lang][key]
 
 
+class VersionedDict(dict):
+    """A dict with a version number, which is increased when items are changed.
+
+    Values computed from the dict can be kept until the version changes.
+    Changes inside the values (like a nested dict) are not tracked.
+    """
+
+    version = 0
+
+    def __setitem__(self, key, value):
+        """Set an item and increase the version."""
+        super().__setitem__(key, value)
+        self.version += 1
+
+    def __delitem__(self, key):
+        """Delete an item and increase the version."""
+        super().__delitem__(key)
+        self.version += 1
+
+    def __ior__(self, other):
+        """Update the dict and increase the version."""
+        self.update(other)
+        return self
+
+    def update(self, *args, **kwargs):
+        """Update the dict and increase the version."""
+        super().update(*args, **kwargs)
+        self.version += 1
+
+    def setdefault(self, key, default=None):
+        """Set an item if it is missing, and increase the version if it was."""
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, *args):
+        """Remove an item and increase the version."""
+        result = super().pop(*args)
+        self.version += 1
+        return result
+
+    def popitem(self):
+        """Remove an item and increase the version."""
+        result = super().popitem()
+        self.version += 1
+        return result
+
+    def clear(self):
+        """Remove all items and increase the version."""
+        super().clear()
+        self.version += 1
+
+
 class TranslatableSetting:
     """A setting that can be translated.
 
@@ -666,6 +706,7 @@ def get_theme_chain(theme, themes_dirs) -> list[str]:
 
 def html_tostring_fragment(document):
     """Convert a HTML snippet to a fragment, ready for insertion elsewhere."""
+    import lxml.html
     try:
         doc = lxml.html.tostring(document.body, encoding='unicode').strip()
     except Exception:
@@ -697,13 +738,89 @@ class LanguageNotFoundError(Exception):
         return 'cannot find language {0}'.format(self.lang)
 
 
-def load_messages(themes, translations, default_lang, themes_dirs):
+def _message_files(themes, translations, themes_dirs):
+    """Return the message files load_messages reads, with their mtimes.
+
+    Files are listed in load order.  A file that is not in its theme or in
+    the base theme is listed with a None mtime.
+    """
+    default_folder = os.path.join(get_theme_path_real('base', themes_dirs), 'messages')
+    files = []
+    for theme_name in themes[::-1]:
+        msg_folder = os.path.join(get_theme_path(theme_name), 'messages')
+        for lang in ['en'] + list(translations.keys()):
+            name = 'messages_{0}.py'.format(lang)
+            for folder in (msg_folder, default_folder):
+                path = os.path.join(folder, name)
+                if os.path.isfile(path):
+                    files.append([path, os.stat(path).st_mtime_ns])
+                    break
+            else:
+                files.append([name, None])
+    return files
+
+
+def _load_message_catalog(cache_path, files):
+    """Return the cached message catalog if it was built from files."""
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as inf:
+            catalog = json.load(inf)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(catalog, dict) or catalog.get('version') != __version__ or catalog.get('files') != files:
+        return None
+    return catalog
+
+
+def _save_message_catalog(cache_path, catalog):
+    """Write the compiled message catalog atomically."""
+    try:
+        write_json_atomic(cache_path, catalog)
+    except OSError as e:
+        LOGGER.debug("Cannot write message catalog {0}: {1}".format(cache_path, e))
+
+
+def load_messages(themes, translations, default_lang, themes_dirs, cache_path=None):
     """Load theme's messages into context.
 
     All the messages from parent themes are loaded,
     and "younger" themes have priority.
+
+    If cache_path is given, the merged messages are stored there and
+    reused until one of the theme chain's message files changes.
     """
     messages = Functionary(dict, default_lang)
+    catalog = None
+    if cache_path is not None:
+        files = _message_files(themes, translations, themes_dirs)
+        catalog = _load_message_catalog(cache_path, files)
+    if catalog is None:
+        completion_status = _import_messages(messages, themes, translations, themes_dirs)
+        if cache_path is not None and all(mtime is not None for _, mtime in files):
+            _save_message_catalog(cache_path, {
+                'version': __version__,
+                'files': files,
+                'messages': {lang: messages[lang] for lang in translations.keys()},
+                'complete': completion_status,
+            })
+    else:
+        for lang, lang_messages in catalog['messages'].items():
+            messages[lang].update(lang_messages)
+        completion_status = catalog['complete']
+
+    for lang, status in completion_status.items():
+        if not status and lang not in INCOMPLETE_LANGUAGES_WARNED:
+            LOGGER.warning("Incomplete translation for language '{0}'.".format(lang))
+            INCOMPLETE_LANGUAGES_WARNED.add(lang)
+
+    return messages
+
+
+def _import_messages(messages, themes, translations, themes_dirs):
+    """Import the theme chain's message modules into messages.
+
+    Return a dict telling whether each language's translation is complete.
+    """
     oldpath = list(sys.path)
     found = {lang: False for lang in translations.keys()}
     last_exception = None
@@ -740,12 +857,7 @@ def load_messages(themes, translations, default_lang, themes_dirs):
 
     if not all(found.values()):
         raise LanguageNotFoundError(lang, last_exception)
-    for lang, status in completion_status.items():
-        if not status and lang not in INCOMPLETE_LANGUAGES_WARNED:
-            LOGGER.warning("Incomplete translation for language '{0}'.".format(lang))
-            INCOMPLETE_LANGUAGES_WARNED.add(lang)
-
-    return messages
+    return completion_status
 
 
 def copy_tree(src, dst, link_cutoff=None, ignored_filenames=None):
@@ -816,6 +928,48 @@ def remove_file(source):
         os.remove(source)
 
 
+# The umask can only be read by changing it, which is not thread-safe, so it
+# is read once, on import.
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+
+def write_file_atomic(path, data):
+    """Write data (str or bytes) to path, so that readers never see a partial file.
+
+    The data goes to a temporary file in the same folder first, which then
+    replaces path. Missing folders are created. The file gets the usual
+    permissions for new files (temporary files are only readable by their
+    owner).
+    """
+    folder = os.path.dirname(path)
+    makedirs(folder)
+    fd, tmp_path = tempfile.mkstemp(dir=folder or '.', prefix='.' + os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        if isinstance(data, bytes):
+            with open(fd, 'wb') as outf:
+                outf.write(data)
+        else:
+            with open(fd, 'w', encoding='utf-8') as outf:
+                outf.write(data)
+        os.chmod(tmp_path, 0o666 & ~_UMASK)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def write_json_atomic(path, data, **kwargs):
+    """Write data to path as JSON, using write_file_atomic.
+
+    Keyword arguments are passed to json.dumps.
+    """
+    write_file_atomic(path, json.dumps(data, **kwargs))
+
+
 # slugify is adopted from
 # https://code.activestate.com/recipes/
 # 577257-slugify-make-a-string-usable-in-a-url-or-filename/
@@ -842,6 +996,7 @@ def slugify(value, lang=None, force=False):
     if USE_SLUGIFY or force:
         # This is the standard state of slugify, which actually does some work.
         # It is the preferred style, especially for Western languages.
+        from unidecode import unidecode
         value = str(unidecode(value))
         value = _slugify_strip_re.sub('', value).strip().lower()
         return _slugify_hyphenate_re.sub('-', value)
@@ -1079,6 +1234,10 @@ def get_asset_path(path, themes, files_folders={'files': ''}, output_dir='output
     If it's not provided by either, it will be chacked in output, where
     it may have been created by another plugin.
 
+    Theme and files folders are looked up in ASSET_INDEX, so each of them
+    is only walked once.  Paths the index does not know are checked on
+    disk.
+
     >>> print(get_asset_path('assets/css/nikola_rst.css', get_theme_chain('bootstrap3', ['themes'])))
     /.../nikola/data/themes/base/assets/css/nikola_rst.css
 
@@ -1095,6 +1254,27 @@ def get_asset_path(path, themes, files_folders={'files': ''}, output_dir='output
     /.../nikola/nikola.py
 
     """
+    relpath = os.path.normpath(path)
+    if os.path.isabs(relpath) or relpath == '..' or relpath.startswith('..' + os.path.sep):
+        # Not inside any asset folder, the index cannot answer this.
+        return _get_asset_path_uncached(path, themes, files_folders, output_dir)
+    for theme_name in themes:
+        theme_path = get_theme_path(theme_name)
+        if relpath in ASSET_INDEX.files(theme_path):
+            return os.path.join(theme_path, relpath)
+    for src, rel_dst in files_folders.items():
+        relpath = os.path.normpath(os.path.relpath(path, rel_dst))
+        if not relpath.startswith('..' + os.path.sep) and relpath in ASSET_INDEX.files(src):
+            return os.path.abspath(os.path.join(src, relpath))
+
+    # Not in the index: the file may have been created since the folders
+    # were walked, or differ only in case on a case-insensitive filesystem.
+    # The output folder changes during the build, so it is never indexed.
+    return _get_asset_path_uncached(path, themes, files_folders, output_dir)
+
+
+def _get_asset_path_uncached(path, themes, files_folders, output_dir):
+    """Find an asset by checking every candidate location on disk."""
     for theme_name in themes:
         candidate = os.path.join(get_theme_path(theme_name), path)
         if os.path.isfile(candidate):
@@ -1111,10 +1291,127 @@ def get_asset_path(path, themes, files_folders={'files': ''}, output_dir='output
         if os.path.isfile(candidate):
             return candidate
 
-    # whatever!
     return None
 
 
+class AssetIndex:
+    """Index of the files in theme and files folders.
+
+    Each folder is walked once, the first time an asset is looked up in
+    it, and get_asset_path answers from the index after that.  Call
+    clear() when the folders may have changed.  Symlinks are followed,
+    except those that point back to a folder being walked.
+    """
+
+    def __init__(self):
+        """Create an empty index."""
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def files(self, folder):
+        """Return the set of relative paths of the files in folder."""
+        folder = os.path.abspath(folder)
+        files = self._files.get(folder)
+        if files is None:
+            files = set()
+            ancestors = {folder: {os.path.realpath(folder)}}
+            for root, dirnames, filenames in os.walk(folder, followlinks=True):
+                seen = ancestors.pop(root)
+                for dname in list(dirnames):
+                    path = os.path.join(root, dname)
+                    real = os.path.realpath(path)
+                    if real in seen:
+                        # A symlink cycle, it would be walked forever
+                        dirnames.remove(dname)
+                    else:
+                        ancestors[path] = seen | {real}
+                relroot = os.path.relpath(root, folder)
+                for fname in filenames:
+                    if os.path.isfile(os.path.join(root, fname)):
+                        files.add(os.path.normpath(os.path.join(relroot, fname)))
+            files = frozenset(files)
+            with self._lock:
+                self._files[folder] = files
+        return files
+
+    def clear(self):
+        """Forget all indexed folders."""
+        with self._lock:
+            self._files.clear()
+
+
+ASSET_INDEX = AssetIndex()
+
+
+class TemplateDependencyCache:
+    """Remember which templates each template file refers to.
+
+    Template systems parse a template to find the templates it includes,
+    imports or inherits from.  The result of that parse is stored per file
+    and validated by the file's mtime and size, then by its SHA-256 hash,
+    so only templates that changed are parsed again.  If path is given,
+    the entries are saved there and reused by later runs.
+    """
+
+    def __init__(self, path=None):
+        """Create a cache, stored in path if it is given."""
+        self.path = path
+        self._entries = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        """Read the saved entries, discarding them if they are unusable."""
+        entries = {}
+        if self.path:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as inf:
+                    data = json.load(inf)
+            except (OSError, ValueError):
+                data = None
+            if isinstance(data, dict) and data.get('version') == __version__ and isinstance(data.get('files'), dict):
+                entries = data['files']
+        self._entries = entries
+
+    def refs(self, filename, parse):
+        """Return the references of the template in filename.
+
+        parse is called with the file's contents (as bytes) when there is
+        no valid entry for it, and must return a JSON-serializable value.
+        """
+        if self._entries is None:
+            self._load()
+        filename = os.path.abspath(filename)
+        st = os.stat(filename)
+        stamp = [st.st_mtime_ns, st.st_size]
+        entry = self._entries.get(filename)
+        if entry is not None and entry['stamp'] == stamp:
+            return entry['refs']
+        with open(filename, 'rb') as inf:
+            data = inf.read()
+        digest = hashlib.sha256(data).hexdigest()
+        if entry is not None and entry['sha256'] == digest:
+            entry = dict(entry, stamp=stamp)
+        else:
+            entry = {'stamp': stamp, 'sha256': digest, 'refs': parse(data)}
+        with self._lock:
+            self._entries[filename] = entry
+            self._dirty = True
+        return entry['refs']
+
+    def save(self):
+        """Write the entries to path if any of them changed."""
+        if not (self.path and self._dirty):
+            return
+        with self._lock:
+            data = {'version': __version__, 'files': self._entries}
+            self._dirty = False
+            try:
+                write_json_atomic(self.path, data)
+            except OSError as e:
+                LOGGER.debug("Cannot write template dependency cache {0}: {1}".format(self.path, e))
+
+
 class LocaleBorgUninitializedException(Exception):
     """Exception for unitialized LocaleBorg."""
 
@@ -1127,9 +1424,11 @@ class LocaleBorgUninitializedException(Exception):
 # timezones. Without these fixes, DST would follow local settings (because
 # dateutil’s timezones return stuff depending on their input, and datetime.time
 # objects have no year/month/day to base the information on.
-def format_datetime(datetime=None, format='medium',
-                    locale=babel.dates.LC_TIME):
+def format_datetime(datetime=None, format='medium', locale=None):
     """Format a datetime object."""
+    import babel.dates
+    if locale is None:
+        locale = babel.dates.LC_TIME
     locale = babel.dates.Locale.parse(locale)
     if format in ('full', 'long', 'medium', 'short'):
         return babel.dates.get_datetime_format(format, locale=locale) \
@@ -1140,17 +1439,22 @@ def format_datetime(datetime=None, format='medium',
         return babel.dates.parse_pattern(format).apply(datetime, locale)
 
 
-def format_time(time=None, format='medium', locale=babel.dates.LC_TIME):
+def format_time(time=None, format='medium', locale=None):
     """Format time. Input can be datetime.time or datetime.datetime."""
+    import babel.dates
+    if locale is None:
+        locale = babel.dates.LC_TIME
     locale = babel.dates.Locale.parse(locale)
     if format in ('full', 'long', 'medium', 'short'):
         format = babel.dates.get_time_format(format, locale=locale)
     return babel.dates.parse_pattern(format).apply(time, locale)
 
 
-def format_skeleton(skeleton, datetime=None, fo=None, fuzzy=True,
-                    locale=babel.dates.LC_TIME):
+def format_skeleton(skeleton, datetime=None, fo=None, fuzzy=True, locale=None):
     """Format a datetime based on a skeleton."""
+    import babel.dates
+    if locale is None:
+        locale = babel.dates.LC_TIME
     locale = babel.dates.Locale.parse(locale)
     if fuzzy and skeleton not in locale.datetime_skeletons:
         skeleton = babel.dates.match_skeleton(skeleton, locale.datetime_skeletons)
@@ -1270,6 +1574,7 @@ class LocaleBorg:
         Accepted modes: month, month_year, month_day_year.
         Format: {month} for standard, {month:MMMM} for customization.
         """
+        import babel.dates
         modes = {
             'month': ('date', 'LLLL'),
             'month_year': ('skeleton', 'yMMMM'),
@@ -1297,44 +1602,10 @@ class LocaleBorg:
         return re.sub(r'{(.*?)(?::(.*?))?}', date_formatter, message)
 
 
-class ExtendedRSS2(rss.RSS2):
-    """Extended RSS class."""
-
-    xsl_stylesheet_href = None
-
-    def publish(self, handler):
-        """Publish a feed."""
-        if self.xsl_stylesheet_href:
-            handler.processingInstruction("xml-stylesheet", 'type="text/xsl" href="{0}" media="all"'.format(self.xsl_stylesheet_href))
-        super().publish(handler)
-
-    def publish_extensions(self, handler):
-        """Publish extensions."""
-        if self.self_url:
-            handler.startElement("atom:link", {
-                'href': self.self_url,
-                'rel': "self",
-                'type': "application/rss+xml"
-            })
-            handler.endElement("atom:link")
-
-
-class ExtendedItem(rss.RSSItem):
-    """Extended RSS item."""
-
-    def __init__(self, **kw):
-        """Initialize RSS item."""
-        self.creator = kw.pop('creator', None)
-
-        # It's an old style class
-        rss.RSSItem.__init__(self, **kw)
-
-    def publish_extensions(self, handler):
-        """Publish extensions."""
-        if self.creator:
-            handler.startElement("dc:creator", {})
-            handler.characters(self.creator)
-            handler.endElement("dc:creator")
+def _define_rss_classes():
+    """Import ExtendedRSS2 and ExtendedItem, which need PyRSS2Gen."""
+    from nikola import rss
+    return {'ExtendedRSS2': rss.ExtendedRSS2, 'ExtendedItem': rss.ExtendedItem}
 
 
 # \x00 means the "<" was backslash-escaped
@@ -1674,58 +1945,189 @@ def options2docstring(name, options):
     return '\n'.join(result)
 
 
-class NikolaPygmentsHTML(BetterHtmlFormatter):
-    """A Nikola-specific modification of Pygments' HtmlFormatter."""
-
-    def __init__(self, anchor_ref=None, classes=None, **kwargs):
-        """Initialize formatter."""
-        if classes is None:
-            classes = ['code', 'literal-block']
-        if anchor_ref:
-            kwargs['lineanchors'] = slugify(
-                anchor_ref, lang=LocaleBorg().current_lang, force=True)
-        self.nclasses = classes
-        kwargs['cssclass'] = 'code'
-        if not kwargs.get('linenos'):
-            # Default to no line numbers (Issue #3426)
-            kwargs['linenos'] = False
-        if kwargs.get('linenos') not in {'table', 'inline', 'ol', False}:
-            # Map invalid values to table
-            kwargs['linenos'] = 'table'
-        kwargs['anchorlinenos'] = kwargs['linenos'] == 'table'
-        kwargs['nowrap'] = False
-        super().__init__(**kwargs)
-
-    def wrap(self, source, *args):
-        """Wrap the ``source``, which is a generator yielding individual lines, in custom generators."""
-        style = []
-        if self.prestyles:
-            style.append(self.prestyles)
-        if self.noclasses:
-            style.append('line-height: 125%')
-        style = '; '.join(style)
-        classes = ' '.join(self.nclasses)
-
-        yield 0, ('<pre class="{0}"'.format(classes) + (style and ' style="{0}"'.format(style)) + '>')
-        for tup in source:
-            yield tup
-        yield 0, '</pre>'
-
-
-# For consistency, override the default formatter.
-pygments.formatters._formatter_cache['HTML'] = NikolaPygmentsHTML
-pygments.formatters._formatter_cache['html'] = NikolaPygmentsHTML
-_original_find_formatter_class = pygments.formatters.find_formatter_class
-
-
-def nikola_find_formatter_class(alias):
-    """Nikola-specific version of find_formatter_class."""
-    if "html" in alias.lower():
-        return NikolaPygmentsHTML
-    return _original_find_formatter_class(alias)
-
-
-pygments.formatters.find_formatter_class = nikola_find_formatter_class
+def _define_pygments_formatter():
+    """Define NikolaPygmentsHTML and make it the default Pygments HTML formatter."""
+    import pygments.formatters
+    import pygments.formatters._mapping  # NOQA
+    from nikola.packages.pygments_better_html import BetterHtmlFormatter
+
+    class NikolaPygmentsHTML(BetterHtmlFormatter):
+        """A Nikola-specific modification of Pygments' HtmlFormatter."""
+
+        def __init__(self, anchor_ref=None, classes=None, **kwargs):
+            """Initialize formatter."""
+            if classes is None:
+                classes = ['code', 'literal-block']
+            if anchor_ref:
+                kwargs['lineanchors'] = slugify(
+                    anchor_ref, lang=LocaleBorg().current_lang, force=True)
+            self.nclasses = classes
+            kwargs['cssclass'] = 'code'
+            if not kwargs.get('linenos'):
+                # Default to no line numbers (Issue #3426)
+                kwargs['linenos'] = False
+            if kwargs.get('linenos') not in {'table', 'inline', 'ol', False}:
+                # Map invalid values to table
+                kwargs['linenos'] = 'table'
+            kwargs['anchorlinenos'] = kwargs['linenos'] == 'table'
+            kwargs['nowrap'] = False
+            super().__init__(**kwargs)
+
+        def wrap(self, source, *args):
+            """Wrap the ``source``, which is a generator yielding individual lines, in custom generators."""
+            style = []
+            if self.prestyles:
+                style.append(self.prestyles)
+            if self.noclasses:
+                style.append('line-height: 125%')
+            style = '; '.join(style)
+            classes = ' '.join(self.nclasses)
+
+            yield 0, ('<pre class="{0}"'.format(classes) + (style and ' style="{0}"'.format(style)) + '>')
+            for tup in source:
+                yield tup
+            yield 0, '</pre>'
+
+    NikolaPygmentsHTML.__qualname__ = 'NikolaPygmentsHTML'
+
+    # For consistency, override the default formatter.
+    pygments.formatters._formatter_cache['HTML'] = NikolaPygmentsHTML
+    pygments.formatters._formatter_cache['html'] = NikolaPygmentsHTML
+    _original_find_formatter_class = pygments.formatters.find_formatter_class
+
+    def nikola_find_formatter_class(alias):
+        """Nikola-specific version of find_formatter_class."""
+        if "html" in alias.lower():
+            return NikolaPygmentsHTML
+        return _original_find_formatter_class(alias)
+
+    pygments.formatters.find_formatter_class = nikola_find_formatter_class
+    return {'NikolaPygmentsHTML': NikolaPygmentsHTML, 'nikola_find_formatter_class': nikola_find_formatter_class}
+
+
+def use_nikola_pygments_formatter():
+    """Make NikolaPygmentsHTML the default Pygments HTML formatter."""
+    return __getattr__('NikolaPygmentsHTML')
+
+
+# Classes that need PyRSS2Gen or Pygments are only defined when first used,
+# so that importing nikola.utils does not import them.
+_LAZY_DEFINITIONS = {
+    'ExtendedRSS2': _define_rss_classes,
+    'ExtendedItem': _define_rss_classes,
+    'NikolaPygmentsHTML': _define_pygments_formatter,
+    'nikola_find_formatter_class': _define_pygments_formatter,
+}
+
+
+def __getattr__(name):
+    """Define the classes in _LAZY_DEFINITIONS on first access."""
+    try:
+        define = _LAZY_DEFINITIONS[name]
+    except KeyError:
+        raise AttributeError("module {0!r} has no attribute {1!r}".format(__name__, name)) from None
+    if name not in globals():
+        globals().update(define())
+    return globals()[name]
+
+
+class HighlightCache:
+    """Cache of Pygments output on disk, shared by everything that highlights code.
+
+    Entries are keyed by the code, the lexer and its options and filters, the
+    formatter and its options and the Pygments and Nikola versions.  Line
+    anchors are usually random (one per code block), so they are stored as a
+    placeholder and filled in when reading.
+
+    Entries that were not used for ``max_age`` seconds are removed by
+    ``prune``.
+    """
+
+    anchor_placeholder = 'nikola_highlight_cache_anchor'
+    max_age = 30 * 24 * 60 * 60
+    # Used entries are touched, and the cache is pruned, at most this often
+    touch_interval = 24 * 60 * 60
+
+    def __init__(self, folder=None):
+        """Initialize cache. Nothing is cached until ``folder`` is set."""
+        self.folder = folder
+
+    def key(self, code, lexer, formatter):
+        """Return the cache key for highlighting code with lexer and formatter."""
+        import pygments
+        options = dict(formatter.options)
+        options.pop('lineanchors', None)
+        filters = [(type(f).__module__, type(f).__qualname__, sorted(getattr(f, 'options', {}).items())) for f in lexer.filters]
+        parts = (
+            __version__, pygments.__version__,
+            type(lexer).__module__, type(lexer).__qualname__,
+            sorted(lexer.options.items()), filters,
+            type(formatter).__module__, type(formatter).__qualname__,
+            sorted(options.items()), getattr(formatter, 'nclasses', None),
+            bool(formatter.lineanchors),
+        )
+        return hashlib.sha256(repr(parts).encode('utf-8') + b'\0' + code.encode('utf-8', 'surrogatepass')).hexdigest()
+
+    def highlight(self, code, lexer, formatter):
+        """Highlight code like ``pygments.highlight``, reusing cached output."""
+        import pygments
+        if self.folder is None or self.anchor_placeholder in code:
+            return pygments.highlight(code, lexer, formatter)
+        key = self.key(code, lexer, formatter)
+        path = os.path.join(self.folder, key[:2], key + '.html')
+        anchor = formatter.lineanchors
+        try:
+            with open(path, 'r', encoding='utf-8') as inf:
+                output = inf.read()
+                if time.time() - os.fstat(inf.fileno()).st_mtime > self.touch_interval:
+                    os.utime(path)
+        except OSError:
+            if anchor:
+                formatter = copy.copy(formatter)
+                formatter.lineanchors = self.anchor_placeholder
+            output = pygments.highlight(code, lexer, formatter)
+            try:
+                write_file_atomic(path, output)
+            except OSError as e:
+                LOGGER.debug("Cannot write highlight cache entry {0}: {1}".format(path, e))
+        if anchor:
+            output = output.replace(self.anchor_placeholder, anchor)
+        return output
+
+    def prune(self):
+        """Remove entries that were not used for ``max_age`` seconds.
+
+        The folder is only checked once every ``touch_interval`` seconds.
+        """
+        if self.folder is None:
+            return
+        now = time.time()
+        stamp = os.path.join(self.folder, '.pruned')
+        try:
+            if now - os.stat(stamp).st_mtime < self.touch_interval:
+                return
+        except OSError:
+            pass
+        for root, _, files in os.walk(self.folder):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    if name.endswith('.html') and now - os.stat(path).st_mtime > self.max_age:
+                        os.remove(path)
+                except OSError:
+                    pass
+        try:
+            write_file_atomic(stamp, '')
+        except OSError as e:
+            LOGGER.debug("Cannot write highlight cache stamp {0}: {1}".format(stamp, e))
+
+
+HIGHLIGHT_CACHE = HighlightCache()
+
+
+def highlight_code(code, lexer, formatter):
+    """Highlight code with Pygments, using the site-wide highlight cache."""
+    return HIGHLIGHT_CACHE.highlight(code, lexer, formatter)
 
 
 def get_displayed_page_number(i, num_pages, site):
@@ -1983,7 +2385,9 @@ def load_data(path):
     loader = None
     function = 'load'
     if ext in {'.yml', '.yaml'}:
-        if YAML is None:
+        try:
+            from ruamel.yaml import YAML
+        except ImportError:
             req_missing(['ruamel.yaml'], 'use YAML data files')
             return {}
         loader = YAML(typ='safe')
@@ -1991,7 +2395,9 @@ def load_data(path):
     elif ext in {'.json', '.js'}:
         loader = json
     elif ext in {'.toml', '.tml'}:
-        if toml is None:
+        try:
+            import toml
+        except ImportError:
             req_missing(['toml'], 'use TOML data files')
             return {}
         loader = toml
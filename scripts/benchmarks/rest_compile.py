@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+"""Benchmark compiling many reStructuredText posts in a row.
+
+Compiles the same post N times with ``HIDE_REST_DOCINFO`` enabled and
+prints the time per post for each batch. The time per post should stay
+flat as more posts are compiled.
+
+$ python scripts/benchmarks/rest_compile.py [posts] [batch size]
+"""
+
+import sys
+import time
+
+from nikola.nikola import Nikola
+from nikola.utils import LocaleBorg
+
+SAMPLE = """\
+Post title
+==========
+
+:author: Someone
+:summary: A short summary.
+
+Some *text* with a `link <https://getnikola.com/>`_.
+
+.. code:: python
+
+   print("Hello, world!")
+
+* A list
+* of items
+"""
+
+
+def main(posts=2000, batch=200):
+    """Run the benchmark."""
+    site = Nikola(TRANSLATIONS={'en': ''}, HIDE_REST_DOCINFO=True, USE_REST_DOCINFO_METADATA=True)
+    site.init_plugins()
+    LocaleBorg.initialize({}, 'en')
+    compiler = site.compilers['rest']
+
+    print('posts\tms/post')
+    start = time.perf_counter()
+    for i in range(1, posts + 1):
+        compiler.compile_string(SAMPLE, 'post.rst')
+        if i % batch == 0:
+            now = time.perf_counter()
+            print('{0}\t{1:.2f}'.format(i, (now - start) * 1000 / batch))
+            start = now
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+"""Benchmark parsing and applying shortcodes on large inputs.
+
+Builds documents with a growing number of shortcode calls (half of them
+paired ``raw`` shortcodes, half single ``media`` shortcodes) and prints
+the time ``extract_shortcodes`` and ``apply_shortcodes`` take for each.
+The time per shortcode should stay flat as documents get larger.
+
+$ python scripts/benchmarks/shortcodes.py [largest number of shortcodes]
+"""
+
+import sys
+import time
+
+from nikola.shortcodes import apply_shortcodes, extract_shortcodes
+
+REGISTRY = {
+    'raw': lambda *args, **kwargs: kwargs['data'],
+    'media': lambda *args, **kwargs: '<iframe src="{0}"></iframe>'.format(kwargs['url']),
+}
+
+
+def make_document(count):
+    """Return a document with count shortcode calls."""
+    parts = []
+    for i in range(count // 2):
+        parts.append('Paragraph {0} with some text.\n\n'.format(i))
+        parts.append('{{% raw %}}<div class="x">raw {0}</div>{{% /raw %}}\n\n'.format(i))
+        parts.append('{{{{% media url="https://example.com/{0}" title=\'Video {0}\' %}}}}\n\n'.format(i))
+    return ''.join(parts)
+
+
+def measure(function, *args):
+    """Return the best time of a few calls of function, in seconds."""
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        function(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(largest=16000):
+    """Run the benchmark."""
+    print('{0:>10} {1:>14} {2:>14}'.format('shortcodes', 'extract µs/sc', 'apply µs/sc'))
+    count = 500
+    while count <= largest:
+        data = make_document(count)
+        extract = measure(extract_shortcodes, data)
+        apply = measure(apply_shortcodes, data, REGISTRY)
+        print('{0:>10} {1:>14.1f} {2:>14.1f}'.format(count, extract / count * 1e6, apply / count * 1e6))
+        count *= 2
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
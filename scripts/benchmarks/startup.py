@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+"""Benchmark how long quick Nikola commands take to start.
+
+Runs each command a few times with ``-X importtime`` (outside of any site)
+and prints its best wall time. Exits with status 1 if a command takes longer
+than the budget, or if it imports a module that only builds need, so this
+can be used in CI.
+
+$ python scripts/benchmarks/startup.py [budget in seconds]
+"""
+
+import sys
+import tempfile
+
+from nikola.startup_profile import profile_command
+
+COMMANDS = [['version'], ['help'], ['tabcompletion', '--shell', 'bash']]
+FORBIDDEN_MODULES = ('lxml', 'babel', 'pygments', 'requests', 'docutils', 'PyRSS2Gen')
+
+
+def main(budget=1.0):
+    """Run the benchmark."""
+    failed = False
+    print('{0:>30} {1:>8} {2:>8}'.format('command', 'best s', 'modules'))
+    with tempfile.TemporaryDirectory() as folder:
+        for args in COMMANDS:
+            best = None
+            for _ in range(3):
+                elapsed, imports, result = profile_command(args, cwd=folder)
+                best = elapsed if best is None else min(best, elapsed)
+            print('{0:>30} {1:>8.3f} {2:>8}'.format(' '.join(args), best, len(imports)))
+            if result.returncode != 0:
+                print('  FAILED with status {0}'.format(result.returncode))
+                failed = True
+            if best > budget:
+                print('  OVER BUDGET ({0:.3f}s)'.format(budget))
+                failed = True
+            heavy = sorted({i.module.split('.')[0] for i in imports} & set(FORBIDDEN_MODULES))
+            if heavy:
+                print('  IMPORTS {0}'.format(', '.join(heavy)))
+                failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(*(float(arg) for arg in sys.argv[1:2])))
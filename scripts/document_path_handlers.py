@@ -3,6 +3,7 @@
 from nikola import nikola
 n = nikola.Nikola()
 n.init_plugins()
+n._activate_deferred_plugins()
 
 print(""".. title: Path Handlers for Nikola
 .. slug: path-handlers
@@ -54,6 +54,7 @@ class FakeSite:
         )
 
         self.timeline = [FakePost(title="Fake post", slug="fake-post")]
+        self.doit_num_process = 0
         self.rst_transforms = []
         self.post_per_input_file = {}
         # This is to make plugin initialization happy
@@ -88,6 +89,10 @@ class FakeSite:
         """Apply shortcodes from the registry on data."""
         return nikola.shortcodes.apply_shortcodes(data, self.shortcode_registry, **kw)
 
+    def task_will_run(self, name):
+        """Tell compilers that the site is not built by doit."""
+        return None
+
 
 class FakePost:
     def __init__(self, title, slug):
@@ -0,0 +1,67 @@
+"""Check that compiled posts are reused from FRAGMENT_CACHE_FOLDER in a fresh build."""
+
+import io
+import os
+import shutil
+
+import pytest
+
+from nikola import __main__
+
+from .helper import append_config, cd
+from .test_demo_build import prepare_demo_site
+from .test_empty_build import (  # NOQA
+    test_archive_exists,
+    test_avoid_double_slash_in_rss,
+    test_check_files,
+    test_check_links,
+    test_index_in_sitemap,
+)
+
+
+def test_fragment_cache_used(build, target_dir):
+    """The second build copies fragments from the cache instead of compiling them."""
+    fragment = os.path.join(target_dir, "cache", "posts", "1.html")
+    with io.open(fragment, encoding="utf-8") as inf:
+        assert inf.read() == "<p>Cached fragment.</p>"
+
+
+@pytest.fixture(scope="module")
+def build(target_dir):
+    """Build the site, tamper with the cache, and build it again from scratch."""
+    prepare_demo_site(target_dir)
+    fragment_cache = os.path.join(target_dir, "fragments")
+    append_config(
+        target_dir,
+        """
+FRAGMENT_CACHE_FOLDER = "fragments"
+""",
+    )
+
+    with cd(target_dir):
+        __main__.main(["build"])
+
+    # Replace the cached copy of the welcome post, to tell it apart
+    with cd(target_dir):
+        with io.open(os.path.join("cache", "posts", "1.html"), "rb") as inf:
+            compiled = inf.read()
+    replaced = 0
+    for root, _, files in os.walk(fragment_cache):
+        for name in files:
+            path = os.path.join(root, name)
+            if name.endswith(".html"):
+                with io.open(path, "rb") as inf:
+                    if inf.read() == compiled:
+                        with io.open(path, "w", encoding="utf-8") as outf:
+                            outf.write("<p>Cached fragment.</p>")
+                        replaced += 1
+    assert replaced == 1
+
+    for name in ("cache", "output"):
+        shutil.rmtree(os.path.join(target_dir, name))
+    for name in os.listdir(target_dir):
+        if name.startswith(".doit.db"):
+            os.unlink(os.path.join(target_dir, name))
+
+    with cd(target_dir):
+        __main__.main(["build"])
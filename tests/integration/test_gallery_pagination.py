@@ -0,0 +1,116 @@
+"""Check that galleries are split into pages with GALLERY_PHOTOS_PER_PAGE, with placeholders."""
+
+import json
+import os
+import shutil
+from unittest import mock
+
+import feedparser
+import pytest
+
+from nikola import __main__
+
+from .helper import append_config, cd
+from .test_demo_build import prepare_demo_site
+from .test_empty_build import (  # NOQA
+    test_archive_exists,
+    test_avoid_double_slash_in_rss,
+    test_check_files,
+    test_check_links,
+    test_index_in_sitemap,
+)
+
+
+def test_gallery_pages(build, output_dir):
+    """The demo gallery has five photos, split into pages of two."""
+    gallery_dir = os.path.join(output_dir, "galleries", "demo")
+    pages = ["index.html", "index-1.html", "index-2.html"]
+    for page in pages:
+        assert os.path.isfile(os.path.join(gallery_dir, page))
+    assert not os.path.exists(os.path.join(gallery_dir, "index-3.html"))
+
+    with open(os.path.join(gallery_dir, "index.html"), encoding="utf-8") as inf:
+        content = inf.read()
+    assert 'loadGallery("photos-1.json"' in content
+    assert "index-1.html" in content
+    assert "var jsonContent" not in content
+
+
+def test_gallery_photo_chunks(build, output_dir):
+    gallery_dir = os.path.join(output_dir, "galleries", "demo")
+    photos = []
+    for number, expected_length in ((1, 2), (2, 2), (3, 1)):
+        with open(os.path.join(gallery_dir, "photos-{0}.json".format(number)), encoding="utf-8") as inf:
+            chunk = json.load(inf)
+        assert len(chunk) == expected_length
+        for photo in chunk:
+            assert os.path.isfile(os.path.join(gallery_dir, photo["url"]))
+            assert os.path.isfile(os.path.join(gallery_dir, photo["url_thumb"]))
+            assert photo["placeholder"].startswith("data:image/")
+            assert photo["dominant_color"].startswith("#")
+        photos += [photo["url"] for photo in chunk]
+    assert len(set(photos)) == 5
+    assert "tesla2_lg.jpg" not in photos
+
+
+def test_gallery_rss_has_all_photos(build, output_dir):
+    with open(os.path.join(output_dir, "galleries", "demo", "rss.xml"), encoding="utf-8") as inf:
+        parsed = feedparser.parse(inf.read())
+    assert len(parsed.entries) == 5
+
+
+def test_gallery_listing_cache(build, target_dir):
+    """Gallery directory listings are cached for the next build."""
+    with open(os.path.join(target_dir, "cache", "galleries_cache.json"), encoding="utf-8") as inf:
+        cache = json.load(inf)
+    listing = cache["listings"][os.path.join("galleries", "demo")]
+    assert "tesla4_lg.jpg" in listing["files"]
+    assert "index.txt" in listing["files"]
+
+
+def test_stale_gallery_pages_removed(build, target_dir, output_dir):
+    """Pages left over after GALLERY_PHOTOS_PER_PAGE is raised are removed."""
+    append_config(target_dir, "GALLERY_PHOTOS_PER_PAGE = 3\n")
+    with cd(target_dir):
+        __main__.main(["build"])
+
+    gallery_dir = os.path.join(output_dir, "galleries", "demo")
+    assert os.path.isfile(os.path.join(gallery_dir, "index-1.html"))
+    assert os.path.isfile(os.path.join(gallery_dir, "photos-2.json"))
+    assert not os.path.exists(os.path.join(gallery_dir, "index-2.html"))
+    assert not os.path.exists(os.path.join(gallery_dir, "photos-3.json"))
+
+
+def test_gallery_metadata_cache(build, target_dir):
+    """Gallery metadata files are parsed once and reused by the next build."""
+    gallery_dir = os.path.join(target_dir, "galleries", "demo")
+    shutil.copy(os.path.join(gallery_dir, "metadata.sample.yml"), os.path.join(gallery_dir, "metadata.yml"))
+    with cd(target_dir):
+        __main__.main(["build"])
+
+    with open(os.path.join(target_dir, "cache", "galleries_cache.json"), encoding="utf-8") as inf:
+        cache = json.load(inf)
+    entry = cache["metadata"][os.path.join("galleries", "demo", "metadata.yml")]
+    assert entry["order"] == ["tesla4_lg.jpg", "tesla_conducts_lg.webp", "tesla_tower1_lg.jpg"]
+    assert entry["captions"]["tesla_tower1_lg.jpg"] == "Wardenclyffe Tower"
+
+    with mock.patch("nikola.plugins.task.galleries.YAML") as yaml, cd(target_dir):
+        assert not __main__.main(["build"])
+    assert not yaml.called
+
+
+@pytest.fixture(scope="module")
+def build(target_dir):
+    """Fill the site with demo content and build it."""
+    prepare_demo_site(target_dir)
+
+    append_config(
+        target_dir,
+        """
+GALLERY_PHOTOS_PER_PAGE = 2
+IMAGE_PLACEHOLDERS = True
+""",
+    )
+
+    with cd(target_dir):
+        __main__.main(["build"])
@@ -0,0 +1,58 @@
+"""Check that thumbnails get placeholders, even if their images are resized after compiling."""
+
+import io
+import os
+
+import pytest
+
+from nikola import __main__
+
+from .helper import append_config, cd
+from .test_demo_build import prepare_demo_site
+from .test_empty_build import (  # NOQA
+    test_archive_exists,
+    test_avoid_double_slash_in_rss,
+    test_check_files,
+    test_check_links,
+    test_index_in_sitemap,
+)
+
+
+def test_metadata_recorded_as_dependency(build, target_dir):
+    """The metadata files are dependencies even if they did not exist when compiling."""
+    with io.open(os.path.join(target_dir, "cache", "posts", "thumbs.html.dep"), encoding="utf-8") as inf:
+        deps = inf.read().splitlines()
+    metadata_folder = os.path.join("cache", "image_metadata", "images")
+    assert os.path.join(metadata_folder, "frontispiece.jpg.json") in deps
+    assert os.path.join(metadata_folder, "illus_001.jpg.json") in deps
+
+
+def test_placeholders(build, output_dir):
+    """The post is compiled again once the images are resized."""
+    with io.open(os.path.join(output_dir, "posts", "thumbs", "index.html"), encoding="utf-8") as inf:
+        html = inf.read()
+    assert html.count("background-color: #") == 2
+    assert html.count('loading="lazy"') >= 2
+
+
+@pytest.fixture(scope="module")
+def build(target_dir):
+    """Build the demo site with a post showing thumbnails."""
+    prepare_demo_site(target_dir)
+    append_config(target_dir, "\nIMAGE_PLACEHOLDERS = True\n")
+    with io.open(os.path.join(target_dir, "posts", "thumbs.rst"), "w", encoding="utf-8") as outf:
+        outf.write(
+            """.. title: Thumbs
+.. slug: thumbs
+.. date: 2013-03-06 19:08:15
+
+.. thumbnail:: /images/frontispiece.jpg
+
+{{% thumbnail "/images/illus_001.jpg" %}}{{% /thumbnail %}}
+"""
+        )
+
+    with cd(target_dir):
+        # Compile the post before any image is resized
+        __main__.main(["build", "render_posts"])
+        __main__.main(["build"])
@@ -0,0 +1,51 @@
+import io
+from os import path
+
+import nbformat
+import pytest
+
+from nikola.plugins.compile.ipynb import CompileIPynb
+
+from .helper import FakeSite
+
+
+def test_compiling_notebooks_reuses_exporter(compiler):
+    outputs = []
+    for text in ("First notebook", "Second notebook"):
+        nb = nbformat.v4.new_notebook()
+        nb.cells.append(nbformat.v4.new_markdown_cell(text))
+        outputs.append(compiler.compile_string(nbformat.writes(nb))[0])
+        exporter = compiler._html_exporter.exporter
+    assert "First notebook" in outputs[0]
+    assert "Second notebook" in outputs[1]
+    assert "First notebook" not in outputs[1]
+    assert compiler._html_exporter.exporter is exporter
+
+
+def test_read_metadata(compiler, tmpdir):
+    nb = nbformat.v4.new_notebook()
+    nb.cells.append(nbformat.v4.new_markdown_cell("Some text"))
+    nb.metadata["nikola"] = {"title": "A notebook", "slug": "a-notebook"}
+    source_path = path.join(str(tmpdir), "notebook.ipynb")
+    with io.open(source_path, "w", encoding="utf-8") as outf:
+        nbformat.write(nb, outf)
+
+    meta = compiler.read_metadata(FakePost(source_path), lang="en")
+    assert meta == {"title": "A notebook", "slug": "a-notebook"}
+
+
+@pytest.fixture(scope="module")
+def compiler():
+    site = FakeSite()
+    site.config["IPYNB_CONFIG"] = {}
+    compiler = CompileIPynb()
+    compiler.set_site(site)
+    return compiler
+
+
+class FakePost:
+    def __init__(self, source_path):
+        self.source_path = source_path
+
+    def translated_source_path(self, lang):
+        return self.source_path
@@ -0,0 +1,135 @@
+import os
+import stat
+import sys
+from collections import defaultdict
+
+import pytest
+
+from nikola.plugins.compile.pandoc import CompilePandoc
+
+from .helper import FakeSite
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="uses a shell script as pandoc")
+
+FAKE_PANDOC = """#!{python}
+import os
+import sys
+with open({log!r}, "a") as log:
+    log.write(" ".join(sys.argv[1:3]) + "\\n")
+if sys.argv[1] == "lua":
+    for line in open(sys.argv[3], encoding="utf-8"):
+        reader, source, dest = line.rstrip("\\n").split("\\t")
+        if "broken" in source:
+            sys.stderr.write(source + ": broken\\n")
+            continue
+        with open(dest, "w") as outf:
+            outf.write("<p>batched {{0}} {{1}}</p>\\n".format(reader, os.path.basename(source)))
+else:
+    with open(sys.argv[2], "w") as outf:
+        outf.write("<p>single {{0}}</p>\\n".format(os.path.basename(sys.argv[3])))
+"""
+
+
+def test_batch_converts_stale_posts_once(compiler, fake_pandoc, tmp_path):
+    posts = [make_post(compiler, tmp_path, name) for name in ("a.md", "b.rst", "c.md")]
+    compiler.site.timeline = posts
+
+    for post in posts:
+        compiler.compile(post.source_path, post.base_path, post=post)
+
+    assert read(posts[0].base_path) == "<p>batched markdown a.md</p>\n"
+    assert read(posts[1].base_path) == "<p>batched rst b.rst</p>\n"
+    assert read(posts[2].base_path) == "<p>batched markdown c.md</p>\n"
+    assert read(fake_pandoc).splitlines() == ["lua " + os.path.join(compiler._batch_dir.name, "batch.lua")]
+
+
+def test_batch_falls_back_to_single_files(compiler, fake_pandoc, tmp_path):
+    posts = [make_post(compiler, tmp_path, name) for name in ("a.md", "broken.md", "c.unknown")]
+    compiler.site.timeline = posts
+
+    for post in posts:
+        compiler.compile(post.source_path, post.base_path, post=post)
+
+    assert read(posts[0].base_path) == "<p>batched markdown a.md</p>\n"
+    assert read(posts[1].base_path) == "<p>single broken.md</p>\n"
+    assert read(posts[2].base_path) == "<p>single c.unknown</p>\n"
+    assert len(read(fake_pandoc).splitlines()) == 3
+
+
+def test_batch_only_converts_tasks_that_run(compiler, fake_pandoc, tmp_path):
+    posts = [make_post(compiler, tmp_path, name) for name in ("a.md", "b.md", "c.md")]
+    compiler.site.timeline = posts
+    up_to_date = "render_posts:" + posts[1].base_path
+    compiler.site.task_will_run = lambda name: name != up_to_date
+
+    for post in (posts[0], posts[2]):
+        compiler.compile(post.source_path, post.base_path, post=post)
+
+    assert not os.path.exists(posts[1].base_path)
+    manifest = os.path.join(compiler._batch_dir.name, "manifest.txt")
+    assert [line.split("\t")[1] for line in read(manifest).splitlines()] == [posts[0].source_path, posts[2].source_path]
+
+
+def test_no_batch_in_parallel_builds(compiler, fake_pandoc, tmp_path):
+    posts = [make_post(compiler, tmp_path, name) for name in ("a.md", "b.md")]
+    compiler.site.timeline = posts
+    compiler.site.doit_num_process = 2
+
+    for post in posts:
+        compiler.compile(post.source_path, post.base_path, post=post)
+
+    assert read(posts[0].base_path) == "<p>single a.md</p>\n"
+    assert read(posts[1].base_path) == "<p>single b.md</p>\n"
+
+
+def read(path):
+    with open(path, encoding="utf-8") as inf:
+        return inf.read()
+
+
+def make_post(compiler, tmp_path, name):
+    source = tmp_path / name
+    source.write_text("Some text\n")
+    post = FakePandocPost(str(source), str(tmp_path / "output" / (name + ".html")))
+    post.compiler = compiler
+    return post
+
+
+class FakePandocPost:
+    def __init__(self, source_path, base_path):
+        self.source_path = source_path
+        self.base_path = base_path
+        self._depfile = defaultdict(list)
+
+    def is_translation_available(self, lang):
+        return True
+
+    def translated_source_path(self, lang):
+        return self.source_path
+
+    def translated_base_path(self, lang):
+        return self.base_path
+
+
+@pytest.fixture
+def fake_pandoc(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    log = tmp_path / "pandoc.log"
+    log.write_text("")
+    script = bin_dir / "pandoc"
+    script.write_text(FAKE_PANDOC.format(python=sys.executable, log=str(log)))
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("PATH", str(bin_dir) + os.pathsep + os.environ["PATH"])
+    return log
+
+
+@pytest.fixture
+def compiler():
+    site = FakeSite()
+    site.config["PANDOC_OPTIONS"] = []
+    site.config["PANDOC_BATCH"] = True
+    site.config["SHOW_UNTRANSLATED_POSTS"] = True
+    compiler = CompilePandoc()
+    compiler.set_site(site)
+    return compiler
@@ -5,6 +5,8 @@ import pytest
 
 from nikola import __main__ as nikola
 
+from .helper import cd
+
 
 def test_simple_config(simple_config, metadata_option):
     """Check whether configuration-files without ineritance are interpreted correctly."""
@@ -26,8 +28,9 @@ def test_config_with_illegal_filename(
 
 
 @pytest.fixture(scope="module")
-def simple_config(data_dir):
-    nikola.main(["--conf=" + os.path.join(data_dir, "conf.py")])
+def simple_config(data_dir, site_dir):
+    with cd(site_dir):
+        nikola.main(["--conf=" + os.path.join(data_dir, "conf.py")])
     return nikola.config
 
 
@@ -36,23 +39,31 @@ def data_dir(test_dir):
     return os.path.join(test_dir, "data", "test_config")
 
 
+@pytest.fixture(scope="module")
+def site_dir(tmp_path_factory):
+    """Working directory for the sites, so their cache folder is temporary."""
+    return str(tmp_path_factory.mktemp("site"))
+
+
 @pytest.fixture
 def metadata_option():
     return "ADDITIONAL_METADATA"
 
 
 @pytest.fixture(scope="module")
-def complex_config(data_dir):
-    nikola.main(["--conf=" + os.path.join(data_dir, "prod.py")])
+def complex_config(data_dir, site_dir):
+    with cd(site_dir):
+        nikola.main(["--conf=" + os.path.join(data_dir, "prod.py")])
     return nikola.config
 
 
 @pytest.fixture(scope="module")
-def complex_filename_config(data_dir):
+def complex_filename_config(data_dir, site_dir):
     config_path = os.path.join(
         data_dir, "config.with+illegal(module)name.characters.py"
     )
-    nikola.main(["--conf=" + config_path])
+    with cd(site_dir):
+        nikola.main(["--conf=" + config_path])
     return nikola.config
 
 
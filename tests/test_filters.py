@@ -0,0 +1,51 @@
+"""Tests for the filters in nikola.filters."""
+
+import os
+
+import lxml.html
+import pytest
+from PIL import Image
+
+from nikola.filters import add_image_attributes
+from nikola.image_processing import image_metadata_path
+
+
+def test_add_image_attributes(site_dirs):
+    output_folder, cache_folder = site_dirs
+    fname = os.path.join(output_folder, "posts", "foo", "index.html")
+    with open(fname, "w", encoding="utf-8") as outf:
+        outf.write(
+            '<html><body>'
+            '<img src="../../images/a.png">'
+            '<img src="/images/a.png" loading="eager">'
+            '<img src="https://example.org/b.png">'
+            '<img src="../../images/a.png" style="width: 10px">'
+            '</body></html>'
+        )
+
+    add_image_attributes(fname, 1, output_folder, cache_folder, "https://example.com/")
+
+    with open(fname, encoding="utf-8") as inf:
+        images = lxml.html.document_fromstring(inf.read()).findall(".//img")
+    assert (images[0].get("width"), images[0].get("height")) == ("40", "30")
+    assert images[0].get("loading") is None
+    assert images[0].get("decoding") is None
+    assert (images[1].get("width"), images[1].get("height")) == ("40", "30")
+    assert images[1].get("loading") == "eager"
+    assert images[1].get("decoding") == "async"
+    assert images[2].get("width") is None
+    assert images[2].get("loading") == "lazy"
+    assert images[3].get("width") is None
+
+    config = {"OUTPUT_FOLDER": output_folder, "CACHE_FOLDER": cache_folder}
+    assert os.path.isfile(image_metadata_path(config, os.path.join(output_folder, "images", "a.png")))
+
+
+@pytest.fixture
+def site_dirs(tmpdir):
+    output_folder = os.path.join(str(tmpdir), "output")
+    cache_folder = os.path.join(str(tmpdir), "cache")
+    os.makedirs(os.path.join(output_folder, "posts", "foo"))
+    os.makedirs(os.path.join(output_folder, "images"))
+    Image.new("RGB", (40, 30)).save(os.path.join(output_folder, "images", "a.png"))
+    return output_folder, cache_folder
@@ -0,0 +1,113 @@
+"""Tests for nikola.image_processing."""
+
+import gzip
+import json
+import logging
+import os
+
+import lxml.etree
+import pytest
+
+from PIL import Image
+
+from nikola.image_processing import ImageProcessor, get_image_size, image_metadata_path, read_image_metadata
+
+SVG = b"""<?xml version="1.0" encoding="UTF-8"?>
+<!-- Created with Inkscape -->
+<svg xmlns="http://www.w3.org/2000/svg"
+     xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape"
+     xmlns:sodipodi="http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd"
+     width="400" height="200" inkscape:version="1.0">
+  <metadata><title>Foo</title></metadata>
+  <sodipodi:namedview id="base"/>
+  <path d="M 10.123456,20.987654 L 30.5,40" inkscape:label="line"/>
+</svg>
+"""
+
+
+@pytest.mark.parametrize("extension", [".svg", ".svgz"])
+def test_resize_svg(processor, tmpdir, extension):
+    src = os.path.join(str(tmpdir), "src" + extension)
+    if extension == ".svgz":
+        with gzip.open(src, "wb") as outf:
+            outf.write(SVG)
+    else:
+        with open(src, "wb") as outf:
+            outf.write(SVG)
+    dst_paths = [os.path.join(str(tmpdir), name + extension) for name in ("thumb", "big")]
+
+    processor.resize_image(src, dst_paths=dst_paths, max_sizes=[100, 300])
+
+    for dst, viewport in zip(dst_paths, ("0 0 100px 50px", "0 0 300px 150px")):
+        root = parse(dst)
+        assert root.get("viewport") == viewport
+        assert "width" not in root.attrib
+    assert "Created with Inkscape" in lxml.etree.tostring(root.getroottree()).decode("utf-8")
+
+
+def test_optimize_svg(processor, tmpdir):
+    src = os.path.join(str(tmpdir), "src.svg")
+    with open(src, "wb") as outf:
+        outf.write(SVG)
+    dst = os.path.join(str(tmpdir), "dst.svgz")
+
+    processor.resize_image(src, dst_paths=[dst], max_sizes=[100], optimize_svg=True)
+
+    root = parse(dst)
+    output = lxml.etree.tostring(root.getroottree()).decode("utf-8")
+    assert "inkscape" not in output
+    assert "sodipodi" not in output
+    assert "metadata" not in output
+    assert "<!--" not in output
+    assert root.find("{http://www.w3.org/2000/svg}path").get("d") == "M 10.123,20.988 L 30.5,40"
+
+
+def parse(path):
+    if path.endswith(".svgz"):
+        with gzip.open(path, "rb") as inf:
+            return lxml.etree.parse(inf).getroot()
+    return lxml.etree.parse(path).getroot()
+
+
+@pytest.fixture
+def processor():
+    result = ImageProcessor()
+    result.logger = logging.getLogger("test")
+    return result
+
+
+def test_unreadable_image_metadata_is_missing(tmpdir):
+    config = {"OUTPUT_FOLDER": str(tmpdir.mkdir("output")), "CACHE_FOLDER": str(tmpdir.mkdir("cache"))}
+    image_path = os.path.join(config["OUTPUT_FOLDER"], "a.png")
+    Image.new("RGB", (30, 20)).save(image_path)
+    metadata_path = image_metadata_path(config, image_path)
+    os.makedirs(os.path.dirname(metadata_path), exist_ok=True)
+    with open(metadata_path, "w", encoding="utf-8") as outf:
+        outf.write('{"sizes": {"a.png": [')
+
+    assert read_image_metadata(config, image_path) == {}
+    # The size is read from the image, and the metadata is written anew
+    assert get_image_size(config, image_path) == (30, 20)
+    assert read_image_metadata(config, image_path) == {"sizes": {"a.png": [30, 20]}}
+
+
+@pytest.mark.parametrize("thumbnail_format, thumbnail_name", [
+    ("{name}.thumbnail{ext}", "a.thumbnail.png"),
+    ("thumb_{name}{ext}", "thumb_a.png"),
+])
+def test_thumbnail_size_from_original_metadata(tmpdir, thumbnail_format, thumbnail_name):
+    config = {
+        "OUTPUT_FOLDER": str(tmpdir.mkdir("output")),
+        "CACHE_FOLDER": str(tmpdir.mkdir("cache")),
+        "IMAGE_THUMBNAIL_FORMAT": thumbnail_format,
+    }
+    thumbnail_path = os.path.join(config["OUTPUT_FOLDER"], thumbnail_name)
+    Image.new("RGB", (30, 20)).save(thumbnail_path)
+    metadata_path = image_metadata_path(config, os.path.join(config["OUTPUT_FOLDER"], "a.png"))
+    os.makedirs(os.path.dirname(metadata_path), exist_ok=True)
+    with open(metadata_path, "w", encoding="utf-8") as outf:
+        json.dump({"sizes": {"a.png": [300, 200], thumbnail_name: [15, 10]}}, outf)
+
+    # The stored size is used, the thumbnail itself is not opened
+    assert get_image_size(config, thumbnail_path) == (15, 10)
+    assert not os.path.exists(image_metadata_path(config, thumbnail_path))
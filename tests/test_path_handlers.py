@@ -112,3 +112,18 @@ def test_taxonomy_overview_path(fixture):
 
     # Assert
     assert result == ([x for x in expected.split('/') if x], "always" if append_index else "never")
+
+
+def test_path_activates_only_the_plugin_handling_the_kind(tmp_path, monkeypatch):
+    """Task plugins handling paths are remembered, so later sites only import those."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "galleries" / "demo").mkdir(parents=True)
+
+    def loaded_task_plugins():
+        site = Nikola(__configuration_filename__="conf.py", CACHE_FOLDER=str(tmp_path / "cache"))
+        site.init_plugins()
+        assert site.path("gallery", "demo") == "galleries/demo/index.html"
+        return [p.name for p in site.plugin_manager.get_plugins_of_category("Task", load=False) if p.loaded]
+
+    assert len(loaded_task_plugins()) > 1
+    assert loaded_task_plugins() == ["render_galleries"]
@@ -24,10 +24,13 @@
 # OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
+import os
+import shutil
+
 import nikola.plugin_manager
 
 from .helper import FakeSite
-from nikola.plugin_manager import PluginManager
+from nikola.plugin_manager import PluginInfo, PluginManager
 from pathlib import Path
 
 
@@ -140,3 +143,72 @@ def test_load_plugins_skip_mismatching_category(caplog):
     py_file = plugin_to_load.source_dir / "broken.py"
     assert f"{plugin_to_load.plugin_id} ({py_file}) has category '{plugin_to_load.category}' in the .plugin file, but the implementation class <class 'tests.data.plugin_manager.broken.BrokenPlugin'> does not inherit from this category - plugin will not be loaded" in caplog.text
     assert len(plugin_manager.plugins) == 0
+
+
+def test_locate_plugins_uses_manifest(tmp_path, monkeypatch):
+    """Ensure that the plugin manifest is reused until plugin files change."""
+    places = [tmp_path / "plugins"]
+    shutil.copytree(Path(__file__).parent / "data" / "plugin_manager", places[0])
+    manifest_path = tmp_path / "cache" / "plugin_manifest.json"
+    candidates = PluginManager(places, manifest_path).locate_plugins()
+    assert manifest_path.exists()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("plugin file parsed again")
+
+    with monkeypatch.context() as m:
+        m.setattr(PluginManager, "_parse_plugin_file", fail)
+        m.setattr(PluginManager, "_walk_plugin_places", fail)
+        assert PluginManager(places, manifest_path).locate_plugins() == candidates
+
+    plugin_file = places[0] / "first.plugin"
+    plugin_file.write_text(plugin_file.read_text().replace("name = first", "name = third"))
+    (places[0] / "fourth.plugin").write_text((places[0] / "first.plugin").read_text().replace("name = third", "name = fourth"))
+    os.utime(places[0], ns=(0, 0))
+    plugin_names = sorted(p.name for p in PluginManager(places, manifest_path).locate_plugins())
+    assert plugin_names == ["2nd", "broken", "fourth", "third"]
+
+
+def test_load_plugins_lazy():
+    """Ensure that lazily loaded plugins are imported when first used."""
+    places = [Path(__file__).parent / "data" / "plugin_manager"]
+    plugin_manager = PluginManager(places)
+    candidates = plugin_manager.locate_plugins()
+    new_plugins = plugin_manager.load_plugins(candidates, lazy=True)
+    assert len(new_plugins) == 3
+    assert not any(p.loaded for p in new_plugins)
+
+    imported = []
+    plugin_manager.on_import("Command", imported.append)
+    commands = plugin_manager.get_plugins_of_category("Command")
+    assert [p.name for p in commands] == ["first"]
+    assert imported == commands
+    assert commands[0].loaded
+    assert not plugin_manager.get_plugins_of_category("ConfigPlugin", load=False)[0].loaded
+    assert plugin_manager.get_plugin_by_name("2nd").loaded
+
+    # The broken plugin is dropped once it fails to import
+    assert plugin_manager.get_plugin_by_name("broken") is None
+    assert sorted(p.name for p in plugin_manager.plugins) == ["2nd", "first"]
+
+
+def test_plugin_info_compatible_with_loaded_plugins():
+    """PluginInfo can still be created with the module and plugin objects, and compared."""
+    places = [Path(__file__).parent / "data" / "plugin_manager"]
+    plugin_manager = PluginManager(places)
+    plugin_manager.load_plugins([p for p in plugin_manager.locate_plugins() if p.name == "first"])
+    lazy = plugin_manager.plugins[0]
+
+    def copy():
+        return PluginInfo(
+            lazy.name, lazy.description, lazy.friendly_name, lazy.plugin_id, lazy.category,
+            lazy.compiler, lazy.source_dir, lazy.py_file_location, lazy.module_name,
+            module_object=lazy.module_object, plugin_object=lazy.plugin_object,
+        )
+
+    info = copy()
+    assert info.loaded
+    assert info.plugin_object is lazy.plugin_object
+    assert info == copy() == lazy
+    assert hash(info) == hash(lazy)
+    assert len({info, copy(), lazy}) == 1
@@ -0,0 +1,95 @@
+import datetime
+
+import dateutil.tz
+import pytest
+
+from nikola.post_index import PostIndex
+from nikola.utils import Functionary
+
+TZ = dateutil.tz.gettz("UTC")
+
+
+def test_query_by_type(index, timeline):
+    assert index.query("post") == [p for p in timeline if p.use_in_feeds]
+    assert index.query("pages") == [p for p in timeline if not p.use_in_feeds]
+    assert index.query("all") == timeline
+    assert index.query("all", exclude_source_path="p1.rst") == [p for p in timeline if p.source_path != "p1.rst"]
+
+
+def test_query_filters(index, timeline):
+    assert names(index.query("post", categories=["news"], lang="en")) == ["p4", "p2"]
+    assert names(index.query("post", categories=["nachrichten"], lang="de")) == ["p4", "p2"]
+    assert names(index.query("all", tags={"python", "nikola"}, tags_lang="en")) == ["p4", "p3", "p1"]
+    assert names(index.query("all", tags={"python", "nikola"}, require_all_tags=True, tags_lang="en")) == ["p3"]
+    assert names(index.query("post", categories=["news"], tags={"nikola"}, lang="en", tags_lang="en")) == ["p4"]
+    assert index.query("post", tags={"missing"}, tags_lang="en") == []
+
+
+def test_slugs_and_dates(index, timeline):
+    reverse = list(reversed(timeline))
+    assert names(index.with_slugs(reverse, ["p1", "p3", "nope"], "en")) == ["p1", "p3"]
+    assert names(index.in_date_range(timeline, ">=2020-01-03T00:00:00+00:00")) == ["p4", "page", "p3"]
+    assert names(index.in_date_range(timeline, "<2020-01-03T00:00:00+00:00, month==1")) == ["p2", "p1"]
+    assert names(index.in_date_range(timeline, "year==2020, weekday!=4")) == ["p4", "page", "p2", "p1"]
+    now = datetime.datetime(2020, 1, 2, 12, tzinfo=TZ)
+    assert names(index.in_date_range(timeline, "<now", now=now)) == ["p2", "p1"]
+
+
+def test_lookups(index, timeline):
+    assert index.with_slug("p3", "de") == [timeline[2]]
+    assert index.with_slug("nope", "en") == []
+    assert index.with_source_path("p1.rst") == [timeline[4]]
+    assert index.with_source_path("nope.rst") == []
+
+
+def test_site_post_index_invalidation():
+    from nikola import Nikola
+
+    site = Nikola()
+    site.timeline = [FakePost("p1", 1, "Misc", [])]
+    index = site.post_index
+    assert site.post_index is index
+    assert names(index.with_slug("p1", "en")) == ["p1"]
+
+    # Posts changed in place are found once the index is dropped
+    site.timeline[0].meta["en"]["slug"] = "renamed"
+    site.invalidate_post_index()
+    assert names(site.post_index.with_slug("renamed", "en")) == ["renamed"]
+
+    # Replacing the timeline is detected
+    site.timeline = [FakePost("p2", 2, "Misc", [])]
+    assert names(site.post_index.with_slug("p2", "en")) == ["p2"]
+
+
+def names(posts):
+    return [p.meta("slug", lang="en") for p in posts]
+
+
+class FakePost:
+    def __init__(self, name, day, category, tags, use_in_feeds=True):
+        self.source_path = name + ".rst"
+        self.date = datetime.datetime(2020, 1, day, tzinfo=TZ)
+        self.use_in_feeds = use_in_feeds
+        self.meta = Functionary(dict, "en")
+        self.meta["en"].update(slug=name, category=category)
+        self.meta["de"].update(slug=name, category="Nachrichten" if category.lower() == "news" else category)
+        self._tags = tags
+
+    def tags_for_language(self, lang):
+        return self._tags
+
+
+@pytest.fixture
+def timeline():
+    return [
+        FakePost("p4", 4, "News", ["Nikola"]),
+        FakePost("page", 5, "", [], use_in_feeds=False),
+        FakePost("p3", 3, "Misc", ["python", "nikola"]),
+        FakePost("p2", 2, "news", []),
+        FakePost("p1", 1, "Misc", ["Python"]),
+    ]
+
+
+@pytest.fixture
+def index(timeline):
+    return PostIndex(timeline)
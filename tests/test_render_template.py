@@ -0,0 +1,46 @@
+"""Test the context templates are rendered with."""
+
+from nikola import Nikola
+from nikola.utils import TranslatableSetting
+
+
+class CapturingTemplateSystem:
+    def __init__(self):
+        self.contexts = []
+
+    def render_template(self, template_name, output_name, context):
+        self.contexts.append(context)
+        return ""
+
+
+def render(site, context, template_name="page.tmpl"):
+    site._template_system = CapturingTemplateSystem()
+    site.render_template(template_name, None, context)
+    return site._template_system.contexts[0]
+
+
+def test_context_layers(tmpdir):
+    site = Nikola(TRANSLATIONS={"en": "", "fa": "./fa"}, BLOG_TITLE={"en": "Blog", "fa": "Weblog"}, CACHE_FOLDER=str(tmpdir))
+
+    context = render(site, {"lang": "fa", "title": "Page"})
+    assert context["template_name"] == "page.tmpl"
+    assert context["title"] == "Page"
+    assert context["blog_title"] == "Weblog"
+    assert context["is_rtl"]
+    assert context["translations_feedorder"] == ["fa", "en"]
+    assert context["formatmsg"]("%s!", "x") == "x!"
+
+    # Page values win over global ones, computed values win over both.
+    context = render(site, {
+        "lang": "en",
+        "template_name": "other.tmpl",
+        "blog_title": TranslatableSetting("blog_title", {"en": "Mine"}, site.config["TRANSLATIONS"]),
+        "is_rtl": True,
+    })
+    assert context["template_name"] == "other.tmpl"
+    assert context["blog_title"] == "Mine"
+    assert not context["is_rtl"]
+
+    # Replacing a global value is picked up by the next page.
+    site.GLOBAL_CONTEXT["blog_title"] = TranslatableSetting("blog_title", {"en": "New"}, site.config["TRANSLATIONS"])
+    assert render(site, {"lang": "en"})["blog_title"] == "New"
@@ -15,6 +15,7 @@ from lxml import html as lxml_html
 
 import nikola.plugins.compile.rest
 import nikola.plugins.compile.rest.listing
+from nikola.compile_cache import CompileCache
 from nikola.plugins.compile.rest import vimeo
 from nikola.utils import _reload, LocaleBorg
 
@@ -159,6 +160,83 @@ def test_doc_titled():
     )
 
 
+def test_read_metadata_reuses_document(tmp_path):
+    """The document parsed while reading metadata is compiled without parsing it again."""
+    source = tmp_path / "post.rst"
+    data = "Post title\n==========\n\n:author: Someone\n:summary: Short\n\nSome *text*.\n"
+    source.write_text(data, encoding="utf-8")
+    site = FakeSite()
+    site.config["USE_REST_DOCINFO_METADATA"] = True
+
+    compiler = nikola.plugins.compile.rest.CompileRest()
+    compiler.set_site(site)
+    meta = compiler.read_metadata(FakeSourcePost(str(source)), lang="en")
+    assert meta["title"] == "Post title"
+    assert meta["author"] == "Someone"
+    assert meta["summary"] == "Short"
+    assert len(compiler._doctrees) == 1
+
+    html = compiler.compile_string(data, str(source))[0]
+    assert not compiler._doctrees
+
+    other_compiler = nikola.plugins.compile.rest.CompileRest()
+    other_compiler.set_site(site)
+    assert html == other_compiler.compile_string(data, str(source))[0]
+    assert_html_contains(html, "em", text="text")
+
+
+def test_read_metadata_doc_role_not_reused(tmp_path):
+    """Documents using the doc role are parsed again when compiling."""
+    source = tmp_path / "post.rst"
+    source.write_text("Sample for testing my :doc:`fake-post`\n", encoding="utf-8")
+    site = FakeSite()
+    site.config["USE_REST_DOCINFO_METADATA"] = True
+
+    compiler = nikola.plugins.compile.rest.CompileRest()
+    compiler.set_site(site)
+    compiler.read_metadata(FakeSourcePost(str(source)), lang="en")
+    assert not compiler._doctrees
+
+
+def test_hide_docinfo_transforms_do_not_grow():
+    """Compiling posts with HIDE_REST_DOCINFO does not add more transforms."""
+    site = FakeSite()
+    site.config["HIDE_REST_DOCINFO"] = True
+    site.config["USE_REST_DOCINFO_METADATA"] = True
+    compiler = nikola.plugins.compile.rest.CompileRest()
+    compiler.set_site(site)
+
+    sample = "Title\n=====\n\n:author: Someone\n\nText.\n"
+    for _ in range(3):
+        html = compiler.compile_string(sample)[0]
+        assert "Someone" not in html
+    assert site.rst_transforms == []
+    assert compiler.get_transforms(True) == [nikola.plugins.compile.rest.RemoveDocinfo]
+
+
+def test_fragment_cache_misses_after_option_change(tmp_path):
+    """Fragments compiled with other reST options are not reused."""
+    source = tmp_path / "post.rst"
+    source.write_text("Title\n=====\n\n:author: Someone\n\nText.\n", encoding="utf-8")
+    dest = tmp_path / "post.html"
+    dest.write_text("<p>Text.</p>", encoding="utf-8")
+    site = FakeSite()
+    compiler = nikola.plugins.compile.rest.CompileRest()
+    compiler.set_site(site)
+    post = FakeSourcePost(str(source))
+    post.compiler = compiler
+    post.is_two_file = True
+    cache = CompileCache(str(tmp_path / "fragments"))
+
+    key = cache.key(post, "en", [str(source)])
+    cache.put(key, str(dest), [str(source)])
+    assert cache.get(cache.key(post, "en", [str(source)]), str(dest)) == [str(source)]
+
+    site.config["HIDE_REST_DOCINFO"] = True
+    assert cache.key(post, "en", [str(source)]) != key
+    assert cache.get(cache.key(post, "en", [str(source)]), str(dest)) is None
+
+
 @pytest.fixture(autouse=True, scope="module")
 def localeborg_base():
     """A base config of LocaleBorg."""
@@ -187,6 +265,14 @@ class FakePost:
         self._depfile = {outfile: []}
 
 
+class FakeSourcePost:
+    def __init__(self, source_path):
+        self.source_path = source_path
+
+    def translated_source_path(self, lang):
+        return self.source_path
+
+
 def assert_html_contains(html, element, attributes=None, text=None):
     """
     Test if HTML document includes an element with the given attributes
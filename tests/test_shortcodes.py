@@ -110,6 +110,10 @@ def test_data(site, template, expected_result):
             "^Found shortcode ending '{{% / %}}' which isn't closing a started shortcode",
         ),
         ("{{% / a %}}", "^Syntax error: '{{% /' must be followed by ' %}}'"),
+        (
+            "{{% arg %}}{{% arg %}}x{{% /arg %}}{{% /arg %}}",
+            "^Found shortcode ending '{{% /arg %}}' which isn't closing a started shortcode",
+        ),
         (
             "==> {{% <==",
             "^Shortcode '<==' starting at .* is not terminated correctly with '%}}'!",
@@ -150,6 +154,10 @@ def test_errors(site, template, expected_error_pattern):
                 {"SC1": "{{% foo %}} {{% bar %}} quux {{% /bar %}} {{% /foo %}}"},
             ),
         ),
+        (
+            "{{% foo %}}{{% foo %}} bar {{% /foo %}} {{% foo %}}",
+            ("SC1 SC2", {"SC1": "{{% foo %}}{{% foo %}} bar {{% /foo %}}", "SC2": "{{% foo %}}"}),
+        ),
         (
             "AAA{{% foo %}} BBB {{% bar %}} quux {{% /bar %}} CCC",
             (
@@ -166,6 +174,36 @@ def test_extract_shortcodes(input, expected, monkeypatch):
     assert extracted == expected
 
 
+def test_shortcode_cache(tmp_path):
+    dep = tmp_path / "dep.txt"
+    dep.write_text("one")
+    calls = []
+
+    def pure(*args, **kwargs):
+        calls.append("pure")
+        return "pure " + dep.read_text(), [str(dep)]
+
+    def impure(*args, **kwargs):
+        calls.append("impure")
+        return "impure"
+
+    pure.nikola_shortcode_pure = True
+    registry = {"pure": pure, "impure": impure}
+    template = "{{% pure a %}} {{% impure a %}}"
+
+    def apply():
+        cache = shortcodes.ShortcodeCache(str(tmp_path / "cache"))
+        return shortcodes.apply_shortcodes(template, registry, cache=cache)
+
+    assert apply() == ("pure one impure", [str(dep)])
+    assert apply() == ("pure one impure", [str(dep)])
+    assert calls == ["pure", "impure", "impure"]
+
+    dep.write_text("three")
+    assert apply()[0] == "pure three impure"
+    assert calls == ["pure", "impure", "impure", "pure", "impure"]
+
+
 @pytest.fixture(scope="module")
 def site():
     s = FakeSiteWithShortcodeRegistry()
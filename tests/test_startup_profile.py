@@ -0,0 +1,30 @@
+"""Test what Nikola imports when it starts."""
+
+import pytest
+
+from nikola.startup_profile import ImportTime, parse_importtime, profile_command
+
+IMPORTTIME_OUTPUT = """\
+import time: self [us] | cumulative | imported package
+import time:       150 |        150 |     _io
+import time:      1200 |       1350 |   nikola.utils
+[2024-01-01T00:00:00Z] INFO: Nikola: something was logged
+import time:       300 |       1650 | nikola
+"""
+
+
+def test_parse_importtime():
+    assert parse_importtime(IMPORTTIME_OUTPUT) == [
+        ImportTime("_io", 150, 150, 2),
+        ImportTime("nikola.utils", 1200, 1350, 1),
+        ImportTime("nikola", 300, 1650, 0),
+    ]
+
+
+@pytest.mark.parametrize("args", [["version"], ["help"], ["tabcompletion", "--shell", "bash"]])
+def test_quick_commands_skip_heavy_imports(args, tmp_path):
+    _, imports, result = profile_command(args, cwd=str(tmp_path))
+    assert result.returncode == 0
+    top_level = {i.module.split(".")[0] for i in imports}
+    assert "nikola" in top_level
+    assert not top_level & {"lxml", "babel", "pygments"}
@@ -1,9 +1,11 @@
+import json
 import os
 from tempfile import NamedTemporaryFile
 
 import pytest
 from PIL import Image, ImageDraw
 
+from nikola.image_processing import image_metadata_path
 from nikola.plugins.task import scale_images
 
 # These tests don't require valid profiles. They need only to verify
@@ -26,6 +28,34 @@ def test_handling_icc_profiles(test_images, destination_dir):
     assert actual_profile == expected_profile
 
 
+def test_image_placeholders(source_dir, destination_dir, tmpdir_factory):
+    filename = create_src_image(str(source_dir), False)
+    site = FakeSite({
+        "IMAGE_FOLDERS": {str(source_dir): ""},
+        "OUTPUT_FOLDER": str(destination_dir),
+        "CACHE_FOLDER": str(tmpdir_factory.mktemp("cache")),
+        "IMAGE_THUMBNAIL_SIZE": 32,
+        "IMAGE_THUMBNAIL_FORMAT": "{name}.thumbnail{ext}",
+        "MAX_IMAGE_SIZE": 512,
+        "FILTERS": {},
+        "PRESERVE_EXIF_DATA": False,
+        "EXIF_WHITELIST": {},
+        "PRESERVE_ICC_PROFILES": False,
+        "IMAGE_PLACEHOLDERS": True,
+    })
+    run_task(site)
+
+    metadata_path = image_metadata_path(site.config, os.path.join(str(destination_dir), filename))
+    with open(metadata_path, encoding="utf-8") as inf:
+        metadata = json.load(inf)
+
+    name, ext = os.path.splitext(filename)
+    assert metadata["sizes"] == {filename: [64, 64], name + ".thumbnail" + ext: [32, 32]}
+    assert metadata["placeholder"].startswith("data:image/")
+    assert len(metadata["dominant_color"]) == 7
+    assert metadata["dominant_color"].startswith("#")
+
+
 @pytest.fixture(
     params=[
         pytest.param(True, id="with icc filename"),
@@ -69,6 +99,7 @@ def site(preserve_icc_profiles, source_dir, destination_dir):
         "PRESERVE_EXIF_DATA": False,
         "EXIF_WHITELIST": {},
         "PRESERVE_ICC_PROFILES": preserve_icc_profiles,
+        "IMAGE_PLACEHOLDERS": False,
     }
     return FakeSite(config)
 
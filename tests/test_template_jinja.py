@@ -0,0 +1,113 @@
+"""Test the Jinja template system."""
+
+import os
+from unittest import mock
+
+from nikola.plugins.template.jinja import JinjaTemplates
+
+
+def test_cache_partial_renders_once_per_key(tmpdir):
+    templates = tmpdir.mkdir("templates")
+    templates.join("page.tmpl").write(
+        "{% cache_partial lang, pagekind %}{{ n }}{% endcache_partial %}|{{ n }}"
+    )
+
+    jinja = JinjaTemplates()
+    jinja.set_directories([str(templates)], str(tmpdir.mkdir("cache")))
+    assert jinja.render_template("page.tmpl", None, {"lang": "en", "pagekind": ["index"], "n": 1}) == "1|1"
+    assert jinja.render_template("page.tmpl", None, {"lang": "en", "pagekind": ["index"], "n": 2}) == "1|2"
+    assert jinja.render_template("page.tmpl", None, {"lang": "en", "pagekind": ["post_page"], "n": 3}) == "3|3"
+    assert jinja.render_template("page.tmpl", None, {"lang": "fr", "pagekind": ["index"], "n": 4}) == "4|4"
+
+    # Recreating the lookup starts from scratch.
+    jinja.create_lookup()
+    assert jinja.render_template("page.tmpl", None, {"lang": "en", "pagekind": ["index"], "n": 5}) == "5|5"
+
+
+def test_cache_partial_in_string_templates(tmpdir):
+    jinja = JinjaTemplates()
+    jinja.set_directories([str(tmpdir.mkdir("templates"))], str(tmpdir.mkdir("cache")))
+    text = "{% cache_partial lang %}{{ n }}{% endcache_partial %}|{{ n }}"
+    assert jinja.lookup.from_string(text).render(lang="en", n=1) == "1|1"
+    # Compiling the same string again uses the same entries
+    assert jinja.lookup.from_string(text).render(lang="en", n=2) == "1|2"
+    assert len(jinja.lookup.partial_cache) == 1
+
+    other = "{% cache_partial lang %}{{ n }}!{% endcache_partial %}"
+    assert jinja.lookup.from_string(other).render(lang="en", n=3) == "3!"
+    assert len(jinja.lookup.partial_cache) == 2
+
+
+def test_precompiled_templates_are_preferred(tmpdir):
+    templates = tmpdir.mkdir("templates")
+    template = templates.join("page.tmpl")
+    template.write("Hello {{ name }}")
+    cache_folder = str(tmpdir.mkdir("cache"))
+
+    jinja = JinjaTemplates()
+    jinja.set_directories([str(templates)], cache_folder)
+    assert jinja.precompile() == 1
+
+    jinja = JinjaTemplates()
+    jinja.set_directories([str(templates)], cache_folder)
+    with mock.patch.object(jinja.lookup, "compile") as compile:
+        assert jinja.render_template("page.tmpl", None, {"name": "world"}) == "Hello world"
+    assert not compile.called
+    assert jinja.get_template_path("page.tmpl") == str(template)
+
+    # A template changed after precompiling is compiled from source.
+    template.write("Bye {{ name }}")
+    mtime = os.stat(str(template)).st_mtime_ns + 10 ** 10
+    os.utime(str(template), ns=(mtime, mtime))
+    jinja.create_lookup()
+    assert jinja.render_template("page.tmpl", None, {"name": "world"}) == "Bye world"
+
+
+def test_dependency_cache_is_saved_once(tmpdir):
+    templates = tmpdir.mkdir("templates")
+    templates.join("base.tmpl").write("{% block content %}{% endblock %}")
+    for name in ("a", "b", "c"):
+        templates.join(name + ".tmpl").write("{% extends 'base.tmpl' %}")
+
+    jinja = JinjaTemplates()
+    jinja.set_directories([str(templates)], str(tmpdir.mkdir("cache")))
+    with mock.patch("nikola.utils.write_json_atomic") as write:
+        for name in ("a", "b", "c"):
+            assert jinja.template_deps(name + ".tmpl") == [str(templates.join(name + ".tmpl")), str(templates.join("base.tmpl"))]
+        assert not write.called
+        jinja.save_caches()
+    assert write.call_count == 1
+
+
+def test_precompiled_templates_need_the_same_environment(tmpdir):
+    templates = tmpdir.mkdir("templates")
+    templates.join("page.tmpl").write("Hello {{ name }}")
+    cache_folder = str(tmpdir.mkdir("cache"))
+    jinja = JinjaTemplates()
+    jinja.set_directories([str(templates)], cache_folder)
+    assert jinja.precompile() == 1
+
+    def renders_from_module(jinja):
+        source_loader = jinja.lookup.loader.source_loader
+        with mock.patch.object(source_loader, "load", wraps=source_loader.load) as load:
+            assert jinja.render_template("page.tmpl", None, {"name": "world"}) == "Hello world"
+        return not load.called
+
+    jinja = JinjaTemplates()
+    jinja.set_directories([str(templates)], cache_folder)
+    assert renders_from_module(jinja)
+
+    jinja = JinjaTemplates()
+    jinja.set_directories([str(templates)], cache_folder)
+    jinja.lookup.trim_blocks = False
+    assert not renders_from_module(jinja)
+
+    jinja = JinjaTemplates()
+    jinja.set_directories([str(templates)], cache_folder)
+    jinja.lookup.add_extension("jinja2.ext.loopcontrols")
+    assert not renders_from_module(jinja)
+
+    with mock.patch("nikola.plugins.template.jinja.__version__", "0.0.1"):
+        jinja = JinjaTemplates()
+        jinja.set_directories([str(templates)], cache_folder)
+        assert not renders_from_module(jinja)
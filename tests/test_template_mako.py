@@ -0,0 +1,49 @@
+"""Test the Mako template system."""
+
+import os
+
+from nikola.plugins.template.mako import MakoTemplates
+
+
+def test_compiled_modules_are_kept_and_validated(tmpdir):
+    templates = tmpdir.mkdir("templates")
+    template = templates.join("page.tmpl")
+    template.write("Hello ${name}")
+    cache_folder = tmpdir.mkdir("cache")
+    stale = cache_folder.mkdir(".mako.tmp").join("page.tmpl.py")
+    stale.write("raise Exception('stale module loaded')")
+
+    mako = MakoTemplates()
+    mako.set_directories([str(templates)], str(cache_folder))
+    assert mako.render_template("page.tmpl", None, {"name": "world"}) == "Hello world"
+    assert not stale.check()
+    modules = cache_folder.join(".mako.tmp").listdir("*.py")
+    assert len(modules) == 1
+
+    # A new run keeps the compiled module.
+    mako.set_directories([str(templates)], str(cache_folder))
+    assert mako.render_template("page.tmpl", None, {"name": "again"}) == "Hello again"
+    assert cache_folder.join(".mako.tmp").listdir("*.py") == modules
+
+    # Changing the template replaces its module.
+    template.write("Bye ${name}")
+    mtime = os.stat(str(template)).st_mtime_ns - 10 ** 10
+    os.utime(str(template), ns=(mtime, mtime))
+    mako.set_directories([str(templates)], str(cache_folder))
+    assert mako.render_template("page.tmpl", None, {"name": "world"}) == "Bye world"
+    new_modules = cache_folder.join(".mako.tmp").listdir("*.py")
+    assert len(new_modules) == 1
+    assert new_modules != modules
+
+
+def test_cached_blocks_render_once_per_key(tmpdir):
+    templates = tmpdir.mkdir("templates")
+    templates.join("page.tmpl").write(
+        '<%block name="footer" cached="True" cache_key="footer-${lang}">${n}</%block>|${n}'
+    )
+
+    mako = MakoTemplates()
+    mako.set_directories([str(templates)], str(tmpdir.mkdir("cache")))
+    assert mako.render_template("page.tmpl", None, {"lang": "en", "n": 1}) == "1|1"
+    assert mako.render_template("page.tmpl", None, {"lang": "en", "n": 2}) == "1|2"
+    assert mako.render_template("page.tmpl", None, {"lang": "fr", "n": 3}) == "3|3"
@@ -1,8 +1,11 @@
 """Test template-based shortcodes."""
 
+import os
+
 import pytest
 
 from nikola import Nikola
+from nikola.utils import TranslatableSetting, pkg_resources_path
 
 
 def test_mixedargs(site):
@@ -55,9 +58,53 @@ def test_applying_shortcode(site, template, data, expected_result):
     assert site.apply_shortcodes(data)[0] == expected_result
 
 
+def test_template_strings_compiled_once(site, monkeypatch):
+    site.shortcode_registry["test1"] = site._make_renderfunc("foo={{ foo }}")
+    site.apply_shortcodes("{{% test1 foo=bar %}}")
+
+    def from_string(*args, **kwargs):
+        raise AssertionError("template compiled again")
+
+    monkeypatch.setattr(site.template_system.lookup, "from_string", from_string)
+    assert site.apply_shortcodes("{{% test1 foo=baz %}}")[0] == "foo=baz"
+    assert site.apply_shortcodes("{{% template %}}foo={{ foo }}{{% /template %}}")[0] == "foo="
+
+
+@pytest.mark.parametrize(
+    "template, pure",
+    [
+        ("foo={{ foo }}", False),
+        ("{{ _link('tag', 'foo') }}", False),
+        ("{# nikola_shortcode_pure #}foo={{ foo }}", True),
+    ],
+)
+def test_templates_are_pure_if_marked(site, template, pure):
+    assert site._make_renderfunc(template).nikola_shortcode_pure is pure
+
+
+@pytest.mark.parametrize("engine", ["jinja", "mako"])
+def test_builtin_raw_shortcode_is_pure(site, engine):
+    path = pkg_resources_path("nikola", os.path.join("data", "shortcodes", engine, "raw.tmpl"))
+    with open(path, encoding="utf-8") as inf:
+        assert site._make_renderfunc(inf.read()).nikola_shortcode_pure
+
+
+def test_replaced_global_context_values_are_used(site):
+    site.shortcode_registry["test1"] = site._make_renderfunc("{{ blog_author }}")
+    blog_author = site.GLOBAL_CONTEXT["blog_author"]
+    assert site.apply_shortcodes("{{% test1 %}}")[0] == blog_author("en")
+
+    try:
+        site.GLOBAL_CONTEXT["blog_author"] = TranslatableSetting("BLOG_AUTHOR", "Someone Else", site.config["TRANSLATIONS"])
+        assert site.apply_shortcodes("{{% test1 %}}")[0] == "Someone Else"
+    finally:
+        site.GLOBAL_CONTEXT["blog_author"] = blog_author
+
+
 @pytest.fixture(scope="module")
-def site():
+def site(tmp_path_factory):
     s = ShortcodeFakeSite()
+    s.template_cache_folder = str(tmp_path_factory.mktemp("cache"))
     s.init_plugins()
     s._template_system = None
     return s
@@ -70,7 +117,7 @@ class ShortcodeFakeSite(Nikola):
             self._template_system = self.plugin_manager.get_plugin_by_name(
                 "jinja", "TemplateSystem"
             ).plugin_object
-            self._template_system.set_directories(".", "cache")
+            self._template_system.set_directories(".", self.template_cache_folder)
             self._template_system.set_site(self)
 
         return self._template_system
@@ -3,24 +3,40 @@ Testing Nikolas utility functions.
 """
 
 import os
+import pickle
+import stat
+import sys
+import time
 from unittest import mock
 
+import pygments
 import pytest
 import lxml.html
+from pygments.lexers import PythonLexer
 
-from nikola import metadata_extractors
+from nikola import Nikola, metadata_extractors
 from nikola.plugins.task.sitemap import get_base_path as sitemap_get_base_path
 from nikola.post import get_meta
 from nikola.utils import (
+    ASSET_INDEX,
+    ExtendedItem,
+    HIGHLIGHT_CACHE,
+    HighlightCache,
+    TemplateDependencyCache,
     TemplateHookRegistry,
     TranslatableSetting,
+    VersionedDict,
     NikolaPygmentsHTML,
     demote_headers,
     get_asset_path,
     get_crumbs,
     get_theme_chain,
     get_translation_candidate,
+    load_messages,
     nikola_find_formatter_class,
+    use_nikola_pygments_formatter,
+    write_file_atomic,
+    write_json_atomic,
     write_metadata,
     bool_from_meta,
     parselinenos
@@ -306,6 +322,40 @@ def test_get_asset_path(path, files_folders, expected_path_end):
         assert asset_path is None
 
 
+def test_get_asset_path_uses_index(tmpdir):
+    theme = tmpdir.mkdir("theme")
+    theme.mkdir("assets").join("style.css").write("")
+    files = tmpdir.mkdir("files")
+    files.join("robots.txt").write("")
+    files_folders = {str(files): ""}
+
+    assert get_asset_path("assets/style.css", [str(theme)], files_folders) == str(theme.join("assets", "style.css"))
+    assert get_asset_path("robots.txt", [str(theme)], files_folders) == str(files.join("robots.txt"))
+
+    with mock.patch("os.walk") as walk:
+        assert get_asset_path("robots.txt", [str(theme)], files_folders) == str(files.join("robots.txt"))
+    assert not walk.called
+
+    theme.join("assets", "new.css").write("")
+    with mock.patch("os.walk") as walk:
+        assert get_asset_path("assets/new.css", [str(theme)], files_folders) == str(theme.join("assets", "new.css"))
+        assert get_asset_path("assets/missing.css", [str(theme)], files_folders, output_dir=False) is None
+    assert not walk.called
+    ASSET_INDEX.clear()
+
+
+@pytest.mark.skipif(not hasattr(os, "symlink"), reason="needs symlinks")
+def test_asset_index_follows_symlinks_without_cycles(tmpdir):
+    files = tmpdir.mkdir("files")
+    files.mkdir("sub").join("a.txt").write("")
+    other = tmpdir.mkdir("other")
+    other.join("b.txt").write("")
+    os.symlink(str(other), str(files.join("linked")))
+    os.symlink(str(files), str(files.join("sub", "loop")))
+
+    assert ASSET_INDEX.files(str(files)) == {os.path.join("sub", "a.txt"), os.path.join("linked", "b.txt")}
+
+
 @pytest.mark.parametrize(
     "path, is_file, expected_crumbs",
     [
@@ -645,3 +695,183 @@ def test_parselinenos():
 
 def test_nikola_find_formatter_class_returns_pygments_class():
     assert NikolaPygmentsHTML == nikola_find_formatter_class("html")
+
+
+def test_use_nikola_pygments_formatter_is_idempotent():
+    assert use_nikola_pygments_formatter() is NikolaPygmentsHTML
+    assert use_nikola_pygments_formatter() is NikolaPygmentsHTML
+    assert pygments.formatters.find_formatter_class("html") is NikolaPygmentsHTML
+
+
+def test_rss_item_can_be_pickled():
+    item = ExtendedItem(title="Title", link="https://example.com/", creator="Author")
+    copy = pickle.loads(pickle.dumps(item))
+    assert isinstance(copy, ExtendedItem)
+    assert copy.creator == "Author"
+
+
+def test_highlight_cache_reuses_output_with_new_anchors(tmpdir):
+    cache = HighlightCache(str(tmpdir))
+    code = "def f():\n    return 42\n"
+    first = cache.highlight(code, PythonLexer(), NikolaPygmentsHTML(lineanchors="first", linenos="table"))
+    assert first == pygments.highlight(code, PythonLexer(), NikolaPygmentsHTML(lineanchors="first", linenos="table"))
+
+    with mock.patch("pygments.highlight") as highlight:
+        second = cache.highlight(code, PythonLexer(), NikolaPygmentsHTML(lineanchors="second", linenos="table"))
+    assert not highlight.called
+    assert second == first.replace("first", "second")
+
+    other = cache.highlight(code, PythonLexer(), NikolaPygmentsHTML(lineanchors="first", linenos=False))
+    assert other == pygments.highlight(code, PythonLexer(), NikolaPygmentsHTML(lineanchors="first", linenos=False))
+
+
+def test_highlight_cache_key_uses_filter_options():
+    cache = HighlightCache()
+    code = "def f(): pass\n"
+
+    def lexer(**filter_options):
+        result = PythonLexer()
+        result.add_filter("keywordcase", **filter_options)
+        return result
+
+    formatter = NikolaPygmentsHTML()
+    assert cache.key(code, lexer(case="upper"), formatter) == cache.key(code, lexer(case="upper"), formatter)
+    assert cache.key(code, lexer(case="upper"), formatter) != cache.key(code, lexer(case="lower"), formatter)
+    assert cache.key(code, lexer(case="upper"), formatter) != cache.key(code, PythonLexer(), formatter)
+
+
+def test_highlight_cache_prunes_unused_entries(tmpdir):
+    cache = HighlightCache(str(tmpdir))
+    old_code, new_code = "old = 1\n", "new = 2\n"
+    for code in (old_code, new_code):
+        cache.highlight(code, PythonLexer(), NikolaPygmentsHTML())
+    old_path, new_path = (
+        os.path.join(str(tmpdir), key[:2], key + ".html")
+        for key in (cache.key(code, PythonLexer(), NikolaPygmentsHTML()) for code in (old_code, new_code)))
+    long_ago = time.time() - cache.max_age - 60
+    os.utime(old_path, (long_ago, long_ago))
+
+    cache.prune()
+    assert not os.path.exists(old_path)
+    assert os.path.exists(new_path)
+
+    # Pruning again is skipped until touch_interval has passed
+    os.utime(new_path, (long_ago, long_ago))
+    cache.prune()
+    assert os.path.exists(new_path)
+
+    # Using an entry keeps it
+    cache.highlight(new_code, PythonLexer(), NikolaPygmentsHTML())
+    assert time.time() - os.stat(new_path).st_mtime < 60
+
+
+def test_highlight_cache_follows_last_site(tmpdir):
+    Nikola(__configuration_filename__="conf.py", CACHE_FOLDER=str(tmpdir))
+    assert HIGHLIGHT_CACHE.folder == os.path.join(str(tmpdir), "highlight")
+
+    Nikola()
+    assert HIGHLIGHT_CACHE.folder is None
+
+
+def test_versioned_dict():
+    d = VersionedDict(a=1)
+    version = d.version
+    assert d["a"] == 1
+    assert d.setdefault("a", 2) == 1
+    assert d.version == version
+
+    for change in (
+        lambda: d.__setitem__("b", 2),
+        lambda: d.update(c=3),
+        lambda: d.setdefault("d", 4),
+        lambda: d.pop("d"),
+        lambda: d.__delitem__("c"),
+        lambda: d.__ior__({"e": 5}),
+        lambda: d.popitem(),
+        lambda: d.clear(),
+    ):
+        change()
+        assert d.version > version
+        version = d.version
+
+
+def test_write_file_atomic(tmpdir):
+    path = str(tmpdir.join("a", "b", "file.txt"))
+    write_file_atomic(path, "žluťoučký")
+    with open(path, encoding="utf-8") as inf:
+        assert inf.read() == "žluťoučký"
+
+    write_file_atomic(path, b"\x00bytes")
+    with open(path, "rb") as inf:
+        assert inf.read() == b"\x00bytes"
+
+    write_json_atomic(path, {"b": 1, "a": 2}, sort_keys=True)
+    with open(path, encoding="utf-8") as inf:
+        assert inf.read() == '{"a": 2, "b": 1}'
+    assert os.listdir(os.path.dirname(path)) == ["file.txt"]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="no POSIX permissions")
+def test_write_file_atomic_uses_umask(tmpdir):
+    path = str(tmpdir.join("file.txt"))
+    write_file_atomic(path, "data")
+    umask = os.umask(0o022)
+    os.umask(umask)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o666 & ~umask
+
+
+def test_write_file_atomic_cleans_up_on_error(tmpdir):
+    path = str(tmpdir.join("file.json"))
+    with pytest.raises(TypeError):
+        write_json_atomic(path, {"a": object()})
+    with pytest.raises(TypeError):
+        write_file_atomic(path, 42)
+    assert os.listdir(str(tmpdir)) == []
+
+
+def test_load_messages_uses_compiled_catalog(tmpdir):
+    theme = tmpdir.mkdir("theme")
+    msg_file = theme.mkdir("messages").join("messages_de.py")
+    msg_file.write('MESSAGES = {"Read more": "Weiterlesen!"}\n')
+    cache_path = str(tmpdir.join("cache", "messages.json"))
+    themes = [str(theme), get_theme_chain("base", [])[0]]
+    translations = {"en": "", "de": "./de"}
+
+    first = load_messages(themes, translations, "en", [], cache_path=cache_path)
+    assert first("Read more", "de") == "Weiterlesen!"
+    assert os.path.isfile(cache_path)
+
+    with mock.patch("nikola.utils._import_messages") as import_messages:
+        second = load_messages(themes, translations, "en", [], cache_path=cache_path)
+    assert not import_messages.called
+    assert second("Read more", "de") == "Weiterlesen!"
+    assert second("Read more", "en") == first("Read more", "en")
+
+    msg_file.write('MESSAGES = {"Read more": "Mehr lesen"}\n')
+    mtime = os.stat(str(msg_file)).st_mtime_ns + 10 ** 9
+    os.utime(str(msg_file), ns=(mtime, mtime))
+    third = load_messages(themes, translations, "en", [], cache_path=cache_path)
+    assert third("Read more", "de") == "Mehr lesen"
+
+
+def test_template_dependency_cache(tmpdir):
+    template = tmpdir.join("page.tmpl")
+    template.write("{% extends 'base.tmpl' %}")
+    cache_path = str(tmpdir.join("cache", "template_deps.json"))
+    parse = mock.Mock(return_value=["base.tmpl"])
+
+    cache = TemplateDependencyCache(cache_path)
+    assert cache.refs(str(template), parse) == ["base.tmpl"]
+    parse.assert_called_once_with(b"{% extends 'base.tmpl' %}")
+    cache.save()
+
+    # A new run reuses the saved entry, even if only the mtime changed.
+    os.utime(str(template), ns=(0, 0))
+    cache = TemplateDependencyCache(cache_path)
+    assert cache.refs(str(template), parse) == ["base.tmpl"]
+    assert parse.call_count == 1
+
+    template.write("{% extends 'other.tmpl' %}")
+    parse.return_value = ["other.tmpl"]
+    assert cache.refs(str(template), parse) == ["other.tmpl"]
+    assert parse.call_count == 2